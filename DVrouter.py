@@ -1,4 +1,4 @@
-import json
+import codec
 from router import Router
 from packet import Packet
 
@@ -11,88 +11,393 @@ class DVrouter(Router):
     override.
     """
 
-    def __init__(self, addr, heartbeat_time):
+    def __init__(
+        self,
+        addr,
+        heartbeat_time,
+        full_update_time=None,
+        horizon="poison",
+        infinity=16,
+        dual=False,
+    ):
         Router.__init__(self, addr)
         # VT khoảng cách: ánh xạ đích đến (chi phí, next_hop)
         self.dv_table = {addr: (0, None)}  # Đến chính mình thì chi phí là 0
         # Hàng xóm: ánh xạ từ cổng đến (neighbor_addr, cost)
         self.neighbor_links = {}
+        # Vector nhận được gần nhất của mỗi hàng xóm: cổng -> {đích: chi phí}
+        self.neighbor_dvs = {}
+        # FIB: đích -> cổng ra, chỉ cập nhật khi bảng DV (RIB) thay đổi
+        self.forwarding_table = {}
         self.last_broadcast = 0
         self.heartbeat_time = heartbeat_time
-        self.INFINITY = 16  # Giá trị vô cực dùng trong rip
+        # Giá trị vô cực kiểu RIP: giới hạn tổng chi phí của một đường đi (không phải
+        # số bước nhảy), đích có chi phí từ INFINITY trở lên là không đến được. Mạng có
+        # đường đi ngắn nhất dài hơn cần giá trị lớn hơn ("infinity" trong file JSON)
+        self.INFINITY = infinity
+        # horizon: "poison" (split horizon với poison reverse: quảng bá INFINITY cho
+        # hàng xóm là next_hop), "split" (không quảng bá cho hàng xóm đó) hoặc "none"
+        if horizon not in ("poison", "split", "none"):
+            raise ValueError(f"unknown horizon mode: {horizon}")
+        self.horizon = horizon
+        # Cập nhật kích hoạt chỉ gửi các mục thay đổi (delta), bảng đầy đủ được gửi
+        # theo chu kỳ full_update_time (mặc định 10 nhịp tim) hoặc khi được yêu cầu
+        self.full_update_time = full_update_time or 10 * heartbeat_time
+        # Bảng DV lúc quảng bá gần nhất: đích -> (chi phí, next_hop)
+        self.advertised_routes = dict(self.dv_table)
+        self.advertised = {}    # Cổng -> bảng đã gửi cho hàng xóm: đích -> chi phí
+        self.update_seq = {}    # Cổng -> số thứ tự của bản cập nhật gửi gần nhất
+        self.received_seq = {}  # Cổng -> số thứ tự nhận được gần nhất từ hàng xóm
+        # Bộ đếm: số byte đã gửi và số byte nếu luôn gửi bảng đầy đủ
+        self.bytes_sent = 0
+        self.bytes_full = 0
+        self.route_computations = 0  # Số lần chọn lại đường đi (update_routes)
+        # dual (thử nghiệm): chế độ kiểu DUAL, chỉ chuyển sang hàng xóm thỏa điều kiện
+        # khả thi (chi phí hàng xóm báo < feasible distance) mà không truy vấn, nếu
+        # không có thì gửi truy vấn (diffusing computation) tới các hàng xóm. Trong
+        # lúc chờ trả lời vẫn dùng đường tốt nhất hiện có như DV thường, nên theo
+        # bench_dv_dual chế độ này hội tụ nhanh như DV thường (không nhanh hơn), chỉ
+        # gửi ít gói hơn khi đếm tới vô cực và gửi nhiều hơn vài % trong các trường hợp
+        # khác
+        self.dual = dual
+        self.feasible_distance = {}  # Đích -> feasible distance
+        self.active = {}             # Đích đang truy vấn -> các cổng chưa trả lời
+        self.pending_replies = {}    # Đích -> các cổng đang chờ mình trả lời
+        self.dual_out = {}           # Cổng -> loại tin (QUERY/REPLY) -> {đích: chi phí}
 
     def handle_new_link(self, port, endpoint, cost):
-        # Thêm liên kết mới tới hàng xóm
-        self.neighbor_links[port] = (endpoint, cost)
-        
-        # Nếu đây là đường đi tốt hơn hoặc chưa từng biết tới endpoint này thì cập nhật bảng DV
-        if endpoint not in self.dv_table or cost < self.dv_table[endpoint][0]:
-            self.dv_table[endpoint] = (cost, endpoint)
-            self.broadcast_dv()
+        self.handle_link_changes([("add", port, endpoint, cost)])
 
     def handle_remove_link(self, port):
-        # Khi một liên kết bị ngắt
-        if port in self.neighbor_links:
-            neighbor = self.neighbor_links[port][0]
-            del self.neighbor_links[port]
-            # Xóa các đường đi mà next_hop là hàng xóm vừa bị ngắt
-            changed = False
-            for dst in list(self.dv_table.keys()):
-                if dst != self.addr and self.dv_table[dst][1] == neighbor:
-                    del self.dv_table[dst]
-                    changed = True
-            
-            if changed:
-                self.broadcast_dv()
+        self.handle_link_changes([("remove", port)])
+
+    def handle_cost_change(self, port, cost):
+        self.handle_link_changes([("cost", port, cost)])
+
+    def handle_link_changes(self, changes):
+        # Áp dụng cả loạt thay đổi liên kết, gom các đích bị ảnh hưởng rồi chọn lại
+        # đường đi và quảng bá một lần cho cả loạt
+        affected = {}
+        new_ports = []
+        changed = False
+        for change in changes:
+            if change[0] == "add":
+                affected.update(dict.fromkeys(self.link_added(*change[1:])))
+                new_ports.append(change[1])
+            elif change[0] == "remove":
+                removed, finished = self.link_removed(change[1])
+                affected.update(dict.fromkeys(removed))
+                changed |= finished
+            elif change[0] == "cost":
+                affected.update(dict.fromkeys(self.link_cost_changed(*change[1:])))
+        # Hàng xóm mới cần bảng đầy đủ làm mốc cho các bản delta sau
+        for port in new_ports:
+            if port in self.neighbor_links:
+                self.send_full_dv(port)
+        changed |= self.update_routes(affected)
+        self.flush_dual()
+        if changed:
+            self.broadcast_dv()
+
+    def link_added(self, port, endpoint, cost):
+        # Thêm liên kết mới tới hàng xóm, trả về các đích cần xét lại
+        self.neighbor_links[port] = (endpoint, cost)
+        # Hàng xóm luôn đến được chính nó với chi phí 0 (client không gửi DV)
+        self.neighbor_dvs[port] = {endpoint: 0}
+        self.received_seq.pop(port, None)
+        self.update_seq[port] = 0
+        # Đường đi tới endpoint có thể tốt hơn hoặc chưa từng được biết tới
+        return [endpoint]
+
+    def link_removed(self, port):
+        # Khi một liên kết bị ngắt: trả về các đích cần xét lại và True nếu một
+        # truy vấn DUAL kết thúc làm bảng DV thay đổi
+        if port not in self.neighbor_links:
+            return [], False
+        neighbor = self.neighbor_links[port][0]
+        del self.neighbor_links[port]
+        del self.neighbor_dvs[port]
+        self.received_seq.pop(port, None)
+        self.update_seq.pop(port, None)
+        self.advertised.pop(port, None)
+        self.dual_out.pop(port, None)
+        # Hàng xóm bị ngắt không còn trả lời (hay chờ trả lời) các truy vấn
+        changed = False
+        for dst in [dst for dst, waiting in self.active.items() if port in waiting]:
+            self.active[dst].discard(port)
+            if not self.active[dst]:
+                changed |= self.finish_query(dst)
+        for waiting in self.pending_replies.values():
+            waiting.discard(port)
+        # Chọn lại đường đi cho các đích có next_hop là hàng xóm vừa bị ngắt,
+        # đích không còn đường đi được thu hồi với chi phí INFINITY
+        affected = [dst for dst, (_, next_hop) in self.dv_table.items() if next_hop == neighbor]
+        return affected, changed
+
+    def link_cost_changed(self, port, cost):
+        # Chi phí liên kết thay đổi: trả về các đích bị ảnh hưởng
+        if port not in self.neighbor_links:
+            return []
+        neighbor, old_cost = self.neighbor_links[port]
+        self.neighbor_links[port] = (neighbor, cost)
+        if cost < old_cost:
+            # Chi phí giảm: mọi đích mà hàng xóm này quảng bá có thể tốt hơn
+            return list(self.neighbor_dvs[port])
+        # Chi phí tăng: chỉ các đích đang đi qua cổng này
+        return [dst for dst, p in self.forwarding_table.items() if p == port]
 
     def handle_packet(self, port, packet):
         if packet.is_traceroute:
-            # Nếu là gói dữ liệu traceroute: chuyển tiếp dựa trên bảng DV
-            dst = packet.dst_addr
-            if dst in self.dv_table:
-                cost, next_hop = self.dv_table[dst]
-                if next_hop is not None:  # Tìm cổng tương ứng với next_hop và gửi gói tin
-                    for p, (neighbor, _) in self.neighbor_links.items():
-                        if neighbor == next_hop:
-                            self.send(p, packet)
-                            break
+            # Nếu là gói dữ liệu traceroute: chuyển tiếp theo FIB
+            out_port = self.forwarding_table.get(packet.dst_addr)
+            if out_port is not None:
+                self.send(out_port, packet)
         elif packet.is_routing:
              # Nếu là gói tin định tuyến: xử lý cập nhật từ hàng xóm
             try:
-                neighbor_dv = json.loads(packet.content)
-                neighbor_addr = packet.src_addr
-                # Cập nhật distance vector
-                changed = False
-                for dst, cost in neighbor_dv.items():
-                    # Không cập nhật đường đi tới chính mình
-                    if dst != str(self.addr):  
-                        neighbor_cost = self.neighbor_links[port][1]
-                        new_cost = cost + neighbor_cost
-                        # Nếu chưa có đường đi hoặc tìm được đường đi tốt hơn thì cập nhật
-                        if dst not in self.dv_table or new_cost < self.dv_table[dst][0]:
-                            self.dv_table[dst] = (new_cost, neighbor_addr)
-                            changed = True
-                        # Nếu next_hop là hàng xóm này và chi phí thay đổi thì cũng cập nhật
-                        elif self.dv_table[dst][1] == neighbor_addr and new_cost != self.dv_table[dst][0]:
-                            self.dv_table[dst] = (new_cost, neighbor_addr)
-                            changed = True
+                kind, _, seq, _, neighbor_dv = codec.decode(packet.content)
+                if port not in self.neighbor_links:
+                    return
+                if kind == codec.REQUEST:
+                    self.send_full_dv(port)
+                    return
+                if kind in (codec.QUERY, codec.REPLY):
+                    self.handle_dual(port, kind, neighbor_dv)
+                    return
+                # Bản delta không nối tiếp bản trước đó: yêu cầu bảng đầy đủ
+                if kind == codec.DV_DELTA and self.received_seq.get(port) != seq - 1:
+                    request = codec.encode(codec.REQUEST, self.addr, 0, {})
+                    self.send(port, Packet(Packet.ROUTING, self.addr, packet.src_addr, request))
+                self.received_seq[port] = seq
+                # Lưu vector của hàng xóm, bảng đầy đủ thay thế toàn bộ vector cũ
+                stored = self.neighbor_dvs[port]
+                affected = list(neighbor_dv)
+                if kind == codec.DV:
+                    affected.extend(dst for dst in stored if dst not in neighbor_dv)
+                    stored.clear()
+                    stored[self.neighbor_links[port][0]] = 0
+                stored.update(neighbor_dv)
                 # Nếu có thay đổi thì gửi DV mới cho các hàng xóm
+                changed = self.update_routes(affected)
+                self.flush_dual()
                 if changed:
                     self.broadcast_dv()
-            except json.JSONDecodeError:
+            except ValueError:
                 pass  
 
-    def handle_time(self, time_ms):  # được gọi liên tục để xem liệu có đủ thời gian gửi DV mới hay ko
-        if time_ms - self.last_broadcast >= self.heartbeat_time:
-            self.broadcast_dv()
+    def handle_time(self, time_ms):  # được gọi liên tục để xem liệu có đủ thời gian gửi bảng đầy đủ hay ko
+        if time_ms - self.last_broadcast >= self.full_update_time:
+            self.broadcast_dv(full=True)
             self.last_broadcast = time_ms
 
-    def broadcast_dv(self):
-        # Gửi bảng vector khoảng cách hiện tại tới tất cả các hàng xóm
-        dv_str = json.dumps({str(dst): cost for dst, (cost, _) in self.dv_table.items()})
-        for port in self.neighbor_links:
-            packet = Packet(Packet.ROUTING, self.addr, self.neighbor_links[port][0], dv_str)
+    def update_routes(self, destinations):
+        # Chọn lại đường đi tốt nhất qua các hàng xóm cho các đích đã cho và cập nhật
+        # FIB, trả về True nếu bảng DV thay đổi
+        self.route_computations += 1
+        changed = False
+        for dst in destinations:
+            if dst == self.addr:
+                continue
+            if self.dual:
+                changed |= self.dual_route(dst)
+            else:
+                changed |= self.set_route(dst, *self.best_route(dst))
+        return changed
+
+    def best_route(self, dst, feasible_distance=None):
+        # Trả về (chi phí, next_hop, cổng) tốt nhất đến `dst` qua các hàng xóm, chỉ
+        # xét hàng xóm báo chi phí nhỏ hơn `feasible_distance` nếu được cho
+        # (ưu tiên giữ cổng hiện tại khi chi phí bằng nhau)
+        current_port = self.forwarding_table.get(dst)
+        best_cost, best_hop, best_port = self.INFINITY, None, None
+        for port, (neighbor, link_cost) in self.neighbor_links.items():
+            cost = self.neighbor_dvs[port].get(dst)
+            if cost is None:
+                continue
+            if feasible_distance is not None and cost >= feasible_distance:
+                continue
+            # Chi phí từ INFINITY trở lên nghĩa là không đến được
+            cost = min(cost + link_cost, self.INFINITY)
+            if cost < best_cost or (
+                cost == best_cost and cost < self.INFINITY and port == current_port
+            ):
+                best_cost, best_hop, best_port = cost, neighbor, port
+        return best_cost, best_hop, best_port
+
+    def set_route(self, dst, cost, next_hop, port):
+        # Ghi đường đi vào bảng DV và FIB, trả về True nếu bảng DV thay đổi
+        current = self.dv_table.get(dst)
+        if next_hop is None and current is None:
+            return False
+        if port != self.forwarding_table.get(dst):
+            # Cập nhật FIB theo đường đi mới
+            if port is None:
+                del self.forwarding_table[dst]
+            else:
+                self.forwarding_table[dst] = port
+        if (cost, next_hop) != current:
+            self.dv_table[dst] = (cost, next_hop)
+            return True
+        return False
+
+    def dual_route(self, dst):
+        # Tính toán cục bộ kiểu DUAL cho một đích
+        feasible_distance = self.feasible_distance.get(dst, self.INFINITY)
+        if dst in self.active:
+            # Đang truy vấn: truy vấn vẫn tiếp tục, đường đi theo thông tin mới nhất
+            return self.active_route(dst)
+        cost, next_hop, port = self.best_route(dst, feasible_distance)
+        if next_hop is not None:
+            # Có feasible successor: chuyển sang ngay, không cần truy vấn
+            self.feasible_distance[dst] = min(feasible_distance, cost)
+            return self.set_route(dst, cost, next_hop, port)
+        cost, next_hop, port = self.best_route(dst)
+        queried = [p for p in self.neighbor_links if p in self.received_seq]
+        if next_hop is None or feasible_distance >= self.INFINITY or not queried:
+            # Không hàng xóm nào đến được đích (hoặc chưa từng có đường đi)
+            self.feasible_distance[dst] = cost
+            return self.set_route(dst, cost, next_hop, port)
+        # Không có feasible successor: truy vấn tất cả các hàng xóm là router
+        self.active[dst] = set(queried)
+        changed = self.active_route(dst)
+        for p in queried:
+            self.queue_dual(p, codec.QUERY, dst)
+        return changed
+
+    def active_route(self, dst):
+        # Đích đang truy vấn: dùng và quảng bá đường tốt nhất hiện có (có thể không khả
+        # thi) cho đến khi truy vấn xong, thay vì giữ successor cũ kém hơn hoặc quảng bá
+        # INFINITY, để hàng xóm và gói dữ liệu không phải chờ truy vấn. Feasible
+        # distance chỉ được đặt lại khi truy vấn xong
+        return self.set_route(dst, *self.best_route(dst))
+
+    def finish_query(self, dst):
+        # Mọi hàng xóm đã trả lời: chọn đường tốt nhất, đặt lại feasible distance
+        # và trả lời các hàng xóm đang chờ
+        del self.active[dst]
+        cost, next_hop, port = self.best_route(dst)
+        self.feasible_distance[dst] = cost
+        changed = self.set_route(dst, cost, next_hop, port)
+        for p in self.pending_replies.pop(dst, ()):
+            self.queue_dual(p, codec.REPLY, dst)
+        return changed
+
+    def handle_dual(self, port, kind, costs):
+        # Xử lý truy vấn hoặc trả lời của một hàng xóm (kèm chi phí mới của nó)
+        self.neighbor_dvs[port].update(costs)
+        changed = False
+        for dst in costs:
+            if kind == codec.REPLY:
+                if dst in self.active:
+                    self.active[dst].discard(port)
+                    if not self.active[dst]:
+                        changed |= self.finish_query(dst)
+                elif dst != self.addr:
+                    changed |= self.dual_route(dst)
+                continue
+            was_active = dst in self.active
+            if dst != self.addr:
+                changed |= self.dual_route(dst)
+            if dst in self.active and not was_active:
+                # Đích vừa chuyển sang truy vấn vì hàng xóm này: trả lời sau
+                self.pending_replies.setdefault(dst, set()).add(port)
+            else:
+                self.queue_dual(port, codec.REPLY, dst)
+        self.flush_dual()
+        if changed:
+            self.broadcast_dv()
+
+    def queue_dual(self, port, kind, dst):
+        # Thêm một đích vào tin truy vấn/trả lời sẽ gửi cho hàng xóm ở `port`
+        neighbor = self.neighbor_links[port][0]
+        cost = self.view_for(neighbor, {dst: self.dv_table.get(dst, (self.INFINITY, None))})
+        self.dual_out.setdefault(port, {}).setdefault(kind, {}).update(
+            {dst: cost.get(dst, self.INFINITY)}
+        )
+
+    def flush_dual(self):
+        # Gửi các tin truy vấn/trả lời đã gom, mỗi hàng xóm một tin cho mỗi loại
+        for port, messages in self.dual_out.items():
+            neighbor = self.neighbor_links[port][0]
+            for kind, costs in messages.items():
+                content = codec.encode(kind, self.addr, 0, costs)
+                self.send(port, Packet(Packet.ROUTING, self.addr, neighbor, content))
+                self.bytes_sent += len(content)
+                self.bytes_full += len(content)
+                # Hàng xóm đã biết các chi phí này, bản delta sau không cần gửi lại
+                self.advertised.setdefault(port, {}).update(costs)
+        self.dual_out = {}
+
+    def view_for(self, neighbor, routes, advertised=None):
+        # Bảng DV quảng bá cho một hàng xóm theo chế độ split horizon
+        if self.horizon == "none":
+            return {dst: cost for dst, (cost, _) in routes.items()}
+        if self.horizon == "poison":
+            return {
+                dst: self.INFINITY if next_hop == neighbor else cost
+                for dst, (cost, next_hop) in routes.items()
+            }
+        # Split horizon: bỏ qua các đích đi qua hàng xóm, nhưng một bản delta phải thu
+        # hồi (INFINITY) đích đã từng được quảng bá cho hàng xóm đó
+        advertised = advertised or {}
+        return {
+            dst: cost if next_hop != neighbor else self.INFINITY
+            for dst, (cost, next_hop) in routes.items()
+            if next_hop != neighbor or advertised.get(dst, self.INFINITY) < self.INFINITY
+        }
+
+    def broadcast_dv(self, full=False):
+        # Gửi các mục thay đổi từ lần quảng bá trước (hoặc cả bảng) tới tất cả các hàng xóm
+        if full:
+            changed = self.dv_table
+        else:
+            previous = self.advertised_routes
+            changed = {
+                dst: route
+                for dst, route in self.dv_table.items()
+                if previous.get(dst) != route
+            }
+            if not changed:
+                return
+        self.advertised_routes = dict(self.dv_table)
+        full_size = None
+        for port, (neighbor, _) in self.neighbor_links.items():
+            advertised = self.advertised.setdefault(port, {})
+            view = self.view_for(neighbor, changed, None if full else advertised)
+            if full:
+                kind, update = codec.DV, view
+                advertised.clear()
+            else:
+                kind = codec.DV_DELTA
+                update = {dst: cost for dst, cost in view.items() if advertised.get(dst) != cost}
+                if not update:
+                    continue
+            advertised.update(update)
+            self.update_seq[port] += 1
+            dv_str = codec.encode(kind, self.addr, self.update_seq[port], update)
+            packet = Packet(Packet.ROUTING, self.addr, neighbor, dv_str)
             self.send(port, packet)
+            if full_size is None:
+                # Kích thước bảng đầy đủ, dùng làm mốc so sánh cho các bản delta
+                full_size = len(dv_str) if full else len(
+                    codec.encode(codec.DV, self.addr, 0, self.view_for(None, self.dv_table))
+                )
+            self.bytes_sent += len(dv_str)
+            self.bytes_full += full_size
+
+    def send_full_dv(self, port):
+        # Gửi bảng đã quảng bá gần nhất (cùng số thứ tự) tới một hàng xóm
+        neighbor = self.neighbor_links[port][0]
+        view = self.view_for(neighbor, self.advertised_routes)
+        self.advertised[port] = dict(view)
+        dv_str = codec.encode(codec.DV, self.addr, self.update_seq[port], view)
+        packet = Packet(Packet.ROUTING, self.addr, neighbor, dv_str)
+        self.send(port, packet)
+        self.bytes_sent += len(dv_str)
+        self.bytes_full += len(dv_str)
     
     def __repr__(self):
-        return f"DVrouter(addr={self.addr}, dv={self.dv_table})"
\ No newline at end of file
+        return (
+            f"DVrouter(addr={self.addr}, dv={self.dv_table}, "
+            f"bytes_saved={self.bytes_full - self.bytes_sent})"
+        )
\ No newline at end of file
@@ -5,11 +5,16 @@
 #####################################################
 
 import heapq
-import json
+import zlib
 
+import codec
+import spf
 from packet import Packet
 from router import Router
 
+# Vùng backbone (area 0): mọi ABR phải thuộc vùng này
+BACKBONE = "0"
+
 
 class LSrouter(Router):
     """Link state routing protocol implementation.
@@ -19,19 +24,93 @@ class LSrouter(Router):
     override.
     """
 
-    def __init__(self, addr, heartbeat_time):
+    def __init__(
+        self,
+        addr,
+        heartbeat_time,
+        spf_initial_delay=0,
+        spf_hold_time=50,
+        spf_max_hold_time=1000,
+        lsa_refresh_time=None,
+        lsa_max_age=None,
+        db_sync=True,
+        ecmp=True,
+        lfa=False,
+        spf_engine="auto",
+    ):
         """
         # Khởi tạo router với địa chỉ và thời gian nhịp tim
         # Thiết lập các cấu trúc dữ liệu cần thiết để quản lý mạng
+        # spf_initial_delay, spf_hold_time, spf_max_hold_time (ms): điều tiết SPF
+        # kiểu OSPF với thời gian chờ tăng gấp đôi khi SPF bị yêu cầu liên tục
+        # lsa_refresh_time (ms): chu kỳ quảng bá lại LSA khi không có thay đổi
+        # (mặc định 10 nhịp tim), lsa_max_age (ms): tuổi tối đa của một LSA trước
+        # khi bị xóa khỏi cơ sở dữ liệu (mặc định 3 chu kỳ quảng bá lại)
+        # db_sync: đồng bộ cơ sở dữ liệu LSA với láng giềng khi có liên kết mới
+        # ecmp: giữ mọi cổng ra có cùng chi phí nhỏ nhất và chia tải theo luồng
+        # lfa: tính trước cổng dự phòng không lặp (loop-free alternate, RFC 5286) sau
+        # mỗi lần SPF; khi mất một liên kết, các đích không còn cổng ra chuyển ngay
+        # sang cổng này, trước khi chạy lại SPF. Tắt theo mặc định: mỗi lần SPF tốn
+        # thêm một SPF đầy đủ cho mỗi láng giềng, và theo bench_lfa nó chỉ giảm số gói
+        # bị mất khi SPF bị trì hoãn (spf_initial_delay 500 ms: 60 -> 35 trên
+        # 06_pg242), thời gian lỗ đen vẫn là 300 ms
+        # spf_engine: thuật toán SPF đầy đủ ("heap", "dial", "array" hoặc "auto",
+        # xem spf.py), tự quay về heap khi chi phí không phải số nguyên nhỏ. Được dùng
+        # khi tính lại toàn bộ cây (nhiều cạnh thay đổi cùng lúc, ví dụ khi đồng bộ cơ
+        # sở dữ liệu, hoặc SPF tăng dần phải tính lại quá nửa cây) và cho SPF của láng
+        # giềng khi tính LFA; các thay đổi nhỏ dùng SPF tăng dần
         """
         Router.__init__(self, addr)  # Initialize base class
         self.heartbeat_time = heartbeat_time
-        self.last_time = 0
+        self.lsa_refresh_time = lsa_refresh_time or 10 * heartbeat_time
+        self.lsa_max_age = lsa_max_age or 3 * self.lsa_refresh_time
+        self.last_time = 0            # Thời điểm quảng bá LSA gần nhất
+        self.last_age_check = 0
+        self.now_ms = 0               # Thời điểm gần nhất handle_time được gọi
+        self.clock_started = False
         self.topology = {self.addr: {}}
-        self.forwarding_table = {}
+        self.reverse_topology = {}    # Cạnh đi vào: nút -> {nút nguồn: chi phí}
+        self.spf_engine = spf.make_engine(spf_engine, self.topology)
+        self.forwarding_table = {}    # Đích -> tuple các cổng ra cùng chi phí
         self.seq_numbers = {self.addr: 0}
+        self.lsa_birth = {}           # Thời điểm (ước tính) LSA được tạo ra
         self.port_to_neighbor = {}
         self.neighbor_to_port = {}
+        self.lsa_cache = codec.LSACache()  # Giải mã mỗi LSA một lần
+        self.db_sync = db_sync
+        # Cây đường đi ngắn nhất được giữ lại giữa các lần tính toán
+        self.dist = {self.addr: 0}
+        self.parent = {}
+        self.children = {}
+        self.first_hop = {}
+        # ECMP: tập nút kề đầu tiên trên mọi đường đi ngắn nhất đến mỗi nút
+        self.ecmp = ecmp
+        self.equal_cost_hops = {}
+        self.spf_dirty = set()        # Các nút cần tính lại tập nút kề đầu tiên
+        self.flow_seed = zlib.crc32(addr.encode())
+        self.port_packets = {}        # Bộ đếm gói tin dữ liệu gửi ra mỗi cổng
+        self.port_destinations = {}   # Cổng -> các đích dùng cổng này trong bảng chuyển tiếp
+        # LFA: đích -> cổng dự phòng, tính lại sau mỗi lần SPF (xem compute_lfas)
+        self.lfa = lfa
+        self.lfa_ports = {}
+        # Điều tiết SPF: các cạnh thay đổi được gom lại cho lần SPF kế tiếp
+        self.spf_initial_delay = spf_initial_delay
+        self.spf_hold_time = spf_hold_time
+        self.spf_max_hold_time = spf_max_hold_time
+        self.spf_current_hold = spf_hold_time
+        self.spf_changes = {}         # (origin, v) -> [chi phí cũ, chi phí mới]
+        self.spf_due = None           # Thời điểm chạy SPF đã lên lịch
+        self.last_spf_time = None
+        self.spf_requested = 0
+        self.spf_executed = 0
+        # Vùng kiểu OSPF: mỗi cổng thuộc vùng của liên kết (None nếu mạng không chia
+        # vùng), LSA chỉ được flood trong vùng mà nó được nhận. Router thuộc nhiều vùng
+        # (ABR) tạo một LSA tóm tắt cho mỗi vùng với origin ảo "<addr>/<vùng>"
+        self.port_areas = {}          # Cổng -> vùng
+        self.area_seq = {}            # (vùng, origin) -> số thứ tự đã flood trong vùng
+        self.lsa_areas = {}           # Origin -> các vùng đã nhận LSA của nó
+        self.summary_lsas = {}        # Vùng -> LSA tóm tắt của mình {đích: chi phí}
+        self.hidden_lsas = {}         # LSA tóm tắt của vùng thường mà ABR không dùng
 
     def handle_packet(self, port, packet):
         """
@@ -40,26 +119,57 @@ class LSrouter(Router):
         """
         if packet.is_traceroute:
             # Gói tin dữ liệu - chuyển tiếp nếu biết cổng ra
-            if packet.dst_addr in self.forwarding_table:
-                out_port = self.forwarding_table[packet.dst_addr]
+            ports = self.forwarding_table.get(packet.dst_addr)
+            if ports:
+                if len(ports) == 1:
+                    out_port = ports[0]
+                else:
+                    # Băm luồng (src, dst): mỗi luồng luôn đi cùng một đường
+                    flow = f"{packet.src_addr}\0{packet.dst_addr}".encode()
+                    out_port = ports[zlib.crc32(flow, self.flow_seed) % len(ports)]
+                self.port_packets[out_port] = self.port_packets.get(out_port, 0) + 1
                 self.send(out_port, packet)
         else:
             # Gói tin định tuyến - xử lý thông tin trạng thái đường link
             try:
-                router_addr, seq_number, link_state = json.loads(packet.content)
+                kind = codec.decode_header(packet.content)[0]
+                if kind == codec.SUMMARY:
+                    self.handle_summary(port, packet)
+                    return
+                if kind == codec.REQUEST:
+                    self.handle_request(port, packet)
+                    return
+                router_addr, seq_number, age, link_state = self.lsa_cache.decode(
+                    packet.content
+                )
+                # Bỏ qua LSA đã quá tuổi tối đa
+                if age >= self.lsa_max_age:
+                    return
+                newer = (
+                    router_addr not in self.seq_numbers
+                    or seq_number > self.seq_numbers[router_addr]
+                )
+                area = self.port_areas.get(port)
+                if area is not None:
+                    # Chia vùng: flood mỗi LSA một lần trong mỗi vùng nhận được nó
+                    key = (area, router_addr)
+                    if self.is_own(router_addr) or seq_number <= self.area_seq.get(key, 0):
+                        return
+                    self.area_seq[key] = seq_number
+                    self.lsa_areas.setdefault(router_addr, set()).add(area)
+                elif not newer:
+                    return
                 # Chỉ xử lý nếu thông tin mới hơn thông tin hiện có
-                if router_addr not in self.seq_numbers or seq_number > self.seq_numbers[router_addr]:
+                if newer:
                     self.seq_numbers[router_addr] = seq_number
-                    self.topology[router_addr] = link_state
+                    self.lsa_birth[router_addr] = self.now_ms - age
+                    self.store_link_state(router_addr, link_state)
 
-                    # Tính toán lại bảng chuyển tiếp khi có thông tin mới
-                    self.compute_forwarding_table()
-
-                    # Chuyển tiếp gói tin đến các nút lân cận khác
-                    for neighbor_port in self.links:
-                        if neighbor_port != port:
-                            self.send(neighbor_port, packet)
-            except (json.JSONDecodeError, ValueError):
+                # Chuyển tiếp gói tin đến các nút lân cận khác (cùng vùng)
+                for neighbor_port in self.links:
+                    if neighbor_port != port and self.port_areas.get(neighbor_port) == area:
+                        self.send(neighbor_port, packet)
+            except ValueError:
                 pass
 
     def handle_new_link(self, port, endpoint, cost):
@@ -67,36 +177,119 @@ class LSrouter(Router):
         # Xử lý khi có một liên kết mới được thiết lập
         # Cập nhật thông tin topology và tính toán lại đường đi
         """
-        self.port_to_neighbor[port] = endpoint
-        self.neighbor_to_port[endpoint] = port
-        self.topology[self.addr][endpoint] = cost
-        self.compute_forwarding_table()
-        self.broadcast_link_state()
+        self.handle_link_changes([("add", port, endpoint, cost)])
 
     def handle_remove_link(self, port):
         """
         # Xử lý khi một liên kết bị ngắt kết nối
         # Cập nhật lại thông tin topology và tính toán lại đường đi
         """
-        if port in self.port_to_neighbor:
-            endpoint = self.port_to_neighbor[port]
+        self.handle_link_changes([("remove", port)])
 
-            del self.port_to_neighbor[port]
-            del self.neighbor_to_port[endpoint]
+    def handle_cost_change(self, port, cost):
+        """
+        # Xử lý khi chi phí một liên kết thay đổi (liên kết vẫn hoạt động)
+        # Chỉ cần cập nhật và quảng bá lại LSA của chính router này
+        """
+        self.handle_link_changes([("cost", port, cost)])
 
-            if endpoint in self.topology[self.addr]:
-                del self.topology[self.addr][endpoint]
-            self.compute_forwarding_table()
-            self.broadcast_link_state()
+    def handle_link_changes(self, changes):
+        """
+        # Xử lý một loạt thay đổi liên kết cùng lúc
+        # Áp dụng tất cả vào một bản sao LSA của router, sau đó chỉ cập nhật
+        # topology, yêu cầu SPF và quảng bá LSA một lần cho cả loạt
+        # Chi phí liên kết luôn dương (Network kiểm tra khi đọc JSON): cạnh chi phí 0
+        # chỉ dùng cho origin ảo của ABR, nên đồ thị không có chu trình chi phí 0
+        # (xem update_equal_cost_hops)
+        """
+        link_state = dict(self.topology[self.addr])
+        new_ports = []
+        changed = False
+        for change in changes:
+            if change[0] == "add":
+                _, port, endpoint, cost = change
+                self.port_to_neighbor[port] = endpoint
+                self.neighbor_to_port[endpoint] = port
+                self.port_areas[port] = getattr(self.links.get(port), "area", None)
+                link_state[endpoint] = cost
+                new_ports.append(port)
+                changed = True
+            elif change[0] == "remove":
+                port = change[1]
+                if port not in self.port_to_neighbor:
+                    continue
+                endpoint = self.port_to_neighbor.pop(port)
+                del self.neighbor_to_port[endpoint]
+
+                # Chuyển ngay các đích dùng cổng này sang cổng cùng chi phí còn lại hoặc
+                # cổng dự phòng LFA đã tính trước, trước khi SPF (có thể bị điều tiết)
+                # được chạy lại
+                for dst in list(self.port_destinations.pop(port, ())):
+                    ports = tuple(p for p in self.forwarding_table[dst] if p != port)
+                    if not ports:
+                        backup = self.lfa_ports.get(dst)
+                        if backup in self.port_to_neighbor:
+                            ports = (backup,)
+                    self.set_forwarding(dst, ports)
+
+                self.port_areas.pop(port, None)
+                link_state.pop(endpoint, None)
+                changed = True
+            elif change[0] == "cost":
+                _, port, cost = change
+                endpoint = self.port_to_neighbor.get(port)
+                if endpoint is not None:
+                    link_state[endpoint] = cost
+                    changed = True
+        if not changed:
+            return
+
+        self.update_areas(link_state)
+        self.update_link_state(self.addr, link_state)
+        self.broadcast_link_state()
+        if self.db_sync:
+            for port in new_ports:
+                if port in self.port_to_neighbor:
+                    self.send_summary(port)
 
     def handle_time(self, time_ms):
         """
         # Xử lý theo thời gian
-        # Thực hiện quảng bá định kỳ thông tin trạng thái đường link
+        # Quảng bá lại LSA theo chu kỳ dài và xóa các LSA đã quá tuổi
+        # (LSA được quảng bá ngay khi liên kết thay đổi, xem handle_new_link)
         """
-        if time_ms - self.last_time >= self.heartbeat_time:
-            self.last_time = time_ms
+        if not self.clock_started:
+            # Các thời điểm ghi nhận trước lần gọi đầu tiên được tính từ 0
+            self.clock_started = True
+            for origin in self.lsa_birth:
+                self.lsa_birth[origin] += time_ms
+            self.last_time += time_ms
+        self.now_ms = time_ms
+        if self.spf_due is not None and time_ms >= self.spf_due:
+            self.run_spf()
+        if time_ms - self.last_time >= self.lsa_refresh_time:
             self.broadcast_link_state()
+            self.originate_summaries(refresh=True)
+        if time_ms - self.last_age_check >= self.heartbeat_time:
+            self.last_age_check = time_ms
+            self.age_link_states()
+
+    def age_link_states(self):
+        """
+        # Xóa LSA của các router không còn làm mới LSA (không đến được hoặc đã biến mất)
+        """
+        for origin, birth in list(self.lsa_birth.items()):
+            if not self.is_own(origin) and self.now_ms - birth >= self.lsa_max_age:
+                if origin in self.hidden_lsas:
+                    del self.hidden_lsas[origin]
+                else:
+                    self.update_link_state(origin, {})
+                    del self.topology[origin]
+                del self.lsa_birth[origin]
+                self.seq_numbers.pop(origin, None)
+                self.lsa_cache.discard(origin)
+                for area in self.lsa_areas.pop(origin, ()):
+                    self.area_seq.pop((area, origin), None)
 
     def broadcast_link_state(self):
         """
@@ -109,61 +302,514 @@ class LSrouter(Router):
             
         # Tăng số thứ tự để đánh dấu cập nhật mới
         self.seq_numbers[self.addr] += 1
+        self.last_time = self.now_ms
+        self.lsa_birth[self.addr] = self.now_ms
         
         # Đóng gói thông tin trạng thái đường link
-        link_state_info = [self.addr, self.seq_numbers[self.addr], self.topology[self.addr]]
-        content = json.dumps(link_state_info)
+        content = codec.encode(
+            codec.LSA, self.addr, self.seq_numbers[self.addr], self.topology[self.addr]
+        )
 
         # Gửi gói tin đến tất cả các cổng kết nối
         for port in self.links:
             packet = Packet(Packet.ROUTING, self.addr, self.port_to_neighbor.get(port, "Unknown"), content)
             self.send(port, packet)
 
+    def send_summary(self, port):
+        """
+        # Gửi bản tóm tắt cơ sở dữ liệu (origin -> số thứ tự) cho láng giềng mới
+        # để hai bên chỉ trao đổi các LSA còn thiếu hoặc đã cũ
+        """
+        area = self.port_areas.get(port)
+        seq_numbers = self.seq_numbers
+        if area is not None:
+            # Chỉ tóm tắt các LSA được flood trong vùng của cổng này
+            seq_numbers = {
+                origin: seq
+                for origin, seq in seq_numbers.items()
+                if origin == self.addr
+                or origin == self.summary_origin(area)
+                or area in self.lsa_areas.get(origin, ())
+            }
+        content = codec.encode(codec.SUMMARY, self.addr, 0, seq_numbers)
+        neighbor = self.port_to_neighbor.get(port, "Unknown")
+        self.send(port, Packet(Packet.ROUTING, self.addr, neighbor, content))
+
+    def handle_summary(self, port, packet):
+        """
+        # Yêu cầu các LSA mà láng giềng có phiên bản mới hơn (hoặc mình chưa có)
+        """
+        _, neighbor, _, _, summary = codec.decode(packet.content)
+        wanted = {
+            origin: seq
+            for origin, seq in summary.items()
+            if not self.is_own(origin) and seq > self.seq_numbers.get(origin, 0)
+        }
+        if wanted:
+            content = codec.encode(codec.REQUEST, self.addr, 0, wanted)
+            self.send(port, Packet(Packet.ROUTING, self.addr, neighbor, content))
+
+    def handle_request(self, port, packet):
+        """
+        # Gửi lại các LSA được yêu cầu với tuổi hiện tại của chúng
+        """
+        _, neighbor, _, _, wanted = codec.decode(packet.content)
+        for origin in wanted:
+            link_state = self.lsa_content(origin)
+            if link_state is None or origin not in self.lsa_birth:
+                continue
+            content = codec.encode(
+                codec.LSA,
+                origin,
+                self.seq_numbers[origin],
+                link_state,
+                age=max(self.now_ms - self.lsa_birth[origin], 0),
+            )
+            self.send(port, Packet(Packet.ROUTING, origin, neighbor, content))
+
     def compute_forwarding_table(self):
         """
-        # Tính toán bảng chuyển tiếp sử dụng thuật toán Dijkstra
+        # Tính toán bảng chuyển tiếp bằng engine SPF đã chọn (SPF đầy đủ)
         # Xác định đường đi ngắn nhất từ router hiện tại đến tất cả các điểm đến
+        # Được dùng khi SPF tăng dần phải tính lại phần lớn cây (xem incremental_spf)
         """
-        # Khởi tạo các cấu trúc dữ liệu cho thuật toán
-        dist = {self.addr: 0}         # Khoảng cách từ nguồn đến các nút
-        prev = {}                     # Lưu nút trước đó trên đường đi ngắn nhất
-        first_hop = {}                # Lưu nút đầu tiên trên đường đi
-        pq = [(0, self.addr)]         # Hàng đợi ưu tiên (khoảng cách, nút)
+        dist, prev, first_hop = self.spf_engine.shortest_path_tree(self.addr)
 
-        # Thực hiện thuật toán Dijkstra
-        while pq:
-            # Lấy nút có khoảng cách nhỏ nhất
-            current_dist, current = heapq.heappop(pq)
-            
-            # Bỏ qua nếu đã tìm thấy đường đi tốt hơn
-            if current in dist and current_dist > dist[current]:
-                continue
-                
-            # Duyệt qua các nút kề
-            if current in self.topology:
-                for neighbor, cost in self.topology[current].items():
-                    # Tính khoảng cách mới
-                    new_dist = current_dist + cost
-                    
-                    # Cập nhật nếu tìm được đường đi ngắn hơn
-                    if neighbor not in dist or new_dist < dist[neighbor]:
-                        dist[neighbor] = new_dist
-                        prev[neighbor] = current
-                        
-                        # Cập nhật thông tin về nút đầu tiên trên đường đi
-                        if current == self.addr:
-                            first_hop[neighbor] = neighbor
-                        elif current in first_hop:
-                            first_hop[neighbor] = first_hop[current]
-                            
-                        # Thêm vào hàng đợi để tiếp tục xử lý
-                        heapq.heappush(pq, (new_dist, neighbor))
+        # Lưu lại cây đường đi để các lần cập nhật sau có thể tính tăng dần
+        self.spf_changes = {}
+        self.dist = dist
+        self.parent = prev
+        self.first_hop = first_hop
+        self.children = {}
+        for node, parent in prev.items():
+            self.children.setdefault(parent, set()).add(node)
 
         # Xây dựng bảng chuyển tiếp từ kết quả thuật toán
         self.forwarding_table = {}
-        for dst in first_hop:
-            if first_hop[dst] in self.neighbor_to_port:
-                self.forwarding_table[dst] = self.neighbor_to_port[first_hop[dst]]
+        self.port_destinations = {}
+        self.equal_cost_hops = {}
+        self.spf_dirty = set(dist)
+        self.update_equal_cost_hops()
+
+    def update_link_state(self, origin, link_state):
+        """
+        # Lưu trạng thái đường link mới của `origin` và yêu cầu chạy SPF
+        # Không làm gì nếu nội dung giống hệt trạng thái đã lưu
+        """
+        old_state = self.topology.get(origin)
+        if link_state == old_state:
+            return
+        old_state = old_state or {}
+        self.topology[origin] = link_state
+        self.spf_engine.update(origin)
+
+        # Ghi lại các cạnh (origin -> v) bị thay đổi và cập nhật cạnh đi vào
+        for v in old_state.keys() | link_state.keys():
+            old_cost, new_cost = old_state.get(v), link_state.get(v)
+            if old_cost == new_cost:
+                continue
+            if (origin, v) in self.spf_changes:
+                self.spf_changes[(origin, v)][1] = new_cost
+            else:
+                self.spf_changes[(origin, v)] = [old_cost, new_cost]
+            if new_cost is None:
+                del self.reverse_topology[v][origin]
+            else:
+                self.reverse_topology.setdefault(v, {})[origin] = new_cost
+        self.request_spf()
+
+    def request_spf(self):
+        """
+        # Lên lịch chạy SPF theo cơ chế điều tiết (initial delay, hold, back-off)
+        # Các yêu cầu đến trước khi SPF chạy được gộp vào cùng một lần tính toán
+        """
+        self.spf_requested += 1
+        if self.spf_due is None:
+            quiet = (
+                self.last_spf_time is None
+                or self.now_ms - self.last_spf_time >= self.spf_current_hold
+            )
+            if quiet:
+                # Mạng ổn định: chạy sau initial delay và đặt lại thời gian chờ
+                self.spf_current_hold = self.spf_hold_time
+                self.spf_due = self.now_ms + self.spf_initial_delay
+            else:
+                # SPF vừa chạy: chờ hết hold time, lần sau chờ gấp đôi
+                self.spf_due = self.last_spf_time + self.spf_current_hold
+                self.spf_current_hold = min(
+                    2 * self.spf_current_hold, self.spf_max_hold_time
+                )
+        if self.spf_due <= self.now_ms:
+            self.run_spf()
+
+    def run_spf(self):
+        """
+        # Chạy SPF một lần cho tất cả các cạnh thay đổi đang chờ
+        """
+        self.spf_due = None
+        changed = [
+            (origin, v, old_cost, new_cost)
+            for (origin, v), (old_cost, new_cost) in self.spf_changes.items()
+            if old_cost != new_cost and v != self.addr
+        ]
+        self.spf_changes = {}
+        if not changed:
+            return
+        self.spf_executed += 1
+        self.last_spf_time = self.now_ms
+
+        # Nếu chỉ các nút lá (ví dụ client) bị ảnh hưởng thì chỉ cần xét lại chúng
+        if all(not self.topology.get(v) for _, v, _, _ in changed):
+            for v in {v for _, v, _, _ in changed}:
+                self.update_leaf(v)
+        elif len(changed) > len(self.dist) or not self.incremental_spf(changed):
+            # Nhiều cạnh thay đổi hơn số nút trên cây (ví dụ sau khi đồng bộ cơ sở dữ
+            # liệu): SPF đầy đủ bằng engine đã chọn
+            self.compute_forwarding_table()
+        # Cạnh thay đổi có thể thêm hoặc bớt một đường cùng chi phí đến v
+        self.spf_dirty.update(v for _, v, _, _ in changed)
+        self.update_equal_cost_hops()
+        if self.lfa:
+            # Cổng dự phòng cho các đích chỉ có một cổng ra (đích ECMP còn cổng khác)
+            self.lfa_ports = self.compute_lfas(
+                dst for dst, ports in self.forwarding_table.items() if len(ports) == 1
+            )
+        self.originate_summaries()
+
+    def summary_origin(self, area):
+        """
+        # Origin ảo của LSA tóm tắt mà router này tạo cho vùng `area`
+        """
+        return f"{self.addr}/{area}"
+
+    def is_own(self, origin):
+        """
+        # LSA của chính router này (LSA router hoặc LSA tóm tắt)
+        """
+        return origin == self.addr or origin.rpartition("/")[0] == self.addr
+
+    def uses_lsa(self, origin):
+        """
+        # ABR bỏ qua LSA tóm tắt nhận từ vùng thường (nó đã biết topology của vùng đó),
+        # tránh vòng lặp giữa các LSA tóm tắt của các ABR
+        """
+        _, separator, area = origin.rpartition("/")
+        return not separator or area == BACKBONE or len(self.summary_lsas) == 0
+
+    def lsa_content(self, origin):
+        """
+        # Nội dung LSA đang lưu của `origin` (None nếu không có)
+        """
+        owner, _, area = origin.rpartition("/")
+        if owner == self.addr:
+            return self.summary_lsas.get(area)
+        if origin in self.hidden_lsas:
+            return self.hidden_lsas[origin]
+        return self.topology.get(origin)
+
+    def store_link_state(self, origin, link_state):
+        """
+        # Lưu LSA nhận được: vào topology để tính SPF, hoặc chỉ giữ lại để đồng bộ
+        # cơ sở dữ liệu nếu router không dùng nó
+        """
+        if self.uses_lsa(origin):
+            # Cập nhật cây đường đi (bỏ qua nếu nội dung không thay đổi)
+            self.update_link_state(origin, link_state)
+        else:
+            self.hidden_lsas[origin] = link_state
+
+    def update_areas(self, link_state):
+        """
+        # Cập nhật vai trò ABR theo vùng của các cổng: ABR có cạnh chi phí 0 đến origin
+        # ảo của mỗi LSA tóm tắt của nó trong LSA router `link_state`
+        """
+        areas = set(self.port_areas.values()) - {None}
+        for node in [n for n in link_state if n.rpartition("/")[0] == self.addr]:
+            del link_state[node]
+        was_abr = len(self.summary_lsas) > 0
+        if len(areas) > 1:
+            for area in areas:
+                link_state[self.summary_origin(area)] = 0
+            for area in list(self.summary_lsas):
+                if area not in areas:
+                    del self.summary_lsas[area]
+            for area in areas:
+                self.summary_lsas.setdefault(area, None)
+        else:
+            self.summary_lsas = {}
+        if was_abr == (len(self.summary_lsas) > 0):
+            return
+        # Vai trò ABR thay đổi: chuyển LSA tóm tắt của vùng thường vào/ra khỏi topology
+        for origin in [o for o in self.topology if o != self.addr and not self.uses_lsa(o)]:
+            self.hidden_lsas[origin] = self.topology[origin]
+            self.update_link_state(origin, {})
+            del self.topology[origin]
+        for origin in [o for o in self.hidden_lsas if self.uses_lsa(o)]:
+            self.update_link_state(origin, self.hidden_lsas.pop(origin))
+
+    def originate_summaries(self, refresh=False):
+        """
+        # ABR: tạo LSA tóm tắt cho mỗi vùng và flood trong vùng đó nếu nội dung thay
+        # đổi (hoặc khi quảng bá lại định kỳ). Vào backbone: khoảng cách chỉ tính trên
+        # các LSA router; vào vùng thường: khoảng cách SPF đầy đủ (cả tóm tắt backbone)
+        # Như LSA loại 3 của OSPF, tóm tắt chỉ chứa các đích ngoài vùng nhận nó: các
+        # router trong vùng đã biết những đích có trong LSA router của vùng
+        """
+        router_dist = None
+        for area, old_costs in list(self.summary_lsas.items()):
+            if area == BACKBONE:
+                if router_dist is None:
+                    router_links = {
+                        origin: links
+                        for origin, links in self.topology.items()
+                        if "/" not in origin
+                    }
+                    router_dist = spf.heap_spf(router_links, self.addr)[0]
+                dist = router_dist
+            else:
+                dist = self.dist
+            known = self.area_destinations(area)
+            costs = {
+                dst: d
+                for dst, d in dist.items()
+                if dst != self.addr and "/" not in dst and dst not in known
+            }
+            if costs == old_costs and not refresh:
+                continue
+            self.summary_lsas[area] = costs
+            origin = self.summary_origin(area)
+            self.seq_numbers[origin] = self.seq_numbers.get(origin, 0) + 1
+            self.lsa_birth[origin] = self.now_ms
+            content = codec.encode(codec.LSA, origin, self.seq_numbers[origin], costs)
+            for port, port_area in self.port_areas.items():
+                if port_area == area:
+                    neighbor = self.port_to_neighbor.get(port, "Unknown")
+                    self.send(port, Packet(Packet.ROUTING, origin, neighbor, content))
+
+    def area_destinations(self, area):
+        """
+        # Các nút xuất hiện trong LSA router của vùng `area` (origin và láng giềng của
+        # nó, kể cả client), tính cả các liên kết của chính router này trong vùng
+        """
+        nodes = {
+            self.port_to_neighbor[port]
+            for port, port_area in self.port_areas.items()
+            if port_area == area and port in self.port_to_neighbor
+        }
+        for origin, areas in self.lsa_areas.items():
+            if area in areas and "/" not in origin:
+                nodes.add(origin)
+                nodes.update(self.topology.get(origin, ()))
+        return nodes
+
+    def set_forwarding(self, dst, ports):
+        """
+        # Đặt các cổng ra của `dst` (xóa nếu rỗng) và cập nhật chỉ mục cổng -> đích
+        """
+        for port in self.forwarding_table.get(dst, ()):
+            if port in self.port_destinations:
+                self.port_destinations[port].discard(dst)
+        if ports:
+            self.forwarding_table[dst] = ports
+            for port in ports:
+                self.port_destinations.setdefault(port, set()).add(dst)
+        else:
+            self.forwarding_table.pop(dst, None)
+
+    def shortest_distances(self, source):
+        """
+        # Khoảng cách ngắn nhất từ `source` đến mọi nút (SPF trên topology)
+        """
+        return self.spf_engine.shortest_path_tree(source)[0]
+
+    def compute_lfas(self, destinations):
+        """
+        # Trả về cổng dự phòng {đích: cổng} cho các đích D trong `destinations`: láng
+        # giềng N không nằm trên đường chính thỏa điều kiện không lặp của RFC 5286:
+        # dist(N, D) < dist(N, S) + dist(S, D), chọn N có tổng chi phí nhỏ nhất (S là
+        # router này). Được gọi sau mỗi lần SPF khi bật lfa, nên khi mất liên kết chỉ
+        # cần tra bảng lfa_ports
+        """
+        backups = {}
+        links = self.topology[self.addr]
+        neighbors = [
+            (n, self.shortest_distances(n))
+            for n in links
+            if n in self.neighbor_to_port and self.topology.get(n)
+        ]
+        for dst in destinations:
+            hops = self.equal_cost_hops.get(dst)
+            if hops is None or dst not in self.dist:
+                continue
+            best = None
+            for neighbor, neighbor_dist in neighbors:
+                if neighbor in hops or dst not in neighbor_dist:
+                    continue
+                to_self = neighbor_dist.get(self.addr, float("inf"))
+                if neighbor_dist[dst] < to_self + self.dist[dst]:
+                    candidate = (links[neighbor] + neighbor_dist[dst], neighbor)
+                    if best is None or candidate < best:
+                        best = candidate
+            if best is not None:
+                backups[dst] = self.neighbor_to_port[best[1]]
+        return backups
+
+    def update_equal_cost_hops(self):
+        """
+        # Tính lại tập nút kề đầu tiên cùng chi phí và bảng chuyển tiếp cho các nút
+        # bị ảnh hưởng, theo thứ tự khoảng cách, lan truyền sang các nút phía sau
+        # trên đồ thị đường đi ngắn nhất khi tập của một nút thay đổi
+        """
+        dirty, self.spf_dirty = self.spf_dirty, set()
+        dist = self.dist
+        pq = []
+        for node in dirty:
+            if node == self.addr:
+                continue
+            if node in dist:
+                pq.append((dist[node], node))
+            elif node in self.equal_cost_hops:
+                del self.equal_cost_hops[node]
+                self.set_forwarding(node, ())
+            # Khoảng cách của nút thay đổi: các nút phía sau có thể mất hoặc thêm
+            # nút này làm nút trước trên đường đi ngắn nhất
+            for succ in self.topology.get(node, ()):
+                if succ in dist and succ != self.addr:
+                    pq.append((dist[succ], succ))
+        heapq.heapify(pq)
+        while pq:
+            node_dist, node = heapq.heappop(pq)
+            if dist.get(node) != node_dist:
+                continue
+            # Một nút có thể được xét lại: nút trước qua cạnh chi phí 0 có cùng khoảng
+            # cách nhưng có thể được xét sau nó
+            if self.ecmp:
+                hops = set()
+                for pred, cost in self.reverse_topology.get(node, {}).items():
+                    if pred != node and pred in dist and dist[pred] + cost == node_dist:
+                        if pred == self.addr:
+                            hops.add(node)
+                        else:
+                            hops.update(self.equal_cost_hops.get(pred, ()))
+                hops = frozenset(hops)
+            else:
+                hops = frozenset((self.first_hop[node],))
+            if hops == self.equal_cost_hops.get(node):
+                continue
+            self.equal_cost_hops[node] = hops
+            self.set_forwarding(node, tuple(sorted(
+                self.neighbor_to_port[hop] for hop in hops if hop in self.neighbor_to_port
+            )))
+            for succ, cost in self.topology.get(node, {}).items():
+                if dist.get(succ) == node_dist + cost:
+                    heapq.heappush(pq, (node_dist + cost, succ))
+
+    def update_leaf(self, node):
+        """
+        # Chọn lại nút cha tốt nhất cho một nút không có cạnh đi ra
+        """
+        best = self.best_parent(node)
+        if best is None:
+            self.detach_node(node)
+        else:
+            self.attach_node(node, *best)
+
+    def incremental_spf(self, changed):
+        """
+        # Tính lại cây đường đi ngắn nhất chỉ trên phần cây bị ảnh hưởng
+        # Cạnh trên cây bị tăng chi phí hoặc bị xóa: tính lại toàn bộ cây con của nó
+        # Cạnh bị giảm chi phí hoặc mới thêm: lan truyền cải thiện bằng Dijkstra
+        # `changed` là danh sách (origin, v, chi phí cũ, chi phí mới)
+        # Trả về False (không thay đổi gì) nếu các cây con bị ảnh hưởng chiếm quá nửa
+        # cây: khi đó SPF đầy đủ rẻ hơn
+        """
+        # Tìm các cây con bị ảnh hưởng và tách chúng khỏi cây
+        affected = set()
+        for origin, v, old_cost, new_cost in changed:
+            if self.parent.get(v) != origin:
+                continue
+            if new_cost is not None and new_cost <= old_cost:
+                continue
+            stack = [v]
+            while stack:
+                node = stack.pop()
+                if node not in affected:
+                    affected.add(node)
+                    stack.extend(self.children.get(node, ()))
+        if 2 * len(affected) > len(self.dist):
+            return False
+        for node in affected:
+            self.detach_node(node)
+
+        # Khởi tạo hàng đợi từ các nút còn trên cây
+        pq = []
+        for node in affected:
+            best = self.best_parent(node)
+            if best is not None:
+                pq.append((best[0], node, best[1]))
+        for origin, v, old_cost, new_cost in changed:
+            if new_cost is None or (old_cost is not None and new_cost >= old_cost):
+                continue
+            if origin not in self.dist:
+                continue
+            new_dist = self.dist[origin] + new_cost
+            if new_dist < self.dist.get(v, float("inf")):
+                pq.append((new_dist, v, origin))
+        heapq.heapify(pq)
+
+        # Dijkstra chỉ trên các nút có khoảng cách được cải thiện
+        while pq:
+            current_dist, current, parent = heapq.heappop(pq)
+            if current_dist >= self.dist.get(current, float("inf")):
+                continue
+            self.attach_node(current, current_dist, parent)
+            for neighbor, cost in self.topology.get(current, {}).items():
+                new_dist = current_dist + cost
+                if new_dist < self.dist.get(neighbor, float("inf")):
+                    heapq.heappush(pq, (new_dist, neighbor, current))
+        return True
+
+    def best_parent(self, node):
+        """
+        # Trả về (khoảng cách, nút cha) tốt nhất của `node` qua các nút đang trên cây
+        # Ưu tiên giữ nút cha hiện tại nếu chi phí bằng nhau
+        """
+        best = None
+        current_parent = self.parent.get(node)
+        for pred, cost in self.reverse_topology.get(node, {}).items():
+            if pred not in self.dist or pred == node:
+                continue
+            candidate = (self.dist[pred] + cost, pred != current_parent, pred)
+            if best is None or candidate < best:
+                best = candidate
+        if best is None:
+            return None
+        return best[0], best[2]
+
+    def attach_node(self, node, node_dist, parent):
+        """
+        # Gắn `node` vào cây với nút cha `parent`
+        """
+        old_parent = self.parent.get(node)
+        if old_parent != parent and old_parent in self.children:
+            self.children[old_parent].discard(node)
+        self.dist[node] = node_dist
+        self.parent[node] = parent
+        self.children.setdefault(parent, set()).add(node)
+        self.first_hop[node] = node if parent == self.addr else self.first_hop[parent]
+        self.spf_dirty.add(node)
+
+    def detach_node(self, node):
+        """
+        # Tách `node` khỏi cây (không còn đường đi đến nút này)
+        """
+        parent = self.parent.pop(node, None)
+        if parent in self.children:
+            self.children[parent].discard(node)
+        self.children.pop(node, None)
+        self.dist.pop(node, None)
+        self.first_hop.pop(node, None)
+        self.spf_dirty.add(node)
 
     def __repr__(self):
         """
@@ -173,5 +819,7 @@ class LSrouter(Router):
         output = f"LSrouter(addr={self.addr})\n"
         output += f"Links: {self.topology[self.addr]}\n"
         output += f"Forwarding Table: {self.forwarding_table}\n"
+        output += f"SPF runs: {self.spf_executed}/{self.spf_requested} requested\n"
+        output += f"Packets per port: {self.port_packets}\n"
         output += f"Topology: {self.topology}\n"
         return output
\ No newline at end of file
@@ -0,0 +1,75 @@
+"""
+Compare LSrouter in flat mode with OSPF-style areas on a generated multi-area
+topology (see graphs.area_graph). The same network runs twice, once without and once
+with its "areas" declaration. A link inside area 1 goes down and comes back up during
+the run. The benchmark reports the LSDB size per router (LSAs stored and cost entries
+in them), the flood volume (routing packets and bytes), the time of a full SPF over
+each router's LSDB and the number of nodes it reaches, and the convergence time per
+event, which is judged against the lowest-cost routes of the whole network.
+
+Usage: python benchmarks/bench_areas.py [--areas N] [--area-size N] [--clients N]
+"""
+
+import argparse
+import time
+
+from convergence import run_scenario
+from graphs import area_graph, network_json
+from LSrouter import LSrouter
+
+
+def lsdb_stats(router):
+    """Return (LSAs, cost entries) stored by `router`, summaries it only floods included."""
+    link_states = list(router.topology.values()) + list(router.hidden_lsas.values())
+    return len(link_states), sum(len(links) for links in link_states)
+
+
+def spf_stats(router, runs=5):
+    """Return (ms per full SPF, nodes reached) over the LSDB of `router`."""
+    start = time.perf_counter()
+    for _ in range(runs):
+        dist, _, _ = router.spf_engine.shortest_path_tree(router.addr)
+    return (time.perf_counter() - start) * 1000 / runs, len(dist)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LSrouter areas.")
+    parser.add_argument("--areas", type=int, default=4)
+    parser.add_argument("--area-size", type=int, default=25)
+    parser.add_argument("--clients", type=int, default=20)
+    args = parser.parse_args()
+
+    # Latency equals cost in the simulator: small costs keep traceroutes short
+    topology, areas = area_graph(
+        args.areas, args.area_size, max_cost=2, num_clients=args.clients, seed=1
+    )
+    link = ("a1r3", min(n for n in topology["a1r3"] if n.startswith("a1r")))
+    changes = [[40, link, "down"], [60, link, "up"]]
+    print(f"{args.areas} areas of {args.area_size} routers, {args.clients} clients, "
+          f"{link[0]}-{link[1]} down at 40 and up at 60")
+    print(f"{'mode':6s} {'packets':>8s} {'bytes':>9s} {'LSAs':>11s} {'entries':>13s} "
+          f"{'SPF ms':>13s} {'SPF nodes':>9s}  convergence per event (ms)")
+    for mode, area_params in (("flat", None), ("areas", areas)):
+        net_json = network_json(topology, end_time=80, changes=changes, areas=area_params)
+        result = run_scenario(net_json, LSrouter, send_rate=5)
+        routers = list(result["network"].routers.values())
+        lsdb = [lsdb_stats(router) for router in routers]
+        spf = [spf_stats(router) for router in routers]
+        avg = lambda values: sum(values) / len(values)
+        events = " ".join(
+            f"{e['change']}@{e['time_ms']}="
+            f"{'never' if e['converged_ms'] is None else e['converged_ms']}"
+            for e in result["events"]
+        )
+        print(
+            f"{mode:6s} {result['routing_packets']:8d} {result['routing_bytes']:9d} "
+            f"{avg([l for l, _ in lsdb]):5.1f}/{max(l for l, _ in lsdb):<5d} "
+            f"{avg([e for _, e in lsdb]):6.0f}/{max(e for _, e in lsdb):<6d} "
+            f"{avg([t for t, _ in spf]):6.3f}/{max(t for t, _ in spf):<6.3f} "
+            f"{avg([n for _, n in spf]):9.0f}  {events}"
+        )
+    print("(LSAs, entries and SPF ms are average/max over routers)")
+
+
+if __name__ == "__main__":
+    main()
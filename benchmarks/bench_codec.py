@@ -0,0 +1,65 @@
+"""
+Compare message size and encode/decode speed of the binary routing codec with the
+json.dumps/json.loads encoding it replaced.
+
+Usage: python benchmarks/bench_codec.py [--repeat N]
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import codec
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark routing codecs.")
+    parser.add_argument("--repeat", type=int, default=20000)
+    args = parser.parse_args()
+
+    lsa = {f"r{i}": i % 10 + 1 for i in range(8)}
+    dv = {f"r{i}": i % 15 + 1 for i in range(1000)}
+    cases = [
+        ("LSA (8 links)", codec.LSA, lsa, args.repeat),
+        ("DV (1000 dst)", codec.DV, dv, max(args.repeat // 100, 1)),
+    ]
+    cache = codec.LSACache()
+
+    print(f"{'message':15s} {'codec':7s} {'bytes':>7s} {'enc us':>9s} {'dec us':>9s}")
+    for name, kind, costs, repeat in cases:
+        json_content = json.dumps(["r0", 12345, costs])
+        content = codec.encode(kind, "r0", 12345, costs)
+        assert codec.decode(content) == (kind, "r0", 12345, 0, costs)
+
+        results = [
+            (
+                "json",
+                json_content,
+                lambda: json.dumps(["r0", 12345, costs]),
+                lambda: json.loads(json_content),
+            ),
+            (
+                "binary",
+                content,
+                lambda: codec.encode(kind, "r0", 12345, costs),
+                lambda: codec.decode(content),
+            ),
+        ]
+        if kind == codec.LSA:
+            results.append(("cached", content, None, lambda: cache.decode(content)))
+        for label, encoded, encode_fn, decode_fn in results:
+            size = len(encoded.encode("latin-1" if label != "json" else "utf-8"))
+            if encode_fn:
+                enc = f"{timeit.timeit(encode_fn, number=repeat) / repeat * 1e6:9.2f}"
+            else:
+                enc = f"{'-':>9s}"
+            dec = timeit.timeit(decode_fn, number=repeat) / repeat
+            print(f"{name:15s} {label:7s} {size:7d} {enc} {dec * 1e6:9.2f}")
+
+
+if __name__ == "__main__":
+    main()
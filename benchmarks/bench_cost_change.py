@@ -0,0 +1,83 @@
+"""
+Compare an in-place "cost" change with the only way to change a cost before it, taking
+the link down and bringing a new one up at the same time. After the scenario's own
+events, the cost of one link is raised and later restored. For each router class the
+benchmark reports the routing packets sent, the convergence time and the traceroutes
+lost after each of the two changes.
+
+Usage: python benchmarks/bench_cost_change.py [--send-rate N]
+"""
+
+import argparse
+import os
+
+from convergence import run_scenario
+from DVrouter import DVrouter
+from LSrouter import LSrouter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Scenario, link, raised cost, times of the two changes (JSON time units)
+SCENARIOS = [
+    ("04_pg244_net_events.json", ("A", "C"), 5, (36, 44)),
+    ("06_pg242_net_events.json", ("D", "E"), 6, (36, 44)),
+]
+
+
+def cost_changes(link, cost, times, in_place):
+    """Return a transform that raises the cost of `link` and restores it later."""
+
+    def transform(net_json):
+        addr1, addr2, p1, p2, c12, c21 = next(
+            l for l in net_json["links"] if (l[0], l[1]) == link
+        )
+        for time, (new12, new21) in zip(times, ((cost, cost), (c12, c21))):
+            if in_place:
+                net_json["changes"].append([time, [addr1, addr2, new12, new21], "cost"])
+            else:
+                net_json["changes"].append([time, [addr1, addr2], "down"])
+                net_json["changes"].append(
+                    [time, [addr1, addr2, p1, p2, new12, new21], "up"]
+                )
+        net_json["end_time"] = times[-1] + 20
+
+    return transform
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark in-place cost changes.")
+    parser.add_argument("--send-rate", type=float, default=1)
+    args = parser.parse_args()
+
+    print(f"{'scenario':26s} {'router':8s} {'change':9s} {'packets':>8s}  "
+          "per cost change: converged ms / routing packets / lost probes")
+    for filename, link, cost, times in SCENARIOS:
+        for RouterClass in (LSrouter, DVrouter):
+            for in_place in (False, True):
+                result = run_scenario(
+                    os.path.join(ROOT, filename),
+                    RouterClass,
+                    send_rate=args.send_rate,
+                    transform=cost_changes(link, cost, times, in_place),
+                )
+                change_times = [t * result["network"].latency_multiplier for t in times]
+                events = [e for e in result["events"] if e["time_ms"] in change_times]
+                # Down and up at the same time are two events, count them as one
+                summary = []
+                for time_ms in change_times:
+                    same = [e for e in events if e["time_ms"] == time_ms]
+                    converged = same[-1]["converged_ms"]
+                    summary.append(
+                        f"{'never' if converged is None else converged}/"
+                        f"{sum(e['routing_packets'] for e in same)}/"
+                        f"{sum(e['lost_probes'] for e in same)}"
+                    )
+                print(
+                    f"{filename:26s} {RouterClass.__name__:8s} "
+                    f"{'cost' if in_place else 'down+up':9s} "
+                    f"{result['routing_packets']:8d}  {'  '.join(summary)}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Compare the convergence time of LSrouter with and without database synchronization
+on new adjacencies. Without it, a router that joins the network only learns the LSAs
+of routers whose state changes afterwards, or at their next periodic refresh.
+
+Usage: python benchmarks/bench_dbsync.py [--send-rate N]
+"""
+
+import argparse
+import os
+
+from convergence import run_scenario
+from LSrouter import LSrouter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def late_join(net_json):
+    """Keep G isolated from the start until the G-F link comes up (pg244 scenario)."""
+    net_json["links"] = [l for l in net_json["links"] if {l[0], l[1]} != {"E", "G"}]
+    net_json["changes"] = [
+        c for c in net_json["changes"] if {c[1][0], c[1][1]} != {"E", "G"}
+    ]
+
+
+SCENARIOS = [
+    ("02_small_net_events", "02_small_net_events.json", None),
+    ("04_pg244_net_events", "04_pg244_net_events.json", None),
+    ("06_pg242_net_events", "06_pg242_net_events.json", None),
+    ("04 G joins late", "04_pg244_net_events.json", late_join),
+]
+
+
+def format_ms(value):
+    return "never" if value is None else str(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LSDB synchronization.")
+    parser.add_argument("--send-rate", type=float, default=1)
+    args = parser.parse_args()
+
+    print(f"{'scenario':22s} {'db_sync':7s} {'packets':>8s} {'bytes':>8s}  "
+          "convergence per event (ms)")
+    for name, filename, transform in SCENARIOS:
+        for db_sync in (False, True):
+            result = run_scenario(
+                os.path.join(ROOT, filename),
+                LSrouter,
+                send_rate=args.send_rate,
+                transform=transform,
+                db_sync=db_sync,
+            )
+            events = " ".join(
+                f"{e['change']}@{e['time_ms']}={format_ms(e['converged_ms'])}"
+                for e in result["events"]
+            )
+            print(
+                f"{name:22s} {str(db_sync):7s} {result['routing_packets']:8d} "
+                f"{result['routing_bytes']:8d}  {events}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Compare packet delivery throughput of the thread-per-packet Link.send with the shared
+DeliveryScheduler.
+
+Usage: python benchmarks/bench_delivery.py [--links N] [--packets N] [--latency MS]
+"""
+
+import _thread
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from link import Link
+from packet import Packet
+from scheduler import DeliveryScheduler
+
+
+def run(num_links, num_packets, latency, scheduler):
+    """Send `num_packets` over `num_links` links and wait until all are received."""
+    links = [Link("a", "b", 1, 1, latency, scheduler) for _ in range(num_links)]
+    received = 0
+    peak_threads = _thread._count()
+    start = time.perf_counter()
+    for i in range(num_packets):
+        packet = Packet(Packet.ROUTING, "a", "b", "x" * 32)
+        links[i % num_links].send(packet, "a")
+        if i % 100 == 0:
+            peak_threads = max(peak_threads, _thread._count())
+    while received < num_packets:
+        for link in links:
+            while link.recv("b") is not None:
+                received += 1
+        peak_threads = max(peak_threads, _thread._count())
+        time.sleep(0.0005)
+    elapsed = time.perf_counter() - start
+    return num_packets / elapsed, peak_threads
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark packet delivery.")
+    parser.add_argument("--links", type=int, default=50)
+    parser.add_argument("--packets", type=int, default=20000)
+    parser.add_argument("--latency", type=int, default=10, help="Link latency in ms.")
+    args = parser.parse_args()
+
+    rate, threads = run(args.links, args.packets, args.latency, None)
+    print(f"thread-per-packet: {rate:10.0f} packets/s, peak threads {threads}")
+
+    scheduler = DeliveryScheduler()
+    scheduler.start()
+    rate, threads = run(args.links, args.packets, args.latency, scheduler)
+    scheduler.stop()
+    stats = scheduler.stats()
+    print(f"DeliveryScheduler: {rate:10.0f} packets/s, peak threads {threads}")
+    print(
+        f"scheduler lag: mean {stats['mean_lag_ms']:.3f} ms, "
+        f"max {stats['max_lag_ms']:.3f} ms over {stats['delivered']} deliveries"
+    )
+
+
+if __name__ == "__main__":
+    main()
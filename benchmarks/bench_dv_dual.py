@@ -0,0 +1,68 @@
+"""
+Compare DVrouter with and without its experimental DUAL mode on the event scenarios.
+In DUAL mode a router switches without a query only to a neighbor that meets the
+feasibility condition (its reported distance is below the router's feasible
+distance). Otherwise it runs a diffusing computation, querying its neighbors, and
+uses and advertises its best current route until every neighbor replied. For each
+event the benchmark reports the convergence time, the time of the last routing
+packet and the number of routing packets sent until the next event. The last
+scenario isolates G in 04_pg244_net_events.json, where plain distance vector counts
+to infinity.
+
+DUAL mode converges as fast as plain distance vector on every event here, not
+faster. It sends 5% fewer routing packets when G is isolated (572 against 600) and
+2% to 5% more on the other scenarios.
+
+Usage: python benchmarks/bench_dv_dual.py [--send-rate N]
+"""
+
+import argparse
+import os
+
+from convergence import isolate_g, run_scenario
+from DVrouter import DVrouter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+SCENARIOS = [
+    ("02_small_net_events", "02_small_net_events.json", None),
+    ("04_pg244_net_events", "04_pg244_net_events.json", None),
+    ("06_pg242_net_events", "06_pg242_net_events.json", None),
+    ("04 isolate G", "04_pg244_net_events.json", isolate_g),
+]
+
+
+def format_ms(value):
+    return "never" if value is None else str(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DVrouter DUAL mode.")
+    parser.add_argument("--send-rate", type=float, default=1)
+    args = parser.parse_args()
+
+    print(f"{'scenario':22s} {'dual':5s} {'packets':>8s} {'bytes':>8s}  "
+          "per event: change@ms converged/settled ms (packets)")
+    for name, filename, transform in SCENARIOS:
+        for dual in (False, True):
+            result = run_scenario(
+                os.path.join(ROOT, filename),
+                DVrouter,
+                send_rate=args.send_rate,
+                transform=transform,
+                dual=dual,
+            )
+            events = " ".join(
+                f"{e['change']}@{e['time_ms']}={format_ms(e['converged_ms'])}/"
+                f"{e['settled_ms']}({e['routing_packets']})"
+                for e in result["events"]
+            )
+            print(
+                f"{name:22s} {str(dual):5s} {result['routing_packets']:8d} "
+                f"{result['routing_bytes']:8d}  {events}"
+            )
+
+
+if __name__ == "__main__":
+    main()
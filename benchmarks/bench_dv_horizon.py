@@ -0,0 +1,49 @@
+"""
+Compare the DVrouter split horizon modes ("none", "split" and "poison") on the event
+scenarios: time to correct routes after each change, and the routing packets sent
+until the routers settle. Periodic full tables are disabled so that only triggered
+updates are counted. The "04 isolate G" variant cuts router G off the network, which
+makes routes to G and g count to INFINITY.
+
+Usage: python benchmarks/bench_dv_horizon.py
+"""
+
+import os
+
+from convergence import isolate_g, run_scenario
+from DVrouter import DVrouter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+SCENARIOS = [
+    ("02_small_net_events", "02_small_net_events.json", None),
+    ("04_pg244_net_events", "04_pg244_net_events.json", None),
+    ("06_pg242_net_events", "06_pg242_net_events.json", None),
+    ("04 isolate G", "04_pg244_net_events.json", isolate_g),
+]
+
+
+def main():
+    print("per event: converged ms / settled ms / routing packets")
+    for name, filename, transform in SCENARIOS:
+        print(name)
+        for horizon in ("none", "split", "poison"):
+            result = run_scenario(
+                os.path.join(ROOT, filename),
+                DVrouter,
+                transform=transform,
+                horizon=horizon,
+                full_update_time=10**9,
+            )
+            events = "  ".join(
+                f"{e['change']}@{e['time_ms']}="
+                f"{'never' if e['converged_ms'] is None else e['converged_ms']}"
+                f"/{e['settled_ms']}/{e['routing_packets']}"
+                for e in result["events"]
+            )
+            print(f"  {horizon:7s} {events}")
+
+
+if __name__ == "__main__":
+    main()
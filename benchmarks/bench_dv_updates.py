@@ -0,0 +1,47 @@
+"""
+Measure the routing bytes DVrouter sends with delta-encoded triggered updates
+against the bytes the same updates would take as full tables, and the convergence
+time after each change, for several periods of full-table updates.
+
+Usage: python benchmarks/bench_dv_updates.py [--routers N] [--clients N]
+"""
+
+import argparse
+
+from convergence import run_scenario
+from DVrouter import DVrouter
+from graphs import dv_infinity, network_json, random_graph
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DV delta updates.")
+    parser.add_argument("--routers", type=int, default=40)
+    parser.add_argument("--clients", type=int, default=10)
+    args = parser.parse_args()
+
+    topology = random_graph(args.routers, num_clients=args.clients)
+    a, b = "r0", next(n for n in topology["r0"] if n in topology)
+    net_json = network_json(
+        topology,
+        end_time=120,
+        changes=[(40, (a, b), "down"), (80, (a, b), "up")],
+        infinity=dv_infinity(topology, (a, b)),
+    )
+    print(f"{args.routers} routers, {args.clients} clients, {a}-{b} down then up")
+    print(f"{'full every':>10s} {'sent':>9s} {'full':>9s} {'saved':>6s}  convergence (ms)")
+    for heartbeats in (1, 5, 10):
+        result = run_scenario(net_json, DVrouter, full_update_time=heartbeats * 1000)
+        routers = result["network"].routers.values()
+        sent = sum(r.bytes_sent for r in routers)
+        full = sum(r.bytes_full for r in routers)
+        events = " ".join(
+            f"{e['change']}={'never' if e['converged_ms'] is None else e['converged_ms']}"
+            for e in result["events"]
+        )
+        print(
+            f"{heartbeats:8d}hb {sent:9d} {full:9d} {1 - sent / full:6.1%}  {events}"
+        )
+
+
+if __name__ == "__main__":
+    main()
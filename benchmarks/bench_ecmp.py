@@ -0,0 +1,59 @@
+"""
+Show how LSrouter spreads traceroute traffic over equal-cost paths. For each router
+port the benchmark counts the packets sent with and without ECMP, and reports the
+number of ports that carry traffic and the load of the busiest port. It runs on
+03_pg244_net.json (one client pair has two equal-cost routes) and on a generated
+topology with unit costs, where most client pairs have several.
+
+Usage: python benchmarks/bench_ecmp.py [--routers N] [--clients N] [-v]
+"""
+
+import argparse
+import os
+
+from convergence import run_scenario
+from graphs import network_json, random_graph
+from LSrouter import LSrouter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ECMP load spreading.")
+    parser.add_argument("--routers", type=int, default=30)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+
+    generated = network_json(
+        random_graph(args.routers, max_cost=1, num_clients=args.clients), end_time=60
+    )
+    scenarios = [
+        ("03_pg244_net", os.path.join(ROOT, "03_pg244_net.json")),
+        (f"random {args.routers} routers, unit costs", generated),
+    ]
+    for name, scenario in scenarios:
+        print(name)
+        for ecmp in (False, True):
+            result = run_scenario(scenario, LSrouter, ecmp=ecmp)
+            routers = sorted(result["network"].routers.values(), key=lambda r: r.addr)
+            counts = [c for r in routers for c in r.port_packets.values() if c]
+            multipath = sum(
+                1 for r in routers for ports in r.forwarding_table.values()
+                if len(ports) > 1
+            )
+            print(
+                f"  ecmp={str(ecmp):5s} ports used {len(counts):4d}  "
+                f"busiest port {max(counts):6d}  multipath entries {multipath:4d}  "
+                f"converged ms {[e['converged_ms'] for e in result['events']]}"
+            )
+            if args.verbose:
+                for router in routers:
+                    ports = " ".join(
+                        f"{p}:{c}" for p, c in sorted(router.port_packets.items())
+                    )
+                    print(f"    {router.addr:5s} {ports}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Measure the DVrouter data plane: traceroute packets forwarded per second through a
+single high-degree router, with the compiled FIB (one dict lookup per packet)
+against the previous lookup that scanned the neighbor links for the next hop.
+
+Usage: python benchmarks/bench_forwarding.py [--degree N] [--destinations N]
+       [--packets N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import codec
+from DVrouter import DVrouter
+from packet import Packet
+
+
+class _NullLink:
+    """A link that only counts the packets sent on it."""
+
+    def __init__(self):
+        self.sent = 0
+
+    def send(self, packet, src):
+        self.sent += 1
+
+
+def make_router(degree, destinations, rng):
+    """Create a DVrouter with `degree` neighbors that advertise `destinations` hosts."""
+    router = DVrouter("r0", heartbeat_time=1000, infinity=10**6)
+    for port in range(degree):
+        router.links[port] = _NullLink()
+        router.handle_new_link(port, f"n{port}", rng.randint(1, 10))
+    dsts = [f"h{i}" for i in range(destinations)]
+    for port in range(degree):
+        dv = {dst: rng.randint(1, 100) for dst in dsts}
+        dv[f"n{port}"] = 0
+        content = codec.encode(codec.DV, f"n{port}", 1, dv)
+        router.handle_packet(port, Packet(Packet.ROUTING, f"n{port}", "r0", content))
+    return router, dsts
+
+
+def scan_forward(router, packet):
+    """The forwarding path before the FIB: RIB lookup, then a scan for the port."""
+    dst = packet.dst_addr
+    if dst in router.dv_table:
+        cost, next_hop = router.dv_table[dst]
+        if next_hop is not None and cost < router.INFINITY:
+            for p, (neighbor, _) in router.neighbor_links.items():
+                if neighbor == next_hop:
+                    router.send(p, packet)
+                    break
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DVrouter forwarding.")
+    parser.add_argument("--degree", type=int, default=256)
+    parser.add_argument("--destinations", type=int, default=2000)
+    parser.add_argument("--packets", type=int, default=200000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    router, dsts = make_router(args.degree, args.destinations, rng)
+    packets = [
+        Packet(Packet.TRACEROUTE, "x", rng.choice(dsts)) for _ in range(args.packets)
+    ]
+    sent = lambda: sum(link.sent for link in router.links.values())
+
+    print(f"degree {args.degree}, {args.destinations} destinations, "
+          f"{args.packets} packets")
+    print(f"{'lookup':10s} {'pkts/s':>12s} {'ns/pkt':>9s}")
+    for name, forward in (
+        ("scan", lambda p: scan_forward(router, p)),
+        ("fib", lambda p: router.handle_packet(0, p)),
+    ):
+        before = sent()
+        start = time.perf_counter()
+        for packet in packets:
+            forward(packet)
+        elapsed = time.perf_counter() - start
+        assert sent() - before == len(packets)
+        print(f"{name:10s} {len(packets) / elapsed:12.0f} "
+              f"{elapsed / len(packets) * 1e9:9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Measure traceroute black holes after link failures with and without loop-free
+alternates in LSrouter: the probes lost after each "down" event and the time from
+the event to the send time of the last lost probe. Each mode runs with an immediate
+SPF and with a 500 ms initial SPF delay, during which routers next to the failure
+forward on the backups they computed after their last SPF.
+
+With an immediate SPF the backups change nothing. With the 500 ms delay they cut
+the lost probes (33 -> 28 on 04_pg244, 60 -> 35 and 32 -> 29 on 06_pg242), but the
+black hole still lasts 300 ms: destinations without a backup (21% to 49% of them)
+and routers farther from the failure wait for the delayed SPF.
+
+Usage: python benchmarks/bench_lfa.py [--send-rate N]
+"""
+
+import argparse
+import os
+
+from convergence import run_scenario
+from LSrouter import LSrouter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = [
+    "02_small_net_events.json",
+    "04_pg244_net_events.json",
+    "06_pg242_net_events.json",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LFA failover.")
+    parser.add_argument("--send-rate", type=float, default=0.5)
+    args = parser.parse_args()
+
+    print("per down event: lost probes / black hole ms")
+    for filename in SCENARIOS:
+        print(filename)
+        for delay in (0, 500):
+            for lfa in (False, True):
+                result = run_scenario(
+                    os.path.join(ROOT, filename),
+                    LSrouter,
+                    send_rate=args.send_rate,
+                    lfa=lfa,
+                    spf_initial_delay=delay,
+                )
+                events = "  ".join(
+                    f"{e['target'][0]}-{e['target'][1]}@{e['time_ms']}="
+                    f"{e['lost_probes']}/{e['black_hole_ms']}"
+                    for e in result["events"]
+                    if e["change"] == "down"
+                )
+                coverage = ""
+                if lfa:
+                    # Share of destinations with a single primary port and a backup
+                    routers = result["network"].routers.values()
+                    single = [
+                        (r, dst) for r in routers
+                        for dst, ports in r.forwarding_table.items() if len(ports) == 1
+                    ]
+                    covered = sum(1 for r, dst in single if dst in r.lfa_ports)
+                    coverage = f"  (LFA coverage {covered / max(len(single), 1):.0%})"
+                print(f"  spf delay {delay:3d} lfa={str(lfa):5s} {events}{coverage}")
+
+
+if __name__ == "__main__":
+    main()
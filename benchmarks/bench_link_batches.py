@@ -0,0 +1,78 @@
+"""
+Compare handling the link changes a router finds pending as one batch (the default,
+see Router.handle_link_changes) with applying them one at a time, as routers did
+before. At startup every router finds all its links pending at once, so on the pg244
+topology the benchmark reports the startup convergence time, the routing packets sent
+until the first event, the link-change handler calls and, for LSrouter, the SPF runs.
+
+Usage: python benchmarks/bench_link_batches.py [--send-rate N]
+"""
+
+import argparse
+import os
+
+from convergence import run_scenario
+from DVrouter import DVrouter
+from LSrouter import LSrouter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = ["03_pg244_net.json", "04_pg244_net_events.json"]
+
+
+def counting(RouterClass, batched):
+    """Return a subclass of `RouterClass` that counts its link-change handler calls."""
+
+    class Counting(RouterClass):
+        def __init__(self, *args, **kwargs):
+            RouterClass.__init__(self, *args, **kwargs)
+            self.link_batches = 0
+
+        def apply_link_changes(self, changes):
+            if batched:
+                RouterClass.apply_link_changes(self, changes)
+            else:
+                for change in changes:
+                    RouterClass.apply_link_changes(self, [change])
+
+        def handle_link_changes(self, changes):
+            self.link_batches += 1
+            RouterClass.handle_link_changes(self, changes)
+
+    Counting.__name__ = RouterClass.__name__
+    return Counting
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched link changes.")
+    parser.add_argument("--send-rate", type=float, default=1)
+    args = parser.parse_args()
+
+    print(f"{'scenario':26s} {'router':8s} {'mode':9s} {'start ms':>8s} "
+          f"{'start pkts':>10s} {'packets':>8s} {'batches':>8s} {'SPF runs':>8s}")
+    for filename in SCENARIOS:
+        for RouterClass in (LSrouter, DVrouter):
+            for batched in (False, True):
+                result = run_scenario(
+                    os.path.join(ROOT, filename),
+                    counting(RouterClass, batched),
+                    send_rate=args.send_rate,
+                )
+                start = result["events"][0]
+                routers = result["network"].routers.values()
+                spf_runs = (
+                    str(sum(r.spf_executed for r in routers))
+                    if RouterClass is LSrouter else "-"
+                )
+                converged = start["converged_ms"]
+                print(
+                    f"{filename:26s} {RouterClass.__name__:8s} "
+                    f"{'batch' if batched else 'per-link':9s} "
+                    f"{'never' if converged is None else converged:>8} "
+                    f"{start['routing_packets']:10d} {result['routing_packets']:8d} "
+                    f"{sum(r.link_batches for r in routers):8d} {spf_runs:>8s}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Compare the Packet class with the packet it replaced, which deep-copied its content
+and the whole route list on every Link.send, on traceroutes forwarded along a chain of
+links. For each path length the benchmark reports the time of the per-hop packet work
+alone (copy and add_to_route, with the route read once at the end as
+Client.handle_packet does), then the hops forwarded per second by the event engine and
+Link.send, with the peak memory traced by tracemalloc while packets are in flight.
+
+Usage: python benchmarks/bench_packets.py [--hops N ...] [--packets N]
+"""
+
+import argparse
+import copy
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import EventEngine
+from link import Link
+from packet import Packet
+
+
+class ListPacket:
+    """The previous packet: a plain object whose route is a list copied on send."""
+
+    def __init__(self, kind, src_addr, dst_addr, content=None):
+        self.kind = kind
+        self.src_addr = src_addr
+        self.dst_addr = dst_addr
+        self.content = content
+        self.route = [src_addr]
+
+    def copy(self):
+        content = copy.deepcopy(self.content)
+        p = ListPacket(self.kind, self.src_addr, self.dst_addr, content=content)
+        p.route = list(self.route)
+        return p
+
+    def add_to_route(self, addr):
+        self.route.append(addr)
+
+    def animate_send(self, src, dst, latency):
+        pass
+
+
+def hop_ns(PacketClass, hops, num_packets):
+    """Return the ns per hop spent copying packets and extending their route."""
+    start = time.perf_counter()
+    for _ in range(num_packets):
+        packet = PacketClass(Packet.TRACEROUTE, "n0", "n1")
+        for _ in range(hops):
+            packet = packet.copy()
+            packet.add_to_route("n1")
+        packet.route
+    return (time.perf_counter() - start) * 1e9 / (hops * num_packets)
+
+
+def run(PacketClass, hops, num_packets):
+    """Forward `num_packets` traceroutes along `hops` links, return (hops/s, peak KiB)."""
+    engine = EventEngine()
+    nodes = [f"n{i}" for i in range(hops + 1)]
+    links = [Link(a, b, 1, 1, 1, engine) for a, b in zip(nodes, nodes[1:])]
+    delivered = []
+
+    def forward(i):
+        # Node i + 1 received a packet on link i: pass it on or report its route
+        packet = links[i].recv(nodes[i + 1])
+        if i + 1 < hops:
+            links[i + 1].send(packet, nodes[i + 1])
+        else:
+            delivered.append(packet.route == nodes)
+
+    for i, link in enumerate(links):
+        link.set_listener(nodes[i + 1], lambda i=i: forward(i))
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    for t in range(num_packets):
+        engine.schedule(t, links[0].send, PacketClass(Packet.TRACEROUTE, "n0", nodes[-1]), "n0")
+    engine.run(num_packets + hops + 1)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(delivered) == num_packets and all(delivered)
+    return hops * num_packets / elapsed, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark packet copies on long paths.")
+    parser.add_argument("--hops", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--packets", type=int, default=None,
+                        help="Packets per path (default: about 100000 hops in total)")
+    args = parser.parse_args()
+
+    print(f"{'':13s} {'ns per hop':>17s}  {'hops/s over links':>17s}  {'peak KiB':>17s}")
+    print(f"{'hops':>5s} {'packets':>7s} " + "  ".join(["    list   Packet"] * 3))
+    for hops in args.hops:
+        num_packets = args.packets or max(100000 // hops, 10)
+        work = [hop_ns(cls, hops, num_packets) for cls in (ListPacket, Packet)]
+        (old_rate, old_peak), (new_rate, new_peak) = (
+            run(cls, hops, num_packets) for cls in (ListPacket, Packet)
+        )
+        print(f"{hops:5d} {num_packets:7d} {work[0]:8.0f} {work[1]:8.0f}  "
+              f"{old_rate:8.0f} {new_rate:8.0f}  {old_peak:8.0f} {new_peak:8.0f}")
+
+
+if __name__ == "__main__":
+    main()
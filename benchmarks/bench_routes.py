@@ -0,0 +1,118 @@
+"""
+Compare RouteRecorder with the route tracking it replaced in Network: one global lock
+for every report, correct routes kept as lists of lists and the route string rebuilt
+and sorted on every call. Client threads report routes for all pairs of a generated
+set of clients (the last of several correct routes) and the benchmark reports the
+reports per second, then the time of a success check and of a route string refresh
+while nothing changes, as the visualizer does periodically.
+
+Usage: python benchmarks/bench_routes.py [--clients N] [--reports N] [--routes N]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from routes import RouteRecorder
+
+
+class GlobalLockRoutes:
+    """The previous tracking: a dict of routes behind one lock."""
+
+    def __init__(self, correct_routes):
+        self.correct_routes = defaultdict(list)
+        for route in correct_routes:
+            self.correct_routes[(route[0], route[-1])].append(route)
+        self.routes = {}
+        self.routes_lock = threading.Lock()
+
+    def record(self, src, dst, route, time_ms):
+        with self.routes_lock:
+            is_good = route in self.correct_routes[(src, dst)]
+            current = self.routes.get((src, dst))
+            if current is None or time_ms > current[2]:
+                self.routes[(src, dst)] = (route, is_good, time_ms)
+
+    def all_correct(self):
+        with self.routes_lock:
+            return bool(self.routes) and all(good for _, good, _ in self.routes.values())
+
+    def route_string(self, label_incorrect=True):
+        with self.routes_lock:
+            route_strings = sorted(
+                f"{src} -> {dst}: {route} "
+                f"{'' if (good or not label_incorrect) else 'Incorrect Route'}"
+                for (src, dst), (route, good, _) in self.routes.items()
+            )
+        return "\n".join(route_strings)
+
+
+def make_routes(num_clients, routes_per_pair):
+    """Return (correct routes, route reported per pair) for every pair of clients."""
+    clients = [f"c{i}" for i in range(num_clients)]
+    correct = []
+    reported = {}
+    for src in clients:
+        for dst in clients:
+            if src == dst:
+                continue
+            paths = [[src] + [f"r{k}_{j}" for j in range(8)] + [dst]
+                     for k in range(routes_per_pair)]
+            correct.extend(paths)
+            reported[(src, dst)] = paths[-1]
+    return correct, reported
+
+
+def report_rate(tracker, reported, num_threads, reports):
+    """Report routes from `num_threads` threads, return reports per second."""
+    pairs = list(reported.items())
+
+    def client(offset):
+        for i in range(reports):
+            (src, dst), route = pairs[(offset + i) % len(pairs)]
+            tracker.record(src, dst, list(route), i)
+
+    threads = [threading.Thread(target=client, args=(t,)) for t in range(num_threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return num_threads * reports / (time.perf_counter() - start)
+
+
+def time_us(fn, runs=200):
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - start) * 1e6 / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark route recording.")
+    parser.add_argument("--clients", type=int, default=30)
+    parser.add_argument("--reports", type=int, default=20000, help="Reports per thread")
+    parser.add_argument("--routes", type=int, default=4, help="Correct routes per pair")
+    args = parser.parse_args()
+
+    correct, reported = make_routes(args.clients, args.routes)
+    print(f"{args.clients} clients, {len(reported)} pairs, {args.routes} correct routes "
+          "per pair")
+    print(f"{'tracker':14s} {'reports/s':>10s} {'check us':>9s} {'refresh us':>11s}")
+    for name, Tracker in (("global lock", GlobalLockRoutes), ("RouteRecorder", RouteRecorder)):
+        tracker = Tracker(correct)
+        rate = report_rate(tracker, reported, args.clients, args.reports)
+        assert tracker.all_correct()
+        check = time_us(tracker.all_correct)
+        tracker.route_string(label_incorrect=False)
+        refresh = time_us(lambda: tracker.route_string(label_incorrect=False))
+        print(f"{name:14s} {rate:10.0f} {check:9.2f} {refresh:11.2f}")
+
+
+if __name__ == "__main__":
+    main()
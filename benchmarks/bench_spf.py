@@ -0,0 +1,167 @@
+"""
+Compare the SPF time per received LSA of the full Dijkstra in
+LSrouter.compute_forwarding_table with the incremental LSrouter.update_link_state.
+
+With --check N it instead checks the distances and equal-cost first hops kept by the
+incremental path against a full Dijkstra on N small random topologies while links are
+added, removed and changed. Some edges cost 0 in one direction, like those from an ABR
+to its virtual nodes, so nodes at the same distance are reached through each other.
+
+Usage: python benchmarks/bench_spf.py [--routers N] [--lsas N] [--check N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import spf
+from graphs import random_graph
+from LSrouter import LSrouter
+
+
+def make_router(topology):
+    """Create an LSrouter for "r0" that already knows every LSA in `topology`."""
+    router = LSrouter("r0", heartbeat_time=1000, spf_hold_time=0)
+    for port, (neighbor, cost) in enumerate(topology["r0"].items()):
+        router.handle_new_link(port, neighbor, cost)
+    for origin, link_state in topology.items():
+        if origin != "r0":
+            router.update_link_state(origin, dict(link_state))
+    return router
+
+
+def make_lsas(topology, kind, count, rng):
+    """Generate `count` LSAs of the given kind ("refresh", "cost" or "client")."""
+    origins = [r for r in topology if r != "r0"]
+    lsas = []
+    for _ in range(count):
+        origin = rng.choice(origins)
+        link_state = dict(topology[origin])
+        if kind == "cost":
+            neighbor = rng.choice([n for n in link_state if n.startswith("r")])
+            link_state[neighbor] = rng.randint(1, 10)
+        elif kind == "client":
+            link_state[f"c{rng.randrange(10**6)}"] = rng.randint(1, 10)
+        topology[origin] = link_state
+        lsas.append((origin, link_state))
+    return lsas
+
+
+def reference_hops(topology, source):
+    """Return the distances and the sets of equal-cost first hops from `source`."""
+    dist = spf.heap_spf(topology, source)[0]
+    hops = {node: set() for node in dist if node != source}
+    # Propagate first hops along shortest path edges until nothing changes
+    changed = True
+    while changed:
+        changed = False
+        for u in dist:
+            for v, cost in topology.get(u, {}).items():
+                if v == source or dist[u] + cost != dist[v]:
+                    continue
+                new = {v} if u == source else hops[u]
+                if not new <= hops[v]:
+                    hops[v] |= new
+                    changed = True
+    return dist, {node: frozenset(h) for node, h in hops.items()}
+
+
+def set_link(topology, nodes, u, v, rng):
+    """Add a link between `u` and `v`, free from the first of them in `nodes`."""
+    cost = rng.randint(0, 3)
+    if nodes.index(u) > nodes.index(v):
+        u, v = v, u
+    topology[u][v] = cost
+    topology[v][u] = max(cost, 1)
+
+
+def random_topology(rng):
+    """Return a small random topology with zero-cost edges that form no cycle."""
+    nodes = [f"r{i}" for i in range(rng.randint(4, 12))]
+    topology = {node: {} for node in nodes}
+    for i, u in enumerate(nodes):
+        for v in nodes[i + 1:]:
+            if rng.random() < 0.35:
+                set_link(topology, nodes, u, v, rng)
+    for area in range(2):
+        abr = rng.choice(nodes)
+        virtual = f"{abr}/{area}"
+        topology[abr][virtual] = 0
+        topology[virtual] = {
+            dst: rng.randint(1, 4) for dst in rng.sample(nodes, 2) if dst != abr
+        }
+    return nodes, topology
+
+
+def check(rounds, changes=25):
+    """Check incremental SPF and ECMP against `reference_hops`, return the failures."""
+    failures = 0
+    for seed in range(rounds):
+        rng = random.Random(seed)
+        nodes, topology = random_topology(rng)
+        router = LSrouter("r0", heartbeat_time=1000, spf_hold_time=0)
+        for _ in range(changes):
+            for origin in rng.sample(list(topology), len(topology)):
+                router.update_link_state(origin, dict(topology[origin]))
+            for neighbor in topology["r0"]:
+                router.neighbor_to_port.setdefault(neighbor, len(router.neighbor_to_port))
+            if (router.dist, router.equal_cost_hops) != reference_hops(topology, "r0"):
+                failures += 1
+                break
+            # Remove a link or add one / change its cost, in both directions
+            u, v = rng.sample(nodes, 2)
+            if v in topology[u] and rng.random() < 0.5:
+                del topology[u][v], topology[v][u]
+            else:
+                set_link(topology, nodes, u, v, rng)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SPF per LSA.")
+    parser.add_argument("--routers", type=int, default=1000)
+    parser.add_argument("--lsas", type=int, default=200)
+    parser.add_argument("--check", type=int, metavar="N",
+                        help="Check incremental SPF on N random topologies instead")
+    args = parser.parse_args()
+
+    if args.check:
+        failures = check(args.check)
+        print(f"{args.check} topologies, {failures} diverged from a full Dijkstra")
+        sys.exit(1 if failures else 0)
+
+    topology = random_graph(args.routers, num_clients=args.routers // 2)
+    full = make_router(topology)
+    incremental = make_router(topology)
+    rng = random.Random(1)
+
+    print(f"{args.routers} routers, {args.lsas} LSAs per kind (ms per LSA)")
+    print(f"{'kind':10s} {'full':>10s} {'incremental':>12s} {'speedup':>8s}")
+    for kind in ("refresh", "cost", "client"):
+        lsas = make_lsas(topology, kind, args.lsas, rng)
+
+        start = time.perf_counter()
+        for origin, link_state in lsas:
+            full.topology[origin] = dict(link_state)
+            full.spf_engine.update(origin)
+            full.compute_forwarding_table()
+        full_ms = (time.perf_counter() - start) * 1000 / len(lsas)
+
+        start = time.perf_counter()
+        for origin, link_state in lsas:
+            incremental.update_link_state(origin, dict(link_state))
+        incremental_ms = (time.perf_counter() - start) * 1000 / len(lsas)
+
+        assert full.dist == incremental.dist, "incremental SPF diverged"
+        print(
+            f"{kind:10s} {full_ms:10.3f} {incremental_ms:12.4f} "
+            f"{full_ms / max(incremental_ms, 1e-9):7.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
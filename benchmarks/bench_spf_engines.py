@@ -0,0 +1,63 @@
+"""
+Compare the SPF engines of spf.py (heap, dial, array, auto) on generated topologies
+from 100 to 10k routers, with unit costs, costs up to 10 (like the scenario files)
+and costs up to 1000 (beyond the dial engine, which falls back to heap), plus
+fractional costs where every engine falls back to heap. Reports the time of one full
+SPF from a router and checks that every engine finds the same distances.
+
+Usage: python benchmarks/bench_spf_engines.py [--sizes N ...] [--runs N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import spf
+from graphs import random_graph
+
+COSTS = [("1", 1), ("1-10", 10), ("1-1000", 1000), ("fraction", None)]
+
+
+def make_topology(size, max_cost):
+    """Generate a topology with `size` routers and size/2 clients."""
+    topology = random_graph(size, max_cost=max_cost or 10, num_clients=size // 2)
+    if max_cost is None:
+        topology = {
+            node: {neighbor: cost + 0.5 for neighbor, cost in links.items()}
+            for node, links in topology.items()
+        }
+    return topology
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SPF engines.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--runs", type=int, default=None,
+                        help="SPF runs per engine (default: about 20000 / size)")
+    args = parser.parse_args()
+
+    print(f"{'routers':>7s} {'costs':>8s} "
+          + " ".join(f"{name:>9s}" for name in spf.ENGINES) + "   (ms per SPF)")
+    for size in args.sizes:
+        runs = args.runs or max(20000 // size, 3)
+        for label, max_cost in COSTS:
+            topology = make_topology(size, max_cost)
+            reference = None
+            times = []
+            for name in spf.ENGINES:
+                engine = spf.make_engine(name, topology)
+                start = time.perf_counter()
+                for _ in range(runs):
+                    dist, _, _ = engine.shortest_path_tree("r0")
+                times.append((time.perf_counter() - start) * 1000 / runs)
+                if reference is None:
+                    reference = dist
+                assert dist == reference, f"{name} engine found different distances"
+            print(f"{size:7d} {label:>8s} " + " ".join(f"{t:9.3f}" for t in times))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+Helpers that run a scenario on the discrete-event engine and measure how long the
+routers take to converge after the start and after each link change.
+
+Correctness is judged against the lowest-cost routes of the topology in effect at the
+time a traceroute is delivered (computed here), not against the final `correct_routes`
+of the JSON file, so every change event gets its own convergence time.
+"""
+
+import contextlib
+import functools
+import heapq
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import link
+from network import Network
+
+
+def shortest_routes(links, clients):
+    """
+    Return the set of lowest-cost routes (as tuples) between every pair of clients.
+    `links` maps (addr1, addr2) to (cost12, cost21). Clients are never used as transit.
+    """
+    adj = defaultdict(dict)
+    for (a, b), (c_ab, c_ba) in links.items():
+        adj[a][b] = c_ab
+        adj[b][a] = c_ba
+
+    routes = set()
+    for src in clients:
+        best = {}
+        for first, first_cost in adj[src].items():
+            dist = {first: 0}
+            preds = defaultdict(list)
+            pq = [(0, first)]
+            while pq:
+                d, node = heapq.heappop(pq)
+                if d > dist[node] or (node in clients and node != first):
+                    continue
+                for nbr, cost in adj[node].items():
+                    nd = d + cost
+                    if nbr not in dist or nd < dist[nbr]:
+                        dist[nbr] = nd
+                        preds[nbr] = [node]
+                        heapq.heappush(pq, (nd, nbr))
+                    elif nd == dist[nbr]:
+                        preds[nbr].append(node)
+            for dst in clients:
+                if dst not in dist:
+                    continue
+                total = first_cost + dist[dst]
+                if dst in best and total > best[dst][0]:
+                    continue
+                paths = _enumerate_paths(preds, first, dst)
+                paths = {(src,) + p for p in paths}
+                if dst in best and total == best[dst][0]:
+                    best[dst][1].update(paths)
+                else:
+                    best[dst] = (total, paths)
+        for _, paths in best.values():
+            routes.update(paths)
+    return routes
+
+
+def _enumerate_paths(preds, start, end):
+    if end == start:
+        return {(start,)}
+    paths = set()
+    for pred in preds[end]:
+        for path in _enumerate_paths(preds, start, pred):
+            paths.add(path + (end,))
+    return paths
+
+
+class _Recorder:
+    """
+    Record traceroute results and routing traffic during a run. Each traceroute is
+    stamped with its send time, so results are attributed to the time the probe was
+    sent and probes that never arrive count as incorrect. A probe disrupted by a
+    change is judged after the change, and recorded as unknown (None) at its send time.
+    """
+
+    def __init__(self, net, net_json):
+        self.net = net
+        self.links = {}
+        for addr1, addr2, _, _, c12, c21 in net_json["links"]:
+            self.links[(addr1, addr2)] = (c12, c21)
+        self.clients = set(net_json["clients"])
+        self.update_correct()
+        self.outcomes = []  # (send time, src, dst, is_good)
+        self.pending = {}  # (send time, src, dst) -> correct routes at send time
+        self.last_seen = {}  # (send time, src, dst) -> time of the last hop's arrival
+        self.reachable_after = {}  # change time -> reachable pairs after the change
+        self.last_change_time = 0
+        self.routing_packets = 0
+        self.routing_bytes = 0
+        self.routing_times = []  # send time of every routing packet
+        self.lost = []  # (attributed time, send time) of lost traceroutes
+
+    def update_correct(self):
+        self.correct = shortest_routes(self.links, self.clients)
+        self.reachable = {(route[0], route[-1]) for route in self.correct}
+
+    def handle_packet(self, packet):
+        if packet.is_traceroute and packet.content:
+            key = (int(packet.content), packet.src_addr, packet.dst_addr)
+            correct = self.pending.pop(key, None)
+            if correct is None:
+                return
+            route = tuple(packet.route)
+            self.last_seen.pop(key, None)
+            send_time, src, dst = key
+            if route in correct:
+                self.outcomes.append((send_time, src, dst, True))
+            elif self.last_change_time > send_time:
+                # The traceroute was in flight during a change, judge it after it
+                # unless the change left its destination unreachable
+                if (src, dst) in self.reachable:
+                    is_good = route in self.correct
+                    self.outcomes.append((self.last_change_time, src, dst, is_good))
+                self.outcomes.append((send_time, src, dst, None))
+            else:
+                self.outcomes.append((send_time, src, dst, False))
+
+    def apply_change(self, original, change, target):
+        if change == "up":
+            addr1, addr2, _, _, c12, c21 = target
+            self.links[(addr1, addr2)] = (c12, c21)
+        elif change == "down":
+            self.links.pop(tuple(target), None)
+        elif change == "cost":
+            addr1, addr2, c12, c21 = target
+            self.links[(addr1, addr2)] = (c12, c21)
+        original(change, target)
+        self.update_correct()
+        self.last_change_time = self.net.time_ms()
+        self.reachable_after[self.last_change_time] = self.reachable
+
+    def send(self, original, link_self, packet, src):
+        if packet.is_routing:
+            self.routing_packets += 1
+            self.routing_bytes += len(packet.content or "")
+            self.routing_times.append(self.net.time_ms())
+        else:
+            if packet.content is None and src == packet.src_addr:
+                # A client sends a new traceroute
+                time_ms = int(self.net.time_ms())
+                packet.content = str(time_ms)
+                if (packet.src_addr, packet.dst_addr) in self.reachable:
+                    key = (time_ms, packet.src_addr, packet.dst_addr)
+                    self.pending[key] = self.correct
+            key = (int(packet.content), packet.src_addr, packet.dst_addr)
+            if key in self.pending:
+                latency = link_self.l12 if src == link_self.e1 else link_self.l21
+                self.last_seen[key] = self.net.time_ms() + latency
+        original(link_self, packet, src)
+
+    def finish(self, event_times):
+        """
+        Count undelivered traceroutes as incorrect. A traceroute that was still in
+        flight when a change happened is attributed to the time of that change, or
+        ignored if the change left its destination unreachable.
+        """
+        for key in self.pending:
+            send_time, src, dst = key
+            lost_time = self.last_seen.get(key, send_time)
+            for event_time in event_times:
+                if send_time < event_time <= lost_time:
+                    send_time = event_time
+            if send_time != key[0]:
+                self.outcomes.append((key[0], src, dst, None))
+            if (src, dst) in self.reachable_after.get(send_time, {(src, dst)}):
+                self.outcomes.append((send_time, src, dst, False))
+                self.lost.append((send_time, key[0]))
+        self.pending = {}
+
+
+def _timed_step(step, cpu_ms, addr, time_ms):
+    start = time.process_time()
+    step(time_ms)
+    cpu_ms[addr] += (time.process_time() - start) * 1000
+
+
+def isolate_g(net_json):
+    """
+    Take down both remaining links of G at the end of the pg244 scenario, a
+    `run_scenario` transform after which distance vector counts to infinity.
+    """
+    net_json["changes"] += [[36, ["G", "F"], "down"], [36, ["D", "G"], "down"]]
+    net_json["end_time"] = 500
+
+
+def run_scenario(net_json_path, RouterClass, send_rate=1, transform=None, **kwargs):
+    """
+    Run the scenario at `net_json_path` (or a parsed scenario dict) on the event
+    engine and return a dict with the convergence time (ms) after the start and after
+    each change, the routing traffic, the CPU time (ms) spent in the main loop of each
+    router ("cpu_ms") and the `Network` that ran. Each event also reports the time
+    until every pair first had a correct route at once ("first_correct_ms"), measured
+    like the convergence time but possibly followed by incorrect routes, the routing
+    packets sent until the next event and the time of the last one ("settled_ms"),
+    which includes periodic updates, and the traceroutes lost after it with the send
+    time of the last one ("black_hole_ms"). Clients send traceroutes every
+    `send_rate` (in units of the JSON file), `transform` may edit the parsed JSON
+    before the run and `kwargs` are passed to the router constructor.
+    """
+    if isinstance(net_json_path, dict):
+        net_json = json.loads(json.dumps(net_json_path))
+    else:
+        with open(net_json_path) as f:
+            net_json = json.load(f)
+    net_json["client_send_rate"] = send_rate
+    if transform:
+        transform(net_json)
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(net_json, f)
+        path = f.name
+    try:
+        if kwargs:
+            RouterClass = functools.partial(RouterClass, **kwargs)
+        net = Network(path, RouterClass, engine="des")
+    finally:
+        os.unlink(path)
+
+    multiplier = net.latency_multiplier
+    recorder = _Recorder(net, net_json)
+    for client in net.clients.values():
+        client.handle_packet = recorder.handle_packet
+    net.apply_change = functools.partial(recorder.apply_change, net.apply_change)
+    cpu_ms = dict.fromkeys(net.routers, 0.0)
+    for addr, router in net.routers.items():
+        router.step = functools.partial(_timed_step, router.step, cpu_ms, addr)
+    original_send = link.Link.send
+    link.Link.send = lambda self, packet, src: recorder.send(
+        original_send, self, packet, src
+    )
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            net.run_des()
+        # Let traceroutes still in flight arrive, anything left over was lost
+        net.engine.run(net.engine.now + 100 * multiplier)
+    finally:
+        link.Link.send = original_send
+    events = [(0, "start", None)]
+    for change_time, target, change in sorted(
+        net_json.get("changes", []), key=lambda c: c[0]
+    ):
+        events.append((change_time * multiplier, change, target))
+    recorder.finish([start for start, _, _ in events])
+    results = []
+    for start, change, target in events:
+        end = min([t for t, _, _ in events if t > start] + [net.end_time])
+        window = sorted(
+            (r for r in recorder.outcomes if start <= r[0] < end),
+            key=lambda r: r[0],
+        )
+        num_pairs = len({(src, dst) for _, src, dst, _ in window})
+        last = {}
+        bad = set()
+        last_bad = None
+        first_correct = None
+        for i, (time_ms, src, dst, is_good) in enumerate(window):
+            # A probe disrupted by the next change says nothing about this window
+            last[(src, dst)] = is_good is not False
+            if is_good is False:
+                last_bad = time_ms
+                bad.add((src, dst))
+            else:
+                bad.discard((src, dst))
+            round_over = i + 1 == len(window) or window[i + 1][0] != time_ms
+            if first_correct is None and round_over and not bad and len(last) == num_pairs:
+                first_correct = last_bad - start if last_bad is not None else 0
+        converged = all(last.values()) and len(last) > 0
+        routing_times = [t for t in recorder.routing_times if start <= t < end]
+        lost = [sent for t, sent in recorder.lost if start <= t < end]
+        results.append(
+            {
+                "time_ms": start,
+                "change": change,
+                "target": target,
+                "converged_ms": (
+                    (last_bad - start if last_bad is not None else 0)
+                    if converged
+                    else None
+                ),
+                "first_correct_ms": first_correct,
+                "routing_packets": len(routing_times),
+                "settled_ms": routing_times[-1] - start if routing_times else 0,
+                "lost_probes": len(lost),
+                "black_hole_ms": max(max(lost) - start, 0) if lost else 0,
+            }
+        )
+    return {
+        "events": results,
+        "routing_packets": recorder.routing_packets,
+        "routing_bytes": recorder.routing_bytes,
+        "cpu_ms": cpu_ms,
+        "network": net,
+    }
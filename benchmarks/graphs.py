@@ -0,0 +1,134 @@
+"""Helpers that generate router topologies for the benchmarks."""
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import spf
+
+
+def random_graph(num_routers, degree=4, max_cost=10, num_clients=0, seed=0):
+    """
+    Return a connected random topology as a dict mapping each router to a dict of
+    {neighbor: cost}. Routers are "r0".."rN" and form a ring plus random chords so
+    that each router has about `degree` neighbors. Each of the `num_clients` clients
+    "c0".."cM" is attached to a random router.
+    """
+    rng = random.Random(seed)
+    routers = [f"r{i}" for i in range(num_routers)]
+    topology = {r: {} for r in routers}
+
+    def connect(a, b):
+        cost = rng.randint(1, max_cost)
+        topology[a][b] = cost
+        topology[b][a] = cost
+
+    for i in range(num_routers):
+        connect(routers[i], routers[(i + 1) % num_routers])
+    for _ in range(num_routers * (degree - 2) // 2):
+        a, b = rng.sample(routers, 2)
+        connect(a, b)
+    for i in range(num_clients):
+        topology[rng.choice(routers)][f"c{i}"] = 1
+    return topology
+
+
+def area_graph(num_areas, area_size, degree=4, max_cost=10, num_clients=0, seed=0):
+    """
+    Return (topology, areas) for a network of `num_areas` areas of `area_size` routers
+    each, in the format of `random_graph`, and a dict mapping each area id to its
+    routers. Area i is a ring plus random chords over routers "a<i>r0".."a<i>rN"; its
+    first two routers are area border routers, which also belong to the backbone
+    (area "0") and are chained in a ring across areas.
+    """
+    rng = random.Random(seed)
+    topology = {}
+    areas = {"0": []}
+
+    def connect(a, b):
+        cost = rng.randint(1, max_cost)
+        topology[a][b] = cost
+        topology[b][a] = cost
+
+    for i in range(1, num_areas + 1):
+        routers = [f"a{i}r{j}" for j in range(area_size)]
+        for r in routers:
+            topology[r] = {}
+        for j in range(area_size):
+            connect(routers[j], routers[(j + 1) % area_size])
+        for _ in range(area_size * (degree - 2) // 2):
+            a, b = rng.sample(routers, 2)
+            connect(a, b)
+        areas[str(i)] = routers
+        areas["0"].extend(routers[:2])
+    border = areas["0"]
+    for j in range(1, len(border), 2):
+        connect(border[j], border[(j + 1) % len(border)])
+    routers = sorted(topology)
+    for i in range(num_clients):
+        topology[rng.choice(routers)][f"c{i}"] = 1
+    return topology, areas
+
+
+def max_route_cost(topology):
+    """
+    Return the largest lowest-cost distance from a router to another router or client
+    of `topology`, plus the largest client link cost: a bound on the cost of a route.
+    """
+    client_costs = [c for nbrs in topology.values() for n, c in nbrs.items() if n not in topology]
+    return max(
+        max(spf.heap_spf(topology, router)[0].values()) for router in topology
+    ) + max(client_costs, default=0)
+
+
+def dv_infinity(topology, link):
+    """
+    Return a DVrouter infinity above the cost of every route of `topology`, with and
+    without the router `link` (a pair of addresses), and at least the RIP default 16.
+    """
+    without_link = {
+        a: {b: c for b, c in nbrs.items() if {a, b} != set(link)}
+        for a, nbrs in topology.items()
+    }
+    return max(16, max_route_cost(topology), max_route_cost(without_link)) + 1
+
+
+def network_json(topology, end_time=100, client_send_rate=10, changes=(), areas=None,
+                 infinity=None):
+    """
+    Return a network description in the format of the scenario JSON files for a
+    topology from `random_graph` or `area_graph` (with its `areas`). Ports are
+    numbered per node in link order, and `changes` holds [time, [addr1, addr2],
+    "down"|"up"] entries for router links. `infinity`, if given, is the largest
+    route cost of DVrouter.
+    """
+    ports = {}
+    links = {}
+    for a in sorted(topology):
+        for b, cost in topology[a].items():
+            if (b, a) in links:
+                continue
+            ports[a] = ports.get(a, 0) + 1
+            ports[b] = ports.get(b, 0) + 1
+            links[(a, b)] = [a, b, ports[a], ports[b], cost, topology.get(b, {a: cost})[a]]
+    clients = sorted({n for nbrs in topology.values() for n in nbrs if n not in topology})
+    net_changes = []
+    for time, (a, b), change in changes:
+        link = links.get((a, b)) or links[(b, a)]
+        net_changes.append([time, link if change == "up" else link[:2], change])
+    net_json = {
+        "routers": sorted(topology),
+        "clients": clients,
+        "client_send_rate": client_send_rate,
+        "end_time": end_time,
+        "links": list(links.values()),
+        "changes": net_changes,
+        "correct_routes": [],
+    }
+    if areas is not None:
+        net_json["areas"] = areas
+    if infinity is not None:
+        net_json["infinity"] = infinity
+    return net_json
@@ -0,0 +1,194 @@
+"""
+Benchmark suite comparing LSrouter and DVrouter on the scenario files and on generated
+topologies of increasing size (see graphs.random_graph), where one router link goes
+down and comes back up during the run. For every run it reports the time to the first
+moment all routes are correct and to convergence after the start and after each
+change, the routing packets and bytes sent, the route computations (SPF runs for
+LSrouter, update_routes calls for DVrouter) and the CPU time spent per router.
+
+The results are written as JSON (one record per run, with the commit they were
+measured on) so that they can be kept and compared across commits with --compare.
+
+Usage: python benchmarks/suite.py [--sizes N ...] [--output PATH] [--compare PATH]
+           [--scenarios-only | --generated-only]
+"""
+
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+
+from convergence import run_scenario
+from DVrouter import DVrouter
+from graphs import dv_infinity, network_json, random_graph
+from LSrouter import LSrouter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ROUTERS = {"LS": LSrouter, "DV": DVrouter}
+
+# Metrics compared by --compare, lower is better for all of them
+METRICS = [
+    "first_correct_ms",
+    "converged_ms",
+    "routing_packets",
+    "routing_bytes",
+    "computations",
+    "cpu_ms_total",
+]
+
+
+def generated_scenario(size, seed=0):
+    """
+    Return the network JSON of a generated topology with `size` routers and link
+    costs from 1 to 10, with a DVrouter infinity above the cost of every route.
+    """
+    topology = random_graph(size, num_clients=max(size // 5, 2), seed=seed)
+    link = ("r0", next(n for n in topology["r0"] if n in topology))
+    changes = [[40, link, "down"], [60, link, "up"]]
+    return network_json(
+        topology, end_time=80, changes=changes, infinity=dv_infinity(topology, link)
+    )
+
+
+def computations(router):
+    """Return the number of route computations of `router`."""
+    if isinstance(router, LSrouter):
+        return router.spf_executed
+    return router.route_computations
+
+
+def run(name, scenario, router_name, send_rate):
+    """Run `scenario` (a path or a network JSON dict) and return its record."""
+    wall_start = time.perf_counter()
+    result = run_scenario(scenario, ROUTERS[router_name], send_rate=send_rate)
+    wall_s = time.perf_counter() - wall_start
+    routers = result["network"].routers
+    cpu_ms = result["cpu_ms"]
+    events = [
+        {
+            "time_ms": e["time_ms"],
+            "change": e["change"],
+            "target": e["target"],
+            "first_correct_ms": e["first_correct_ms"],
+            "converged_ms": e["converged_ms"],
+            "routing_packets": e["routing_packets"],
+            "lost_probes": e["lost_probes"],
+        }
+        for e in result["events"]
+    ]
+    start = events[0]
+    return {
+        "scenario": name,
+        "router": router_name,
+        "routers": len(routers),
+        "first_correct_ms": start["first_correct_ms"],
+        "converged_ms": start["converged_ms"],
+        "reconverged_ms": [e["converged_ms"] for e in events[1:]],
+        "routing_packets": result["routing_packets"],
+        "routing_bytes": result["routing_bytes"],
+        "computations": sum(computations(r) for r in routers.values()),
+        "cpu_ms_total": round(sum(cpu_ms.values()), 3),
+        "cpu_ms_max": round(max(cpu_ms.values(), default=0), 3),
+        "cpu_ms": {addr: round(ms, 3) for addr, ms in sorted(cpu_ms.items())},
+        "events": events,
+        "wall_s": round(wall_s, 3),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def format_ms(value):
+    return "never" if value is None else str(value)
+
+
+def compare(records, baseline_path):
+    """Print the relative change of each metric against a previous suite output."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    old = {(r["scenario"], r["router"]): r for r in baseline["runs"]}
+    print(f"\nchanges against {baseline_path} (commit {baseline.get('commit')}):",
+          file=sys.stderr)
+    for record in records:
+        previous = old.get((record["scenario"], record["router"]))
+        if previous is None:
+            continue
+        changes = []
+        for metric in METRICS:
+            before, after = previous.get(metric), record.get(metric)
+            if before == after:
+                continue
+            if before is None or after is None or before == 0:
+                changes.append(f"{metric} {format_ms(before)} -> {format_ms(after)}")
+            else:
+                changes.append(f"{metric} {(after - before) / before:+.1%}")
+        if changes:
+            print(f"  {record['scenario']} {record['router']}: " + ", ".join(changes),
+                  file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LSrouter and DVrouter.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 25, 50, 100],
+                        help="Router counts of the generated topologies")
+    parser.add_argument("--send-rate", type=float, default=1)
+    parser.add_argument("--output", help="Write the JSON results here (default: stdout)")
+    parser.add_argument("--compare", help="Previous JSON results to compare against")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--scenarios-only", action="store_true")
+    group.add_argument("--generated-only", action="store_true")
+    args = parser.parse_args()
+
+    scenarios = []
+    if not args.generated_only:
+        for path in sorted(glob.glob(os.path.join(ROOT, "*.json"))):
+            scenarios.append((os.path.basename(path), path))
+    if not args.scenarios_only:
+        for size in args.sizes:
+            scenarios.append((f"random_{size}", generated_scenario(size)))
+
+    records = []
+    for name, scenario in scenarios:
+        for router_name in ROUTERS:
+            record = run(name, scenario, router_name, args.send_rate)
+            records.append(record)
+            print(
+                f"{name:26s} {router_name} first correct "
+                f"{format_ms(record['first_correct_ms'])} ms, converged "
+                f"{format_ms(record['converged_ms'])} ms, reconverged "
+                f"{'/'.join(map(format_ms, record['reconverged_ms'])) or '-'} ms, "
+                f"{record['routing_packets']} packets, {record['computations']} "
+                f"computations, CPU {record['cpu_ms_total']:.1f} ms "
+                f"(max {record['cpu_ms_max']:.1f} ms per router)",
+                file=sys.stderr,
+            )
+
+    output = {
+        "commit": git_commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "send_rate": args.send_rate,
+        "runs": records,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(output, f, indent=1)
+    else:
+        json.dump(output, sys.stdout, indent=1)
+        print()
+    if args.compare:
+        compare(records, args.compare)
+
+
+if __name__ == "__main__":
+    main()
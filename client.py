@@ -1,6 +1,7 @@
 import time
 import queue
 from packet import Packet
+from scheduler import Inbox
 
 
 class Client:
@@ -19,13 +20,24 @@ class Client:
         self.sending = True
         self.link_changes = queue.Queue()
         self.keep_running = True
+        self.inbox = Inbox()
+        self.tick_ms = 100
+        self.next_time_ms = 0
+        self.round = 0  # Number of batches of traceroute packets sent
 
     def change_link(self, change):
         """Add a link to the client.
 
         The change argument should be a tuple ('add', link).
         """
+        if change[0] == "add":
+            change[1].set_listener(self.addr, self.notify)
         self.link_changes.put(change)
+        self.notify()
+
+    def notify(self):
+        """Wake up the main loop, e.g. because a packet was delivered."""
+        self.inbox.signal()
 
     def handle_packet(self, packet):
         """Handle receiving a packet.
@@ -37,10 +49,18 @@ class Client:
             self.update_fn(packet.src_addr, packet.dst_addr, packet.route)
 
     def send_traceroutes(self):
-        """Send "traceroute" packets to every other client in the network."""
+        """Send "traceroute" packets to every other client in the network.
+
+        Each batch is a new round, and the packets are reported to the probe ledger of
+        the link, if any.
+        """
+        self.round += 1
         for dst_client in self.all_clients:
             packet = Packet(Packet.TRACEROUTE, self.addr, dst_client)
+            packet.round = self.round
             if self.link:
+                if self.link.probes is not None:
+                    self.link.probes.sent(packet)
                 self.link.send(packet, self.addr)
             self.update_fn(packet.src_addr, packet.dst_addr, [])
 
@@ -53,18 +73,33 @@ class Client:
     def run(self):
         """Main loop of client."""
         while self.keep_running:
-            time.sleep(0.1)
-            time_ms = int(round(time.time() * 1000))
+            wait_ms = self.next_time_ms - time.time() * 1000
+            self.inbox.wait(max(wait_ms, 0) / 1000)
+            self.step(int(round(time.time() * 1000)))
+
+    def step(self, time_ms):
+        """Run one iteration of the main loop at time `time_ms`.
+
+        Apply pending link changes, receive every queued packet and call `handle_time`
+        if its deadline has passed.
+        """
+        while True:
             try:
                 change = self.link_changes.get_nowait()
-                if change[0] == "add":
-                    self.link = change[1]
             except queue.Empty:
-                pass
-            if self.link:
+                break
+            if change[0] == "add":
+                self.link = change[1]
+        if self.link:
+            packet = self.link.recv(self.addr)
+            while packet:
+                self.handle_packet(packet)
+                # Accounted for once its route is recorded
+                if self.link.probes is not None and packet.is_traceroute:
+                    self.link.probes.delivered(packet)
                 packet = self.link.recv(self.addr)
-                if packet:
-                    self.handle_packet(packet)
+        if time_ms >= self.next_time_ms:
+            self.next_time_ms = time_ms + self.tick_ms
             self.handle_time(time_ms)
 
     def last_send(self):
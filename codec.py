@@ -0,0 +1,149 @@
+"""
+Compact binary encoding shared by LSrouter and DVrouter for routing messages.
+
+A message carries an origin address, a sequence number, an age (in ms) and a dict of
+costs indexed by address. It is laid out as
+
+    kind (1 byte) | cost format (1 byte) | seq (uint32) | age (uint32) | origin
+    | n (uint16) | table size (uint32) | address table | n costs
+
+where the origin is a length-prefixed UTF-8 string, the address table holds the n
+addresses as UTF-8 strings separated by NUL bytes, and the costs are packed as uint32
+when they are all small non-negative integers, or as doubles otherwise. Decoded
+address tables are interned, so routers that keep receiving vectors over the same
+addresses share one tuple of address strings. Since `Link.send` requires
+`Packet.content` to be a string, the bytes travel as a latin-1 string.
+"""
+
+import struct
+import sys
+
+LSA = b"L"
+DV = b"D"
+# Distance vector update carrying only the entries changed since the previous update
+DV_DELTA = b"d"
+# Database synchronization on a new adjacency: a summary maps every origin in the
+# sender's LSDB to its sequence number, a request lists the origins it wants (or asks
+# a DVrouter neighbor for its full table)
+SUMMARY = b"S"
+REQUEST = b"R"
+# Diffusing computation of DVrouter in DUAL mode: a query or a reply carries the
+# sender's current distance to each destination it concerns
+QUERY = b"Q"
+REPLY = b"A"
+
+_HEADER = struct.Struct("!ccII")
+_TABLE = struct.Struct("!HI")
+_MAX_UINT32 = 2**32 - 1
+_MAX_TABLES = 4096
+
+# Encoded form of each origin address (length prefix + UTF-8 bytes)
+_encoded_origins = {}
+# Interned address tables indexed by their encoded bytes
+_decoded_tables = {}
+
+
+def _encode_origin(addr):
+    encoded = _encoded_origins.get(addr)
+    if encoded is None:
+        raw = addr.encode("utf-8")
+        encoded = bytes((len(raw),)) + raw
+        _encoded_origins[addr] = encoded
+    return encoded
+
+
+def _decode_origin(data):
+    end = _HEADER.size + 1 + data[_HEADER.size]
+    return sys.intern(data[_HEADER.size + 1 : end].decode("utf-8")), end
+
+
+def _decode_table(raw):
+    addrs = _decoded_tables.get(raw)
+    if addrs is None:
+        addrs = tuple(map(sys.intern, raw.decode("utf-8").split("\0"))) if raw else ()
+        if len(_decoded_tables) >= _MAX_TABLES:
+            _decoded_tables.clear()
+        _decoded_tables[raw] = addrs
+    return addrs
+
+
+def encode(kind, origin, seq, costs, age=0):
+    """Encode a routing message of the given kind (`LSA`, `DV`, ...) as a string."""
+    values = list(costs.values())
+    if all(type(c) is int and 0 <= c <= _MAX_UINT32 for c in values):
+        fmt = "I"
+    else:
+        fmt = "d"
+    table = "\0".join(costs).encode("utf-8")
+    return b"".join(
+        (
+            _HEADER.pack(kind, fmt.encode(), seq, min(int(age), _MAX_UINT32)),
+            _encode_origin(origin),
+            _TABLE.pack(len(values), len(table)),
+            table,
+            struct.pack(f"!{len(values)}{fmt}", *values),
+        )
+    ).decode("latin-1")
+
+
+def decode_header(content):
+    """
+    Return (kind, origin, seq, age) of an encoded message without decoding the costs.
+    Raise ValueError if `content` is not a valid message.
+    """
+    try:
+        data = content.encode("latin-1")
+        kind, _, seq, age = _HEADER.unpack_from(data)
+        origin, _ = _decode_origin(data)
+    except (struct.error, IndexError, UnicodeError) as e:
+        raise ValueError(f"invalid routing message: {e}")
+    return kind, origin, seq, age
+
+
+def decode(content):
+    """
+    Decode a routing message into (kind, origin, seq, age, costs). Raise ValueError
+    if `content` is not a valid message.
+    """
+    try:
+        data = content.encode("latin-1")
+        kind, fmt, seq, age = _HEADER.unpack_from(data)
+        origin, offset = _decode_origin(data)
+        count, table_size = _TABLE.unpack_from(data, offset)
+        offset += _TABLE.size
+        addrs = _decode_table(data[offset : offset + table_size])
+        offset += table_size
+        values = struct.unpack_from(f"!{count}{fmt.decode()}", data, offset)
+    except (struct.error, IndexError, UnicodeError) as e:
+        raise ValueError(f"invalid routing message: {e}")
+    if len(addrs) != count:
+        raise ValueError("invalid routing message: address table size mismatch")
+    return kind, origin, seq, age, dict(zip(addrs, values))
+
+
+class LSACache:
+    """
+    The LSACache class keeps the most recently decoded LSA of every origin, so an LSA
+    that is flooded to a router over several links is only decoded once.
+    """
+
+    def __init__(self):
+        self.entries = {}  # origin -> (seq, costs)
+        self.hits = 0
+        self.misses = 0
+
+    def decode(self, content):
+        """Decode an encoded LSA into (origin, seq, age, costs), reusing cached costs."""
+        _, origin, seq, age = decode_header(content)
+        entry = self.entries.get(origin)
+        if entry is not None and entry[0] == seq:
+            self.hits += 1
+            return origin, seq, age, entry[1]
+        self.misses += 1
+        _, origin, seq, age, costs = decode(content)
+        self.entries[origin] = (seq, costs)
+        return origin, seq, age, costs
+
+    def discard(self, origin):
+        """Forget the cached LSA of `origin`."""
+        self.entries.pop(origin, None)
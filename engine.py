@@ -0,0 +1,85 @@
+import heapq
+import itertools
+
+
+class EventEngine:
+    """
+    The EventEngine class drives the network as a discrete-event simulation. All
+    events live in a single heap ordered by their due time on a virtual clock (in
+    ms), so a run finishes as fast as the events can be processed instead of
+    sleeping for real latencies.
+
+    Events scheduled for the same time run in the order they were scheduled.
+    """
+
+    def __init__(self):
+        self.now = 0
+        self.events = []
+        self.counter = itertools.count()
+        self.stopped = False
+
+    def time_ms(self):
+        """Return the current virtual time in ms."""
+        return self.now
+
+    def schedule(self, delay, callback, *args):
+        """Run `callback(*args)` once `delay` ms of virtual time have passed."""
+        heapq.heappush(
+            self.events, (self.now + delay, next(self.counter), callback, args)
+        )
+
+    def run(self, until, done=None):
+        """
+        Process events in time order until the virtual clock reaches `until`, until
+        `stop` is called by one of them, or, if given, until `done()` returns True
+        after one of them.
+        """
+        events = self.events
+        self.stopped = False
+        while events and events[0][0] <= until:
+            due, _, callback, args = heapq.heappop(events)
+            self.now = due
+            callback(*args)
+            if self.stopped or (done is not None and done()):
+                return
+        self.now = max(self.now, until)
+
+    def stop(self):
+        """Make `run` return after the current event."""
+        self.stopped = True
+
+
+class EngineInbox:
+    """
+    The EngineInbox class replaces the `Inbox` of a client or router when the network
+    runs on the EventEngine. Signalling it schedules a single `step` of the node at
+    the current virtual time, and a timer event wakes the node at its next
+    `handle_time` deadline.
+    """
+
+    def __init__(self, engine, node):
+        self.engine = engine
+        self.node = node
+        self.pending = False
+        self.deadline = None
+
+    def signal(self):
+        """Schedule one main loop iteration of the node, unless one is pending."""
+        if not self.pending:
+            self.pending = True
+            self.engine.schedule(0, self.drain)
+
+    def drain(self):
+        """Run one main loop iteration and arm the timer for the next deadline."""
+        self.pending = False
+        self.node.step(self.engine.now)
+        if self.node.next_time_ms != self.deadline:
+            self.deadline = self.node.next_time_ms
+            self.engine.schedule(
+                self.deadline - self.engine.now, self.expire, self.deadline
+            )
+
+    def expire(self, deadline):
+        """Wake the node if `deadline` is still its current deadline."""
+        if deadline == self.deadline:
+            self.signal()
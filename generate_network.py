@@ -0,0 +1,552 @@
+"""
+Generate network simulation JSON files for large synthetic topologies.
+
+The topologies are grid, ring, random Waxman, Barabási–Albert and fat-tree graphs of
+routers "r0".."rN", with clients "c0".."cM" each attached to one router. The output
+uses the format of the supplied scenario files: `links`, optional `changes` (link
+failures that keep the routers connected and link flaps), a `visualize` layout and the
+`correct_routes` between every pair of clients in the final topology, computed by
+`correct_routes` below. The `infinity` of DVrouter, which bounds the cost of a route,
+is set above the cost of every lowest-cost route so that no route is unreachable.
+
+A link costs as many time units as its latency, so the largest route cost is also the
+time news takes to cross the network. The changes are spaced by `settle_time`, a few
+times that cost, and the run ends one `settle_time` after the last change. Requires
+NumPy.
+"""
+
+import argparse
+import json
+import math
+import random
+import sys
+
+import numpy as np
+
+TOPOLOGIES = ["grid", "ring", "waxman", "ba", "fattree"]
+
+# Default infinity of DVrouter, the generated files raise it when routes cost more
+DEFAULT_INFINITY = 16
+
+# Times the largest route cost routers get to converge after the start and each change
+SETTLE_ROUTE_COSTS = 2
+
+# Client send intervals added to that time, for traceroutes to show the new routes
+SETTLE_SEND_RATES = 3
+
+# Visualization settings shared with the supplied scenario files
+VISUALIZE = {
+    "canvas_width": 800,
+    "canvas_height": 800,
+    "time_multiplier": 20,
+    "latency_correction": 1.5,
+    "animate_rate": 40,
+    "router_color": "red",
+    "client_color": "DodgerBlue2",
+    "line_color": "orange",
+    "inactiveColor": "gray",
+    "line_width": 6,
+    "line_font_size": 16,
+}
+
+
+class Topology:
+    """
+    The Topology class holds a generated graph: the number of routers, their
+    undirected links as (i, j) pairs of router indices and a position in the unit
+    square for each router, used for the visualization layout.
+    """
+
+    def __init__(self, num_routers, edges, positions):
+        self.num_routers = num_routers
+        self.edges = sorted({(min(i, j), max(i, j)) for i, j in edges if i != j})
+        self.positions = positions
+        self.edge_routers = None  # Routers that clients attach to (all if None)
+
+
+def grid(num_routers, rng):
+    """A rows x cols grid with about `num_routers` routers."""
+    rows = max(int(math.sqrt(num_routers)), 1)
+    cols = max(math.ceil(num_routers / rows), 1)
+    edges = []
+    for r in range(rows):
+        for c in range(cols):
+            i = r * cols + c
+            if c + 1 < cols:
+                edges.append((i, i + 1))
+            if r + 1 < rows:
+                edges.append((i, i + cols))
+    positions = [((c + 0.5) / cols, (r + 0.5) / rows) for r in range(rows) for c in range(cols)]
+    return Topology(rows * cols, edges, positions)
+
+
+def ring(num_routers, rng):
+    """A ring of `num_routers` routers."""
+    edges = [(i, (i + 1) % num_routers) for i in range(num_routers)]
+    return Topology(num_routers, edges, circle_positions(num_routers))
+
+
+def waxman(num_routers, rng, alpha=0.15, degree=4):
+    """
+    A Waxman graph: routers are placed at random in the unit square and each pair at
+    distance d is linked with probability beta * exp(-d / (alpha * L)), L being the
+    largest distance. beta is chosen so that the average degree is about `degree`.
+    Separate components are then joined to their nearest router.
+    """
+    nprng = np.random.default_rng(rng.randrange(2**32))
+    points = nprng.random((num_routers, 2))
+    scale = alpha * math.sqrt(2)
+    sample = nprng.integers(0, num_routers, size=(min(100000, num_routers**2), 2))
+    mean_p = np.exp(-np.linalg.norm(points[sample[:, 0]] - points[sample[:, 1]], axis=1)
+                    / scale).mean()
+    beta = min(degree / max((num_routers - 1) * mean_p, 1e-12), 1.0)
+
+    edges = []
+    block = max(1, 2_000_000 // num_routers)
+    for start in range(0, num_routers, block):
+        rows = np.arange(start, min(start + block, num_routers))
+        dist = np.linalg.norm(points[rows, None, :] - points[None, :, :], axis=2)
+        linked = nprng.random(dist.shape) < beta * np.exp(-dist / scale)
+        linked &= np.arange(num_routers)[None, :] > rows[:, None]
+        i, j = np.nonzero(linked)
+        edges.extend(zip((rows[i]).tolist(), j.tolist()))
+    edges.extend(join_components(num_routers, edges, points))
+    return Topology(num_routers, edges, points.tolist())
+
+
+def barabasi_albert(num_routers, rng, m=2):
+    """
+    A Barabási–Albert graph: starting from a ring of m + 1 routers, each new router
+    links to m distinct routers picked with probability proportional to their degree.
+    """
+    m = max(1, min(m, num_routers - 1))
+    edges = [(i, (i + 1) % (m + 1)) for i in range(m + 1)] if num_routers > 1 else []
+    ends = [v for edge in edges for v in edge]  # Each router once per link
+    for new in range(m + 1, num_routers):
+        targets = set()
+        while len(targets) < m:
+            targets.add(rng.choice(ends))
+        for t in targets:
+            edges.append((new, t))
+            ends.extend((new, t))
+    positions = [(rng.random(), rng.random()) for _ in range(num_routers)]
+    return Topology(num_routers, edges, positions)
+
+
+def fat_tree(num_routers, rng, k=None):
+    """
+    A k-ary fat tree of 5k^2/4 switches: (k/2)^2 core switches and k pods of k/2
+    aggregation and k/2 edge switches. k is the smallest even number giving at least
+    `num_routers` switches unless given. Clients attach to edge switches.
+    """
+    if k is None:
+        k = 2
+        while 5 * k * k // 4 < num_routers:
+            k += 2
+    half = k // 2
+    num_core = half * half
+    core = list(range(num_core))
+    agg = [[num_core + p * k + a for a in range(half)] for p in range(k)]
+    edge = [[num_core + p * k + half + e for e in range(half)] for p in range(k)]
+    edges = []
+    for p in range(k):
+        for a in range(half):
+            for e in range(half):
+                edges.append((agg[p][a], edge[p][e]))
+            for c in range(half):
+                edges.append((agg[p][a], core[a * half + c]))
+    positions = [((c + 0.5) / num_core, 0.05) for c in range(num_core)]
+    pod_width = 1 / k
+    for p in range(k):
+        for a in range(half):
+            positions.append((p * pod_width + (a + 0.5) * pod_width / half, 0.35))
+        for e in range(half):
+            positions.append((p * pod_width + (e + 0.5) * pod_width / half, 0.65))
+    topology = Topology(num_core + k * k, edges, positions)
+    topology.edge_routers = [r for pod in edge for r in pod]
+    return topology
+
+
+def circle_positions(n):
+    return [
+        (0.5 + 0.45 * math.cos(2 * math.pi * i / n), 0.5 + 0.45 * math.sin(2 * math.pi * i / n))
+        for i in range(n)
+    ]
+
+
+def components(num_routers, edges):
+    """Return the connected components of the routers as a list of lists."""
+    adj = [[] for _ in range(num_routers)]
+    for i, j in edges:
+        adj[i].append(j)
+        adj[j].append(i)
+    seen = [False] * num_routers
+    result = []
+    for start in range(num_routers):
+        if seen[start]:
+            continue
+        seen[start] = True
+        component = [start]
+        for node in component:
+            for nbr in adj[node]:
+                if not seen[nbr]:
+                    seen[nbr] = True
+                    component.append(nbr)
+        result.append(component)
+    return result
+
+
+def bridges(num_routers, edges):
+    """Return the links whose removal would disconnect their component (Tarjan)."""
+    adj = [[] for _ in range(num_routers)]
+    for i, j in edges:
+        adj[i].append(j)
+        adj[j].append(i)
+    order = [-1] * num_routers  # Discovery order of each router
+    low = [0] * num_routers  # Earliest router reachable from its subtree by one back link
+    result = set()
+    counter = 0
+    for root in range(num_routers):
+        if order[root] != -1:
+            continue
+        order[root] = low[root] = counter
+        counter += 1
+        stack = [(root, -1, iter(adj[root]))]
+        while stack:
+            node, parent, neighbors = stack[-1]
+            for nbr in neighbors:
+                if order[nbr] == -1:
+                    order[nbr] = low[nbr] = counter
+                    counter += 1
+                    stack.append((nbr, node, iter(adj[nbr])))
+                    break
+                if nbr != parent:
+                    low[node] = min(low[node], order[nbr])
+            else:
+                stack.pop()
+                if parent != -1:
+                    low[parent] = min(low[parent], low[node])
+                    if low[node] > order[parent]:
+                        result.add((min(node, parent), max(node, parent)))
+    return result
+
+
+def join_components(num_routers, edges, points):
+    """Return links joining every component to the nearest router of the largest one."""
+    parts = sorted(components(num_routers, edges), key=len, reverse=True)
+    joined = np.array(parts[0])
+    links = []
+    for part in parts[1:]:
+        part = np.array(part)
+        dist = np.linalg.norm(points[part, None, :] - points[None, joined, :], axis=2)
+        a, b = np.unravel_index(np.argmin(dist), dist.shape)
+        links.append((int(part[a]), int(joined[b])))
+        joined = np.concatenate([joined, part])
+    return links
+
+
+def shortest_distances(num_nodes, links, sources):
+    """
+    Return a (len(sources), num_nodes) array of shortest distances from each source.
+
+    All sources are relaxed together: each round takes every (source, node) pair
+    whose distance dropped in the previous round, relaxes all the links of those
+    nodes at once and keeps the smallest candidate per (source, node), so the number
+    of rounds is the largest number of hops on a shortest path.
+    """
+    u = np.array([a for a, _, _ in links], dtype=np.int64)
+    v = np.array([b for _, b, _ in links], dtype=np.int64)
+    w = np.array([c for _, _, c in links], dtype=np.float64)
+    order = np.argsort(u, kind="stable")
+    u, v, w = u[order], v[order], w[order]
+    indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.add.at(indptr, u + 1, 1)
+    indptr = np.cumsum(indptr)
+    degree = np.diff(indptr)
+
+    num_sources = len(sources)
+    dist = np.full((num_sources, num_nodes), np.inf)
+    rows = np.arange(num_sources)
+    dist[rows, sources] = 0
+    front_rows, front_nodes = rows, np.asarray(sources, dtype=np.int64)
+    while len(front_rows):
+        counts = degree[front_nodes]
+        if not counts.sum():
+            break
+        # Link ids of every frontier node, one run of ids per (source, node) pair
+        starts = np.repeat(indptr[front_nodes] - np.cumsum(counts) + counts, counts)
+        link_ids = starts + np.arange(counts.sum())
+        cand_rows = np.repeat(front_rows, counts)
+        cand_nodes = v[link_ids]
+        cand_dist = np.repeat(dist[front_rows, front_nodes], counts) + w[link_ids]
+        better = cand_dist < dist[cand_rows, cand_nodes]
+        cand_rows, cand_nodes, cand_dist = cand_rows[better], cand_nodes[better], cand_dist[better]
+        flat = cand_rows * num_nodes + cand_nodes
+        # Smallest candidate per (source, node)
+        order = np.lexsort((cand_dist, flat))
+        flat, cand_dist = flat[order], cand_dist[order]
+        first = np.ones(len(flat), dtype=bool)
+        first[1:] = flat[1:] != flat[:-1]
+        flat, cand_dist = flat[first], cand_dist[first]
+        dist.flat[flat] = cand_dist
+        front_rows, front_nodes = np.divmod(flat, num_nodes)
+    return dist
+
+
+def correct_routes(num_routers, router_links, client_routers, max_paths=1000):
+    """
+    Return every lowest-cost route between each ordered pair of clients (including a
+    client and itself), as lists of node indices with clients numbered from
+    `num_routers`. `router_links` holds (i, j, cost_ij, cost_ji) links between routers
+    and `client_routers[c]` is (router, cost to router, cost from router) for client c.
+    Clients are never used as transit. Raises ValueError if a pair has more than
+    `max_paths` routes of equal cost.
+    """
+    links = [(i, j, c) for i, j, c, _ in router_links] + [(j, i, c) for i, j, _, c in router_links]
+    sources = sorted({r for r, _, _ in client_routers})
+    source_row = {r: k for k, r in enumerate(sources)}
+    dist = shortest_distances(num_routers, links, sources)
+
+    # Predecessors of each node on the shortest paths from each source router
+    u = np.array([a for a, _, _ in links], dtype=np.int64)
+    v = np.array([b for _, b, _ in links], dtype=np.int64)
+    w = np.array([c for _, _, c in links], dtype=np.float64)
+    tight = np.isclose(dist[:, u] + w, dist[:, v]) & np.isfinite(dist[:, u])
+    preds = []
+    for k in range(len(sources)):
+        pred = {}
+        for a, b in zip(u[tight[k]].tolist(), v[tight[k]].tolist()):
+            pred.setdefault(b, []).append(a)
+        preds.append(pred)
+
+    def router_paths(k, start, end):
+        # Every shortest path from `start` (source row k) to `end`, walking the
+        # predecessors back from `end` with each partial path kept as a linked list
+        paths = []
+        stack = [(end, None)]
+        while stack:
+            node, rest = stack.pop()
+            if node == start:
+                path = []
+                cell = (node, rest)
+                while cell is not None:
+                    path.append(cell[0])
+                    cell = cell[1]
+                paths.append(path)
+                if len(paths) > max_paths:
+                    raise ValueError(
+                        f"more than {max_paths} equal-cost paths between routers "
+                        f"r{start} and r{end}, use larger link costs, fewer clients or "
+                        "--max-paths"
+                    )
+                continue
+            for p in preds[k].get(node, ()):
+                stack.append((p, (node, rest)))
+        return paths
+
+    routes = []
+    cache = {}
+    for src, (src_router, up_cost, _) in enumerate(client_routers):
+        k = source_row[src_router]
+        for dst, (dst_router, _, down_cost) in enumerate(client_routers):
+            if not math.isfinite(dist[k, dst_router]):
+                continue
+            key = (src_router, dst_router)
+            if key not in cache:
+                cache[key] = router_paths(k, src_router, dst_router)
+            for path in cache[key]:
+                routes.append([num_routers + src, *path, num_routers + dst])
+    return routes
+
+
+def max_route_cost(num_routers, router_links, client_routers):
+    """
+    Return the largest cost of a lowest-cost route between two clients, with the
+    arguments of `correct_routes` (0 if no pair of clients is connected).
+    """
+    links = [(i, j, c) for i, j, c, _ in router_links] + [(j, i, c) for i, j, _, c in router_links]
+    sources = sorted({r for r, _, _ in client_routers})
+    source_row = {r: k for k, r in enumerate(sources)}
+    dist = shortest_distances(num_routers, links, sources)
+    costs = [
+        up + dist[source_row[src_router], dst_router] + down
+        for src_router, up, _ in client_routers
+        for dst_router, _, down in client_routers
+    ]
+    return int(max((c for c in costs if math.isfinite(c)), default=0))
+
+
+def settle_time(route_cost, client_send_rate):
+    """Return the time (in JSON units) routers get to converge after a change."""
+    return SETTLE_ROUTE_COSTS * route_cost + SETTLE_SEND_RATES * client_send_rate
+
+
+def generate(kind, num_routers, num_clients, max_cost=10, failures=0, flaps=0,
+             end_time=None, client_send_rate=10, seed=0, max_paths=1000, **params):
+    """
+    Return a network JSON dict for a generated topology (see `main` for the options).
+    Without an `end_time`, the run ends one `settle_time` after the last change. Raises
+    ValueError if a given `end_time` is shorter than that.
+    """
+    rng = random.Random(seed)
+    builder = {
+        "grid": grid,
+        "ring": ring,
+        "waxman": waxman,
+        "ba": barabasi_albert,
+        "fattree": fat_tree,
+    }[kind]
+    topology = builder(num_routers, rng, **params)
+    n = topology.num_routers
+    routers = [f"r{i}" for i in range(n)]
+    clients = [f"c{i}" for i in range(num_clients)]
+
+    # Links between routers with symmetric random costs, then one link per client
+    costs = {edge: rng.randint(1, max_cost) for edge in topology.edges}
+    attach = topology.edge_routers or list(range(n))
+    client_routers = [(rng.choice(attach), 1, 1) for _ in clients]
+
+    # Failures stay down (without disconnecting routers), flaps come back up, one
+    # change at a time in this order
+    ordered = []
+    alive = set(topology.edges)
+    for _ in range(failures):
+        candidates = sorted(alive - bridges(n, alive))
+        if not candidates:
+            break
+        edge = rng.choice(candidates)
+        alive.discard(edge)
+        ordered.append((edge, "down"))
+    for _ in range(flaps):
+        edge = rng.choice(sorted(alive))
+        ordered += [(edge, "down"), (edge, "up")]
+
+    # DVrouter treats a route that costs its infinity as unreachable: pick one above
+    # the cost of every lowest-cost route in each state the links go through
+    up_edges = set(topology.edges)
+    states = [set(up_edges)]
+    for edge, change in ordered:
+        if change == "up":
+            up_edges.add(edge)
+        else:
+            up_edges.discard(edge)
+        states.append(set(up_edges))
+    route_cost = max(
+        max_route_cost(n, [(a, b, costs[(a, b)], costs[(a, b)]) for a, b in sorted(state)],
+                       client_routers)
+        for state in states
+    )
+    infinity = max(DEFAULT_INFINITY, route_cost + 1)
+
+    # Routers get a settle time to converge after the start and after each change
+    settle = settle_time(route_cost, client_send_rate)
+    changes = [(settle * (k + 1), edge, change) for k, (edge, change) in enumerate(ordered)]
+    needed = settle * (len(changes) + 1)
+    if end_time is None:
+        end_time = needed
+    elif end_time < needed:
+        raise ValueError(
+            f"end time {end_time} is too short: routes cost up to {route_cost}, so "
+            f"{len(changes)} changes {settle} apart need an end time of {needed}"
+        )
+
+    ports = [0] * (n + num_clients)
+
+    def port(node):
+        ports[node] += 1
+        return ports[node]
+
+    names = routers + clients
+    links = {}
+    for i, j in topology.edges:
+        links[(i, j)] = [names[i], names[j], port(i), port(j), costs[(i, j)], costs[(i, j)]]
+    for c, (r, up, down) in enumerate(client_routers):
+        links[(n + c, r)] = [clients[c], routers[r], port(n + c), port(r), up, down]
+    net_changes = [
+        [time, links[edge] if change == "up" else links[edge][:2], change]
+        for time, edge, change in changes
+    ]
+
+    router_links = [(i, j, costs[(i, j)], costs[(i, j)]) for i, j in sorted(alive)]
+    routes = correct_routes(n, router_links, client_routers, max_paths)
+
+    # Layout: routers at their positions, each client just below its router
+    grid_size = max(5, math.ceil(math.sqrt(n + num_clients)))
+    scale = grid_size - 1
+    locations = {}
+    for i, (x, y) in enumerate(topology.positions):
+        locations[routers[i]] = [round(x * scale, 2), round(y * scale, 2)]
+    for c, (r, _, _) in enumerate(client_routers):
+        x, y = locations[routers[r]]
+        locations[clients[c]] = [x, round(min(y + 0.5, scale), 2)]
+
+    return {
+        "routers": routers,
+        "clients": clients,
+        "client_send_rate": client_send_rate,
+        "end_time": end_time,
+        "infinity": infinity,
+        "links": list(links.values()),
+        "changes": net_changes,
+        "correct_routes": [[names[node] for node in route] for route in routes],
+        "visualize": dict(grid_size=grid_size, locations=locations, **VISUALIZE),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a network simulation file.")
+    parser.add_argument("topology", choices=TOPOLOGIES)
+    parser.add_argument("--routers", type=int, default=100,
+                        help="Number of routers (rounded up to fit grid and fat tree)")
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--max-cost", type=int, default=10,
+                        help="Link costs are picked at random from 1 to this value")
+    parser.add_argument("--failures", type=int, default=0,
+                        help="Links that go down for good (keeping routers connected)")
+    parser.add_argument("--flaps", type=int, default=0,
+                        help="Links that go down and come back up")
+    parser.add_argument("--end-time", type=int, default=None,
+                        help="Default: the last change plus the settle time, which "
+                        "grows with the largest route cost")
+    parser.add_argument("--client-send-rate", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-paths", type=int, default=1000,
+                        help="Fail if a pair of clients has more equal-cost routes")
+    parser.add_argument("--degree", type=float, default=4, help="Waxman average degree")
+    parser.add_argument("--alpha", type=float, default=0.15, help="Waxman distance decay")
+    parser.add_argument("--m", type=int, default=2, help="Barabási–Albert links per router")
+    parser.add_argument("--k", type=int, default=None, help="Fat-tree arity (even)")
+    parser.add_argument("-o", "--output", help="Output path (default: stdout)")
+    args = parser.parse_args()
+
+    params = {
+        "waxman": {"alpha": args.alpha, "degree": args.degree},
+        "ba": {"m": args.m},
+        "fattree": {"k": args.k},
+    }.get(args.topology, {})
+    try:
+        net_json = generate(
+            args.topology,
+            args.routers,
+            args.clients,
+            max_cost=args.max_cost,
+            failures=args.failures,
+            flaps=args.flaps,
+            end_time=args.end_time,
+            client_send_rate=args.client_send_rate,
+            seed=args.seed,
+            max_paths=args.max_paths,
+            **params,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(net_json, f)
+    else:
+        json.dump(net_json, sys.stdout)
+        print()
+
+
+if __name__ == "__main__":
+    main()
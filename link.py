@@ -15,9 +15,22 @@ class Link:
         The addresses of the two endpoints of the link.
     l12, l21
         The latencies (in ms) in the e1->e2 and e2->e1 directions, respectively.
+    latency
+        The multiplier applied to `l12` and `l21`.
+    scheduler
+        An optional scheduler (`EventEngine` or `DeliveryScheduler`) used to deliver
+        packets after their latency. If not provided, each packet is delivered by its
+        own thread.
+    area
+        The routing area the link belongs to, or None if the network has no areas.
+    probes
+        An optional `ProbeLedger` that accounts for the traceroute packets sent on the
+        link.
     """
 
-    def __init__(self, e1, e2, l12, l21, latency):
+    def __init__(
+        self, e1, e2, l12, l21, latency, scheduler=None, area=None, probes=None
+    ):
         self.q12 = queue.Queue()
         self.q21 = queue.Queue()
         self.l12 = l12 * latency
@@ -25,6 +38,11 @@ class Link:
         self.latency_multiplier = latency
         self.e1 = e1
         self.e2 = e2
+        self.scheduler = scheduler
+        self.area = area
+        self.listeners = {}  # Delivery callbacks indexed by endpoint address
+        self.probes = probes
+        self.closed = False  # Set once the link is removed from the network
 
     def _send_helper(self, packet, src):
         """
@@ -35,30 +53,68 @@ class Link:
             packet.add_to_route(self.e2)
             packet.animate_send(self.e1, self.e2, self.l12)
             time.sleep(self.l12 / 1000)
-            self.q12.put(packet)
         elif src == self.e2:
             packet.add_to_route(self.e1)
             packet.animate_send(self.e2, self.e1, self.l21)
             time.sleep(self.l21 / 1000)
-            self.q21.put(packet)
+        self._deliver(packet, src)
         sys.stdout.flush()
 
+    def _deliver(self, packet, src):
+        """
+        Put a packet sent from `src` in the queue of the other endpoint and notify that
+        endpoint's listener, if any.
+        """
+        if src == self.e1:
+            self.q12.put(packet)
+            dst = self.e2
+        elif src == self.e2:
+            self.q21.put(packet)
+            dst = self.e1
+        else:
+            return
+        if self.closed:
+            # Arrived after the link was removed, nobody will receive it
+            self.drain()
+            return
+        listener = self.listeners.get(dst)
+        if listener:
+            listener()
+
+    def set_listener(self, addr, callback):
+        """Call `callback()` whenever a packet is delivered to endpoint `addr`."""
+        self.listeners[addr] = callback
+
     def send(self, packet, src):
         """
         Send packet on link from `src`. Checks that packet content is a string and
-        starts a new thread to send it. `src` must be equal to `self.e1` or `self.e2`.
+        either hands it to the scheduler or starts a new thread to send it. `src` must
+        be equal to `self.e1` or `self.e2`.
         """
         if packet.content:
             assert isinstance(packet.content, str), "Packet content must be a string"
         p = packet.copy()
-        _thread.start_new_thread(self._send_helper, (p, src))
+        if self.probes is not None and p.is_traceroute and src in (self.e1, self.e2):
+            self.probes.on_link(p)
+        if self.scheduler is None:
+            _thread.start_new_thread(self._send_helper, (p, src))
+        elif src == self.e1:
+            p.add_to_route(self.e2)
+            p.animate_send(self.e1, self.e2, self.l12)
+            self.scheduler.schedule(self.l12, self._deliver, p, src)
+        elif src == self.e2:
+            p.add_to_route(self.e1)
+            p.animate_send(self.e2, self.e1, self.l21)
+            self.scheduler.schedule(self.l21, self._deliver, p, src)
 
     def recv(self, dst, timeout=None):
         """
         Check whether a packet is ready to be received by `dst` on this link. `dst` must
         be equal to `self.e1` or `self.e2`. If the packet is ready, return the packet,
-        otherwise return `None`.
+        otherwise return `None`. A closed link never has a packet ready.
         """
+        if self.closed:
+            return None
         if dst == self.e1:
             try:
                 packet = self.q21.get_nowait()
@@ -80,3 +136,22 @@ class Link:
             self.l12 = c * self.latency_multiplier
         elif src == self.e2:
             self.l21 = c * self.latency_multiplier
+
+    def close(self):
+        """
+        Mark the link as removed. Packets queued on it or still on their way are lost,
+        and reported to the probe ledger if they are traceroute packets.
+        """
+        self.closed = True
+        self.drain()
+
+    def drain(self):
+        """Empty both queues of a closed link, accounting for lost traceroute packets."""
+        for q in (self.q12, self.q21):
+            while True:
+                try:
+                    packet = q.get_nowait()
+                except queue.Empty:
+                    break
+                if self.probes is not None and packet.is_traceroute:
+                    self.probes.lost(packet)
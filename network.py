@@ -1,4 +1,6 @@
 import argparse
+import functools
+import inspect
 import sys
 import threading
 import json
@@ -8,8 +10,12 @@ import time
 import queue
 from collections import defaultdict
 from client import Client
+from engine import EngineInbox, EventEngine
 from link import Link
+from probes import ProbeLedger
 from router import Router
+from routes import RouteRecorder
+from scheduler import DeliveryScheduler
 
 """
 01_small_net.json LS, 
@@ -18,6 +24,7 @@ from router import Router
 04_pg244_net_events.json LS, 
 05_pg242_net.json LS, 
 06_pg242_net_events.json LS
+07_ring_long_path_net.json LS
 """
 
 def json_load_byteified(file_handle):
@@ -42,6 +49,72 @@ def _byteify(data, ignore_dicts=False):
     return data
 
 
+class RunResult:
+    """
+    The RunResult class holds the outcome of a finished run: the final routes found
+    by traceroute packets and whether each of them is correct.
+
+    Parameters
+    ----------
+    routes
+        A dict mapping each (src, dst) pair to (route, is_good, time_ms).
+    all_correct
+        Whether routes were found for some pairs and all of them are correct.
+    elapsed_s
+        The wall-clock duration of the run in seconds.
+    converged_ms
+        When the run stopped early because all routes were stable (see
+        `until_converged` of `Network`), the time (ms since the start) this happened.
+    probe_rounds
+        A list of dicts with the traceroute packets sent, delivered, dropped by a
+        router and lost on a removed link in each round (see `ProbeLedger.stats`).
+    """
+
+    def __init__(
+        self, routes, all_correct, elapsed_s, converged_ms=None, probe_rounds=()
+    ):
+        self.routes = routes
+        self.all_correct = all_correct
+        self.elapsed_s = elapsed_s
+        self.converged_ms = converged_ms
+        self.probe_rounds = list(probe_rounds)
+
+    def incorrect_routes(self):
+        """Return the sorted (src, dst, route) of every incorrect route."""
+        return sorted(
+            (src, dst, list(route))
+            for (src, dst), (route, is_good, _) in self.routes.items()
+            if not is_good
+        )
+
+    def drops(self):
+        """Return a dict mapping each round to its traceroute packets dropped or lost."""
+        return {r["round"]: r["dropped"] + r["lost"] for r in self.probe_rounds}
+
+    def unaccounted_probes(self):
+        """
+        Return the traceroute packets of the final round that were neither delivered,
+        dropped nor lost when the run ended.
+        """
+        if not self.probe_rounds:
+            return 0
+        final = self.probe_rounds[-1]
+        return final["sent"] - final["delivered"] - final["dropped"] - final["lost"]
+
+    def to_dict(self):
+        """Return the result as a dict that can be written as JSON."""
+        return {
+            "all_correct": self.all_correct,
+            "elapsed_s": self.elapsed_s,
+            "converged_ms": self.converged_ms,
+            "probe_rounds": self.probe_rounds,
+            "routes": [
+                {"src": src, "dst": dst, "route": list(route), "correct": is_good}
+                for (src, dst), (route, is_good, _) in sorted(self.routes.items())
+            ],
+        }
+
+
 class Network:
     """The Network class maintains all clients, routers, links, and confguration.
 
@@ -53,20 +126,49 @@ class Network:
         Whether to use DVrouter, LSrouter, or the default router.
     visualize
         Whether to visualize the network.
+    engine
+        "threads" to run every client and router in its own thread in real time, or
+        "des" to run the network as a discrete-event simulation on a virtual clock.
+    until_converged
+        If set, stop before the end time once the last link change happened and every
+        route has been correct for this many traceroute rounds in a row.
     """
 
-    def __init__(self, net_json_path, RouterClass, visualize=False):
+    def __init__(
+        self,
+        net_json_path,
+        RouterClass,
+        visualize=False,
+        engine="threads",
+        until_converged=None,
+    ):
         # Parse configuration details
         with open(net_json_path, "r") as f:
             net_json = json.load(f)
+        link_costs = self.parse_link_costs(net_json)
         self.latency_multiplier = 100
         self.end_time = net_json["end_time"] * self.latency_multiplier
         self.visualize = visualize
+        self.engine = EventEngine() if engine == "des" else None
+        self.scheduler = self.engine if self.engine else DeliveryScheduler()
         if visualize:
             self.latency_multiplier *= net_json["visualize"]["time_multiplier"]
         self.client_send_rate = net_json["client_send_rate"] * self.latency_multiplier
 
+        # Account for traceroute packets until they are delivered, dropped or lost. A
+        # route without loops goes through each router at most once, so a probe is
+        # accounted for after at most `max_hops` of the slowest links (plus the send
+        # interval of the final traceroutes).
+        self.probes = ProbeLedger(max_hops=len(net_json["routers"]) + 1)
+        max_latency = max((cost for _, costs in link_costs for cost in costs), default=0)
+        self.final_wait = (
+            self.probes.max_hops * max_latency * self.latency_multiplier
+            + self.client_send_rate
+        )
+
         # Parse and create routers, clients, and links
+        self.router_areas = self.parse_areas(net_json.get("areas"))
+        self.infinity = net_json.get("infinity")
         self.routers = self.parse_routers(net_json["routers"], RouterClass)
         self.clients = self.parse_clients(net_json["clients"], self.client_send_rate)
         self.links = self.parse_links(net_json["links"])
@@ -76,15 +178,53 @@ class Network:
             self.changes = self.parse_changes(net_json["changes"])
         else:
             self.changes = None
+        self.pending_changes = len(net_json.get("changes", []))
 
-        # Parse correct routes and create some tracking fields
-        self.correct_routes = self.parse_correct_routes(net_json["correct_routes"])
+        # Record the routes found by traceroute packets against the correct routes
+        self.recorder = RouteRecorder(net_json["correct_routes"])
+        self.correct_routes = self.recorder.correct_routes
         self.threads = []
-        self.routes = {}
-        self.routes_lock = threading.Lock()
+        self.result = None  # RunResult set at the end of `run`
+        self.run_started = None
+
+        # Early stop once routes are stable after the last change
+        self.until_converged = until_converged
+        self.watching = False
+        self.start_ms = 0
+        self.converged_ms = None
+        self.converged_lock = threading.Lock()
+        self.converged_event = threading.Event()
+
+    @staticmethod
+    def parse_link_costs(net_json):
+        """
+        Return a list of ((addr1, addr2), (cost12, cost21)) for every link and link
+        change of `net_json`. Raise ValueError if a cost is not positive, before any
+        router is started.
+        """
+        costs = [(link[:2], link[4:6]) for link in net_json["links"]]
+        for _, target, change in net_json.get("changes", []):
+            if change == "up":
+                costs.append((target[:2], target[4:6]))
+            elif change == "cost":
+                costs.append((target[:2], target[2:4]))
+        for (addr1, addr2), link_costs in costs:
+            if any(cost <= 0 for cost in link_costs):
+                raise ValueError(
+                    f"link {addr1}-{addr2}: costs must be positive, got {link_costs}"
+                )
+        return costs
 
     def parse_routers(self, router_params, RouterClass):
-        """Parse routes from the `router_params` dict."""
+        """
+        Parse routes from the `router_params` dict. If the network sets an "infinity",
+        the largest route cost, it is passed to routers whose class takes one.
+        """
+        if (
+            self.infinity is not None
+            and "infinity" in inspect.signature(RouterClass).parameters
+        ):
+            RouterClass = functools.partial(RouterClass, infinity=self.infinity)
         routers = {}
         for addr in router_params:
             routers[addr] = RouterClass(
@@ -92,6 +232,28 @@ class Network:
             )
         return routers
 
+    def parse_areas(self, area_params):
+        """
+        Parse the optional `area_params` dict, which maps an area id to its routers
+        ("0" is the backbone), into a dict mapping each router to its areas.
+        """
+        router_areas = defaultdict(set)
+        for area, routers in (area_params or {}).items():
+            for addr in routers:
+                router_areas[addr].add(str(area))
+        return router_areas
+
+    def link_area(self, addr1, addr2):
+        """
+        Return the area of the link between `addr1` and `addr2`: an area both routers
+        belong to, the backbone first (a client belongs to the areas of its router), or
+        None if the network has no areas.
+        """
+        areas1 = self.router_areas.get(addr1)
+        areas2 = self.router_areas.get(addr2)
+        shared = (areas1 & areas2 if areas1 and areas2 else areas1 or areas2) or set()
+        return min(shared, key=lambda area: (area != "0", area), default=None)
+
     def parse_clients(self, client_params, client_send_rate):
         """Parse clients from `client_params` dict."""
         clients = {}
@@ -105,7 +267,16 @@ class Network:
         """Parse links from the `link_params` dict."""
         links = {}
         for addr1, addr2, p1, p2, c12, c21 in link_params:
-            link = Link(addr1, addr2, c12, c21, self.latency_multiplier)
+            link = Link(
+                addr1,
+                addr2,
+                c12,
+                c21,
+                self.latency_multiplier,
+                self.scheduler,
+                self.link_area(addr1, addr2),
+                self.probes,
+            )
             links[(addr1, addr2)] = (p1, p2, c12, c21, link)
         return links
 
@@ -116,20 +287,21 @@ class Network:
             changes.put(change)
         return changes
 
-    def parse_correct_routes(self, routes_params):
-        """Parse correct routes from the `routes_params` dict/"""
-        correct_routes = defaultdict(list)
-        for route in routes_params:
-            src, dst = route[0], route[-1]
-            correct_routes[(src, dst)].append(route)
-        return correct_routes
-
     def run(self):
         """Run the network.
 
         Start threads for each client and router. Start thread to track link changes.
-        If not visualizing, wait until end time and print the final routes.
+        If not visualizing, wait until end time (or convergence with `until_converged`),
+        print the final routes and store them in `self.result`.
         """
+        self.run_started = time.perf_counter()
+        self.start_ms = self.time_ms()
+        if self.pending_changes == 0:
+            self.watch_convergence()
+        if self.engine is not None:
+            self.run_des()
+            return
+        self.scheduler.start()
         for router in self.routers.values():
             thread = RouterThread(router)
             thread.start()
@@ -145,11 +317,44 @@ class Network:
 
         if not self.visualize:
             signal.signal(signal.SIGINT, self.handle_interrupt)
-            time.sleep(self.end_time / 1000)
+            self.converged_event.wait(self.end_time / 1000)
             self.final_routes()
-            sys.stdout.write("\n" + self.get_route_string() + "\n")
+            self.store_result()
+            self.write_routes()
             self.join_all()
 
+    def run_des(self):
+        """Run the network as a discrete-event simulation.
+
+        Drive each client and router from an inbox on the virtual clock, schedule the
+        link changes, then process events as fast as possible.
+        """
+        if self.run_started is None:
+            self.run_started = time.perf_counter()
+        for node in list(self.routers.values()) + list(self.clients.values()):
+            node.inbox = EngineInbox(self.engine, node)
+            node.notify()
+        self.add_links()
+        if self.changes:
+            while not self.changes.empty():
+                change_time, target, change = self.changes.get()
+                self.engine.schedule(
+                    change_time * self.latency_multiplier,
+                    self.apply_change,
+                    change,
+                    target,
+                )
+        self.engine.run(self.end_time)
+        self.final_routes()
+        self.store_result()
+        self.write_routes()
+
+    def time_ms(self):
+        """Return the current time in ms, virtual when running the event engine."""
+        if self.engine is not None:
+            return self.engine.time_ms()
+        return int(round(time.time() * 1000))
+
     def add_links(self):
         """Add links to clients and routers."""
         for addr1, addr2 in self.links:
@@ -178,89 +383,147 @@ class Network:
             ) - current_time
             if wait_time > 0:
                 time.sleep(wait_time / 1000)
+            self.apply_change(change, target)
+
+    def apply_change(self, change, target):
+        """Apply a single "up", "down" or "cost" change to the link given by `target`."""
+        # Link changes
+        if change == "up":
+            addr1, addr2, p1, p2, c12, c21 = target
+            if (addr1, addr2) in self.links:
+                # Whatever is left on the previous link is lost
+                self.links[(addr1, addr2)][4].close()
+            link = Link(
+                addr1,
+                addr2,
+                c12,
+                c21,
+                self.latency_multiplier,
+                self.scheduler,
+                self.link_area(addr1, addr2),
+                self.probes,
+            )
+            self.links[(addr1, addr2)] = (p1, p2, c12, c21, link)
+            self.routers[addr1].change_link(("add", p1, addr2, link, c12))
+            self.routers[addr2].change_link(("add", p2, addr1, link, c21))
+        elif change == "down":
+            addr1, addr2 = target
+            p1, p2, _, _, link = self.links[(addr1, addr2)]
+            self.routers[addr1].change_link(("remove", p1))
+            self.routers[addr2].change_link(("remove", p2))
+            link.close()
+        elif change == "cost":
+            # Change the link costs in place, the link stays up
+            addr1, addr2, c12, c21 = target
+            p1, p2, _, _, link = self.links[(addr1, addr2)]
+            self.links[(addr1, addr2)] = (p1, p2, c12, c21, link)
+            link.change_latency(addr1, c12)
+            link.change_latency(addr2, c21)
+            if addr1 in self.routers:
+                self.routers[addr1].change_link(("cost", p1, c12))
+            if addr2 in self.routers:
+                self.routers[addr2].change_link(("cost", p2, c21))
 
-            # Link changes
-            if change == "up":
-                addr1, addr2, p1, p2, c12, c21 = target
-                link = Link(addr1, addr2, c12, c21, self.latency_multiplier)
-                self.links[(addr1, addr2)] = (p1, p2, c12, c21, link)
-                self.routers[addr1].change_link(("add", p1, addr2, link, c12))
-                self.routers[addr2].change_link(("add", p2, addr1, link, c21))
-            elif change == "down":
-                addr1, addr2 = target
-                p1, p2, _, _, link = self.links[(addr1, addr2)]
-                self.routers[addr1].change_link(("remove", p1))
-                self.routers[addr2].change_link(("remove", p2))
+        # Update visualization
+        if hasattr(Network, "visualize_changes_callback"):
+            Network.visualize_changes_callback(change, target)
+
+        self.pending_changes -= 1
+        if self.pending_changes == 0:
+            self.watch_convergence()
 
-            # Update visualization
-            if hasattr(Network, "visualize_changes_callback"):
-                Network.visualize_changes_callback(change, target)
+    def watch_convergence(self):
+        """Start watching for stable routes if the run should stop on convergence."""
+        if self.until_converged and not self.visualize:
+            self.recorder.watch_stability(self.until_converged, len(self.clients) ** 2)
+            self.watching = True
 
     def update_route(self, src, dst, route):
         """
         Callback function used by clients to update the current routes taken by
         traceroute packets.
         """
-        self.routes_lock.acquire()
-        time_ms = int(round(time.time() * 1000))
-        is_good = route in self.correct_routes[(src, dst)]
-        try:
-            _, _, current_time = self.routes[(src, dst)]
-            if time_ms > current_time:
-                self.routes[(src, dst)] = (route, is_good, time_ms)
-        except KeyError:
-            self.routes[(src, dst)] = (route, is_good, time_ms)
-        finally:
-            self.routes_lock.release()
+        time_ms = self.time_ms()
+        self.recorder.record(src, dst, route, time_ms)
+        if self.watching and self.recorder.stable():
+            with self.converged_lock:
+                if not self.watching:
+                    return
+                self.watching = False
+                self.converged_ms = time_ms - self.start_ms
+            if self.engine is not None:
+                self.engine.stop()
+            else:
+                self.converged_event.set()
+
+    @property
+    def routes(self):
+        """A dict mapping each (src, dst) pair to (route, is_good, time_ms)."""
+        return self.recorder.snapshot()
+
+    def all_routes_correct(self):
+        """Return True if routes were found for some pairs and all of them are correct."""
+        return self.recorder.all_correct()
 
     def get_route_string(self, label_incorrect=True):
         """
         Create a string with all the current routes found by traceroute packets and
         whether they are correct.
         """
-        self.routes_lock.acquire()
-        route_strings = []
-        all_correcct = True
-        for src, dst in self.routes:
-            route, is_good, _ = self.routes[(src, dst)]
-            info = "" if (is_good or not label_incorrect) else "Incorrect Route"
-            route_strings.append(f"{src} -> {dst}: {route} {info}")
-            if not is_good:
-                all_correcct = False
-        route_strings.sort()
-        if all_correcct and len(self.routes) > 0:
-            route_strings.append("\nSUCCESS: All Routes correct!")
-        else:
-            route_strings.append("\nFAILURE: Not all routes are correct")
-        route_string = "\n".join(route_strings)
-        self.routes_lock.release()
-        return route_string
+        return self.recorder.route_string(label_incorrect)
 
     def get_route_pickle(self):
         """Create a pickle with the current routes found by traceroute packets."""
-        self.routes_lock.acquire()
-        route_pickle = pickle.dumps(self.routes)
-        self.routes_lock.release()
-        return route_pickle
+        return pickle.dumps(self.recorder.snapshot())
 
     def reset_routes(self):
         """Reset the routes found by traceroute packets."""
-        self.routes_lock.acquire()
-        self.routes = {}
-        self.routes_lock.release()
+        self.recorder.reset()
 
     def final_routes(self):
-        """Have the clients send one final batch of traceroute packets."""
+        """
+        Have the clients send one final batch of traceroute packets and wait until
+        every traceroute packet is delivered, dropped or lost. Probes that loop are
+        dropped after `max_hops` links, so this takes at most `self.final_wait`.
+        """
+        timeout = self.final_wait
+        self.watching = False
         self.reset_routes()
         for client in self.clients.values():
             client.last_send()
-        time.sleep(4 * self.client_send_rate / 1000)
+        if self.engine is not None:
+            if not self.probes.settled():
+                self.engine.run(self.engine.now + timeout, self.probes.settled)
+        else:
+            self.probes.wait(timeout / 1000)
+
+    def probe_drops(self):
+        """Return a dict mapping each round to its traceroute packets dropped or lost."""
+        return self.probes.drops()
+
+    def store_result(self):
+        """Store the final routes of the run in `self.result`."""
+        self.result = RunResult(
+            self.recorder.snapshot(),
+            self.all_routes_correct(),
+            time.perf_counter() - self.run_started,
+            self.converged_ms,
+            self.probes.stats(),
+        )
+
+    def write_routes(self):
+        """Print the convergence time, if the run stopped early, and the final routes."""
+        if self.converged_ms is not None:
+            sys.stdout.write(f"\nConverged at {self.converged_ms} ms\n")
+        sys.stdout.write("\n" + self.get_route_string() + "\n")
 
     def join_all(self):
         if self.changes:
             self.handle_changes_thread.join()
         for thread in self.threads:
             thread.join()
+        if self.engine is None:
+            self.scheduler.stop()
 
     def handle_interrupt(self, signum, frame):
         self.join_all()
@@ -283,6 +546,23 @@ def main():
         default=None,
         help="DV for DVrouter and LS for LSrouter. If not provided, Router is used.",
     )
+    parser.add_argument(
+        "--engine",
+        type=str,
+        choices=["threads", "des"],
+        default="threads",
+        help="threads runs in real time, des runs a discrete-event simulation.",
+    )
+    parser.add_argument(
+        "--until-converged",
+        type=int,
+        nargs="?",
+        const=3,
+        default=None,
+        metavar="ROUNDS",
+        help="Stop once every route has been correct for ROUNDS traceroute rounds "
+        "(default 3) after the last link change, end_time being the upper bound.",
+    )
     args = parser.parse_args()
 
     RouterClass = Router
@@ -295,7 +575,13 @@ def main():
 
         RouterClass = LSrouter
 
-    net = Network(args.net_json_path, RouterClass, visualize=False)
+    net = Network(
+        args.net_json_path,
+        RouterClass,
+        visualize=False,
+        engine=args.engine,
+        until_converged=args.until_converged,
+    )
     net.run()
 
 
@@ -310,6 +596,7 @@ class RouterThread(threading.Thread):
     def join(self, timeout=None):
         # Terrible style (think about changing) but works like a charm
         self.router.keep_running = False
+        self.router.notify()
         super(RouterThread, self).join(timeout)
 
 
@@ -325,6 +612,7 @@ class ClientThread(threading.Thread):
     def join(self, timeout=None):
         # Terrible style (think about changing) but works like a charm
         self.client.keep_running = False
+        self.client.notify()
         super(ClientThread, self).join(timeout)
 
 
@@ -1,6 +1,3 @@
-import copy
-
-
 class Packet:
     """
     The Packet class defines packets that clients and routers send in the simulated
@@ -17,28 +14,64 @@ class Packet:
         The address of the destination of the packet.
     content
         The content of the packet. Must be a string.
+
+    The route taken so far is kept as a persistent linked list of (addr, previous)
+    tuples, newest address first, so copies share it and `add_to_route` is O(1). The
+    `route` property turns it into a list when it is read, and `hops` counts the links
+    the packet went through. Traceroute packets also carry the `round` of traceroutes
+    their client sent them in (None for routing packets).
     """
 
     TRACEROUTE = 1
     ROUTING = 2
 
+    __slots__ = ("kind", "src_addr", "dst_addr", "content", "history", "hops", "round")
+
     def __init__(self, kind, src_addr, dst_addr, content=None):
         self.kind = kind
         self.src_addr = src_addr
         self.dst_addr = dst_addr
         self.content = content
-        self.route = [src_addr]
+        self.history = (src_addr, None)
+        self.hops = 0
+        self.round = None
 
     def copy(self):
-        """Create a deep copy of the packet.
+        """Create a copy of the packet.
 
         This gets called automatically when the packet is sent to avoid aliasing issues.
+        The content is an immutable string and the route history is never modified in
+        place, so both are shared with the copy.
         """
-        content = copy.deepcopy(self.content)
-        p = Packet(self.kind, self.src_addr, self.dst_addr, content=content)
-        p.route = list(self.route)
+        p = Packet.__new__(Packet)
+        p.kind = self.kind
+        p.src_addr = self.src_addr
+        p.dst_addr = self.dst_addr
+        p.content = self.content
+        p.history = self.history
+        p.hops = self.hops
+        p.round = self.round
         return p
 
+    @property
+    def route(self):
+        """The list of addresses the packet went through, source first."""
+        route = []
+        node = self.history
+        while node is not None:
+            route.append(node[0])
+            node = node[1]
+        route.reverse()
+        return route
+
+    @route.setter
+    def route(self, route):
+        history = None
+        for addr in route:
+            history = (addr, history)
+        self.history = history
+        self.hops = max(len(route) - 1, 0)
+
     @property
     def is_traceroute(self):
         """Returns True if the packet is a traceroute packet."""
@@ -51,7 +84,8 @@ class Packet:
 
     def add_to_route(self, addr):
         """DO NOT CALL from DVrouter or LSrouter!"""
-        self.route.append(addr)
+        self.history = (addr, self.history)
+        self.hops += 1
 
     def animate_send(self, src, dst, latency):
         """DO NOT CALL from DVrouter or LSrouter!"""
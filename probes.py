@@ -0,0 +1,105 @@
+"""
+Account for every traceroute packet (probe) from the moment a client sends it until it
+is delivered to a client, dropped by a router that had no route for it, or lost with a
+link that was removed while it was on its way.
+
+The ledger counts the probe copies that are on a link or waiting in a queue. A router
+takes a copy off the count only after `handle_packet` returned, so the count of a probe
+that is forwarded never drops to zero in between, and the network can wait until the
+count is zero instead of sleeping for a fixed time. Probes carry the traceroute round
+of their client, so the outcome of each round is known as well.
+
+A probe caught in a routing loop would keep the count above zero until the loop is
+fixed, so a probe that went through more links than `max_hops` is dropped by the next
+router instead of being handled.
+"""
+
+import threading
+from collections import defaultdict
+
+SENT, DELIVERED, DROPPED, LOST = range(4)
+
+
+class ProbeLedger:
+    """
+    The ProbeLedger class counts the probes in flight and, for each round, the probes
+    sent, delivered, dropped and lost. It is shared by every link of a network, and
+    clients, routers and links report to it from their own threads.
+
+    Parameters
+    ----------
+    max_hops
+        The number of links a probe may go through, or None for no limit.
+    """
+
+    def __init__(self, max_hops=None):
+        self.max_hops = max_hops
+        self.cond = threading.Condition()
+        self.in_flight = 0  # Probe copies sent on a link and not yet accounted for
+        self.rounds = defaultdict(lambda: [0, 0, 0, 0])  # Round -> counts
+
+    def sent(self, packet):
+        """Count a probe a client sent, before it goes on its link."""
+        with self.cond:
+            self.rounds[packet.round][SENT] += 1
+
+    def on_link(self, packet):
+        """Count a probe copy put on a link."""
+        with self.cond:
+            self.in_flight += 1
+
+    def expired(self, packet):
+        """Return True if `packet` went through more links than a probe may."""
+        return self.max_hops is not None and packet.hops > self.max_hops
+
+    def handled(self, packet, forwarded):
+        """Account for a probe a router handled, dropped unless it `forwarded` it."""
+        self.settle(packet, None if forwarded else DROPPED)
+
+    def delivered(self, packet):
+        """Account for a probe received by a client."""
+        self.settle(packet, DELIVERED)
+
+    def lost(self, packet):
+        """Account for a probe on a link that was removed."""
+        self.settle(packet, LOST)
+
+    def settle(self, packet, outcome):
+        """Take a probe copy off the count, recording `outcome` (if any) in its round."""
+        with self.cond:
+            self.in_flight -= 1
+            if outcome is not None:
+                self.rounds[packet.round][outcome] += 1
+            if self.in_flight == 0:
+                self.cond.notify_all()
+
+    def settled(self):
+        """Return True if every probe sent so far is accounted for."""
+        return self.in_flight == 0
+
+    def wait(self, timeout):
+        """Wait up to `timeout` seconds for every probe to be accounted for."""
+        with self.cond:
+            return self.cond.wait_for(self.settled, timeout)
+
+    def drops(self):
+        """Return a dict mapping each round to its probes dropped or lost."""
+        with self.cond:
+            return {
+                r: counts[DROPPED] + counts[LOST]
+                for r, counts in sorted(self.rounds.items())
+            }
+
+    def stats(self):
+        """Return a list of dicts with the counts of each round, oldest first."""
+        with self.cond:
+            return [
+                {
+                    "round": r,
+                    "sent": counts[SENT],
+                    "delivered": counts[DELIVERED],
+                    "dropped": counts[DROPPED],
+                    "lost": counts[LOST],
+                }
+                for r, counts in sorted(self.rounds.items())
+            ]
@@ -1,5 +1,6 @@
 import time
 import queue
+from scheduler import Inbox
 
 
 class Router:
@@ -12,6 +13,8 @@ class Router:
     - handle_packet
     - handle_new_link
     - handle_remove_link
+    - handle_cost_change
+    - handle_link_changes (optional, to handle a batch of link changes at once)
     - handle_time
     - __repr__ (optional, for your own debugging)
 
@@ -28,43 +31,110 @@ class Router:
         self.links = {}  # Links indexed by port
         self.link_changes = queue.Queue()  # Thread-safe queue for link changes
         self.keep_running = True
+        self.inbox = Inbox()  # Signalled by links and link changes
+        self.tick_ms = 100  # Interval between calls to handle_time
+        self.next_time_ms = 0  # Deadline for the next call to handle_time
+        self.probes_forwarded = 0  # Traceroute packets sent, see `step`
 
     def change_link(self, change):
         """Add, remove, or change the cost of a link.
 
-        The `change` argument is a tuple with first element being "add" or "remove".
+        The `change` argument is a tuple with first element being "add", "remove" or
+        "cost".
         """
+        if change[0] == "add":
+            change[3].set_listener(self.addr, self.notify)
         self.link_changes.put(change)
+        self.notify()
+
+    def notify(self):
+        """Wake up the main loop, e.g. because a packet was delivered."""
+        self.inbox.signal()
 
     def add_link(self, port, endpointAddr, link, cost):
         """Add new link to router."""
-        if port in self.links:
-            self.remove_link(port)
-        self.links[port] = link
-        self.handle_new_link(port, endpointAddr, cost)
+        self.apply_link_changes([("add", port, endpointAddr, link, cost)])
 
     def remove_link(self, port):
         """Remove link from router."""
-        self.links = {p: link for p, link in self.links.items() if p != port}
-        self.handle_remove_link(port)
+        self.apply_link_changes([("remove", port)])
+
+    def update_link_cost(self, port, cost):
+        """Change the cost of the link on `port`."""
+        self.apply_link_changes([("cost", port, cost)])
+
+    def apply_link_changes(self, changes):
+        """Apply a batch of link changes and pass them to `handle_link_changes`.
+
+        `changes` holds tuples as given to `change_link`. The links are updated first,
+        then the handler sees ("add", port, endpoint, cost), ("remove", port) and
+        ("cost", port, cost) tuples in order. Adding a link on a port in use removes
+        the old link first.
+        """
+        batch = []
+        for change in changes:
+            if change[0] == "add":
+                _, port, endpoint, link, cost = change
+                if port in self.links:
+                    batch.append(("remove", port))
+                self.links = dict(self.links)
+                self.links[port] = link
+                batch.append(("add", port, endpoint, cost))
+            elif change[0] == "remove":
+                port = change[1]
+                self.links = {p: link for p, link in self.links.items() if p != port}
+                batch.append(("remove", port))
+            elif change[0] == "cost" and change[1] in self.links:
+                batch.append(change)
+        if batch:
+            self.handle_link_changes(batch)
 
     def run(self):
-        """Main loop of router."""
+        """Main loop of router.
+
+        Block on the inbox until a packet or link change arrives or the `handle_time`
+        deadline passes.
+        """
         while self.keep_running:
-            time.sleep(0.1)
-            time_ms = int(round(time.time() * 1000))
+            wait_ms = self.next_time_ms - time.time() * 1000
+            self.inbox.wait(max(wait_ms, 0) / 1000)
+            self.step(int(round(time.time() * 1000)))
+
+    def step(self, time_ms):
+        """Run one iteration of the main loop at time `time_ms`.
+
+        Apply every pending link change, receive every queued packet on every link and
+        call `handle_time` if its deadline has passed. The discrete-event engine calls
+        this directly instead of `run`.
+
+        A traceroute packet that `handle_packet` did not forward is reported as dropped
+        to the probe ledger of its link, if any, and one that went through more links
+        than the ledger allows is dropped without being handled.
+        """
+        changes = []
+        while True:
             try:
-                change = self.link_changes.get_nowait()
-                if change[0] == "add":
-                    self.add_link(*change[1:])
-                elif change[0] == "remove":
-                    self.remove_link(*change[1:])
+                changes.append(self.link_changes.get_nowait())
             except queue.Empty:
-                pass
-            for port in self.links.keys():
-                packet = self.links[port].recv(self.addr)
-                if packet:
+                break
+        if changes:
+            self.apply_link_changes(changes)
+        for port, link in list(self.links.items()):
+            packet = link.recv(self.addr)
+            while packet:
+                if link.probes is not None and packet.is_traceroute:
+                    if link.probes.expired(packet):
+                        link.probes.handled(packet, False)
+                        packet = link.recv(self.addr)
+                        continue
+                    forwarded = self.probes_forwarded
+                    self.handle_packet(port, packet)
+                    link.probes.handled(packet, self.probes_forwarded > forwarded)
+                else:
                     self.handle_packet(port, packet)
+                packet = link.recv(self.addr)
+        if time_ms >= self.next_time_ms:
+            self.next_time_ms = time_ms + self.tick_ms
             self.handle_time(time_ms)
 
     def send(self, port, packet):
@@ -72,7 +142,9 @@ class Router:
         try:
             self.links[port].send(packet, self.addr)
         except KeyError:
-            pass
+            return
+        if packet.is_traceroute:
+            self.probes_forwarded += 1
 
     def handle_packet(self, port, packet):
         """Process incoming packet.
@@ -129,6 +201,46 @@ class Router:
         """
         pass
 
+    def handle_cost_change(self, port, cost):
+        """Handle a link cost change.
+
+        Subclasses should override this method. The default implementation is empty.
+
+        This method is called when the cost of the existing link on port number `port`
+        changes without the link going down. You should update the data structures
+        appropriately.
+
+        Parameters
+        ----------
+        port
+            The port number of the link.
+        cost
+            The new link cost.
+        """
+        pass
+
+    def handle_link_changes(self, changes):
+        """Handle a batch of link changes.
+
+        Subclasses may override this method to process all the link changes that were
+        pending at once, e.g. to recompute routes and advertise them only once. The
+        default implementation calls `handle_new_link`, `handle_remove_link` or
+        `handle_cost_change` for each change in order.
+
+        Parameters
+        ----------
+        changes
+            A list of ("add", port, endpoint, cost), ("remove", port) and
+            ("cost", port, cost) tuples. `self.links` already reflects all of them.
+        """
+        for change in changes:
+            if change[0] == "add":
+                self.handle_new_link(*change[1:])
+            elif change[0] == "remove":
+                self.handle_remove_link(*change[1:])
+            elif change[0] == "cost":
+                self.handle_cost_change(*change[1:])
+
     def handle_time(self, time_ms):
         """Handle current time.
 
@@ -0,0 +1,170 @@
+"""
+Record the latest route found by traceroute packets for every (src, dst) pair.
+
+Clients report routes from their own threads, so the pairs are spread over shards,
+each with its own lock and dict of per-pair slots, and reports for different pairs
+rarely wait on each other. The correct routes of a pair are kept as a frozenset of
+tuples, so checking a route is one hash lookup. The number of pairs recorded and of
+pairs whose route is correct are updated with each report, so `all_correct` is O(1),
+and the route string is only rebuilt after a route or its correctness changed.
+
+These O(1) checks are what the class is for: the network asks `stable` after every
+report and polls `all_correct` and the route string while it runs. Under the GIL the
+shards do not make reports faster, and `record` handles about as many reports per
+second as a dict behind one lock (benchmarks/bench_routes.py).
+
+Once `watch_stability` is called, each pair also counts its consecutive deliveries of
+a correct route, and `stable` tells in O(1) whether every expected pair reached the
+wanted count.
+"""
+
+import threading
+from collections import defaultdict
+
+NUM_SHARDS = 16
+
+
+class RouteRecorder:
+    """
+    The RouteRecorder class stores, for each (src, dst) pair, the route of the latest
+    traceroute (a list of addresses, empty while a traceroute is on its way), whether
+    it is one of the correct routes and the time (ms) it was reported.
+
+    Parameters
+    ----------
+    correct_routes
+        A list of correct routes, each a list of addresses from src to dst. A pair may
+        have several correct routes.
+    num_shards
+        The number of locks the pairs are spread over.
+    """
+
+    def __init__(self, correct_routes, num_shards=NUM_SHARDS):
+        routes = defaultdict(set)
+        for route in correct_routes:
+            routes[(route[0], route[-1])].add(tuple(route))
+        self.correct_routes = {pair: frozenset(r) for pair, r in routes.items()}
+        self.num_shards = num_shards
+        self.shards = [(threading.Lock(), {}) for _ in range(num_shards)]
+        self.counter_lock = threading.Lock()
+        self.totals = (0, 0)  # (pairs recorded, pairs with a correct route)
+        self.version = 0  # Bumped whenever a route or its correctness changes
+        self.route_strings = {}  # label_incorrect -> (version, route string)
+        self.stable_rounds = None  # Correct deliveries in a row that make a pair stable
+        self.expected_pairs = 0
+        self.stable_pairs = 0
+
+    def is_correct(self, src, dst, route):
+        """Return True if `route` is one of the correct routes from `src` to `dst`."""
+        return tuple(route) in self.correct_routes.get((src, dst), ())
+
+    def record(self, src, dst, route, time_ms):
+        """
+        Store `route` for (src, dst) unless a later report was stored already. An
+        empty route stands for a traceroute that was just sent, any other route was
+        delivered.
+        """
+        pair = (src, dst)
+        is_good = tuple(route) in self.correct_routes.get(pair, ())
+        lock, slots = self.shards[hash(pair) % self.num_shards]
+        with lock:
+            slot = slots.get(pair)
+            if slot is None:
+                slot = slots[pair] = [route, is_good, time_ms, 0]
+                self.count(1, is_good)
+            elif time_ms > slot[2]:
+                old_route, was_good = slot[0], slot[1]
+                slot[:3] = route, is_good, time_ms
+                if is_good != was_good or route != old_route:
+                    self.count(0, is_good - was_good)
+            if route and self.stable_rounds is not None:
+                self.update_streak(slot, is_good)
+
+    def update_streak(self, slot, is_good):
+        """Count a delivery in the streak of correct deliveries of a pair."""
+        was_stable = slot[3] >= self.stable_rounds
+        slot[3] = slot[3] + 1 if is_good else 0
+        is_stable = slot[3] >= self.stable_rounds
+        if is_stable != was_stable:
+            with self.counter_lock:
+                self.stable_pairs += 1 if is_stable else -1
+
+    def count(self, pairs, good):
+        """Add to the totals of recorded and correct pairs, marking the routes changed."""
+        with self.counter_lock:
+            total_pairs, total_good = self.totals
+            self.totals = (total_pairs + pairs, total_good + good)
+            self.version += 1
+
+    def all_correct(self):
+        """Return True if at least one route was recorded and all of them are correct."""
+        pairs, good = self.totals
+        return pairs > 0 and good == pairs
+
+    def watch_stability(self, rounds, expected_pairs):
+        """
+        Start counting correct deliveries in a row for every pair from now on. A pair is
+        stable after `rounds` of them, and `stable` waits for `expected_pairs` pairs.
+        """
+        for lock, _ in self.shards:
+            lock.acquire()
+        try:
+            for _, slots in self.shards:
+                for slot in slots.values():
+                    slot[3] = 0
+            with self.counter_lock:
+                self.stable_rounds = rounds
+                self.expected_pairs = expected_pairs
+                self.stable_pairs = 0
+        finally:
+            for lock, _ in self.shards:
+                lock.release()
+
+    def stable(self):
+        """Return True if every expected pair got its route right enough times in a row."""
+        return self.stable_rounds is not None and self.stable_pairs >= self.expected_pairs
+
+    def reset(self):
+        """Forget every recorded route."""
+        for lock, _ in self.shards:
+            lock.acquire()
+        try:
+            for _, slots in self.shards:
+                slots.clear()
+            with self.counter_lock:
+                self.totals = (0, 0)
+                self.stable_pairs = 0
+                self.version += 1
+        finally:
+            for lock, _ in self.shards:
+                lock.release()
+
+    def snapshot(self):
+        """Return a dict mapping each (src, dst) pair to (route, is_good, time_ms)."""
+        routes = {}
+        for lock, slots in self.shards:
+            with lock:
+                routes.update((pair, tuple(slot[:3])) for pair, slot in slots.items())
+        return routes
+
+    def route_string(self, label_incorrect=True):
+        """
+        Return a string with every recorded route, sorted, whether it is correct and a
+        final SUCCESS or FAILURE line. The string is cached until a route changes.
+        """
+        version = self.version
+        cached = self.route_strings.get(label_incorrect)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        route_strings = []
+        for (src, dst), (route, is_good, _) in self.snapshot().items():
+            info = "" if (is_good or not label_incorrect) else "Incorrect Route"
+            route_strings.append(f"{src} -> {dst}: {route} {info}")
+        route_strings.sort()
+        if self.all_correct():
+            route_strings.append("\nSUCCESS: All Routes correct!")
+        else:
+            route_strings.append("\nFAILURE: Not all routes are correct")
+        route_string = "\n".join(route_strings)
+        self.route_strings[label_incorrect] = (version, route_string)
+        return route_string
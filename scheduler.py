@@ -0,0 +1,108 @@
+import heapq
+import itertools
+import threading
+import time
+
+
+class DeliveryScheduler:
+    """
+    The DeliveryScheduler class delivers packets for every link of a network from a
+    single worker thread. Deliveries are kept in a heap ordered by their due time, so
+    sending a packet no longer starts (and later tears down) a thread per packet.
+
+    The scheduler also records how late each delivery ran compared to its due time
+    (the lag), see `stats`.
+    """
+
+    def __init__(self):
+        self.events = []
+        self.counter = itertools.count()
+        self.cond = threading.Condition()
+        self.keep_running = True
+        self.thread = None
+        self.delivered = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+
+    def time_ms(self):
+        """Return the current time in ms."""
+        return time.monotonic() * 1000
+
+    def schedule(self, delay, callback, *args):
+        """Run `callback(*args)` on the worker thread after `delay` ms."""
+        event = (self.time_ms() + delay, next(self.counter), callback, args)
+        with self.cond:
+            heapq.heappush(self.events, event)
+            # Only wake the worker if its next deadline moved earlier
+            if self.events[0] is event:
+                self.cond.notify()
+
+    def start(self):
+        """Start the worker thread."""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """Stop the worker thread. Pending deliveries are dropped."""
+        with self.cond:
+            self.keep_running = False
+            self.cond.notify()
+        if self.thread is not None:
+            self.thread.join()
+
+    def run(self):
+        """Main loop of the worker thread."""
+        while True:
+            with self.cond:
+                while self.keep_running:
+                    if not self.events:
+                        self.cond.wait()
+                        continue
+                    wait_time = self.events[0][0] - self.time_ms()
+                    if wait_time <= 0:
+                        break
+                    self.cond.wait(wait_time / 1000)
+                if not self.keep_running:
+                    return
+                # Take every due event so callbacks run without holding the lock
+                now = self.time_ms()
+                due_events = []
+                while self.events and self.events[0][0] <= now:
+                    due_events.append(heapq.heappop(self.events))
+            for due, _, callback, args in due_events:
+                callback(*args)
+            self.delivered += len(due_events)
+            self.total_lag += sum(now - due for due, _, _, _ in due_events)
+            self.max_lag = max(self.max_lag, now - due_events[0][0])
+
+    def stats(self):
+        """Return a dict with the number of deliveries and their lag in ms."""
+        with self.cond:
+            pending = len(self.events)
+        return {
+            "delivered": self.delivered,
+            "pending": pending,
+            "mean_lag_ms": self.total_lag / self.delivered if self.delivered else 0.0,
+            "max_lag_ms": self.max_lag,
+        }
+
+
+class Inbox:
+    """
+    The Inbox class lets the main loop of a client or router block until there is
+    work to do. Links signal it when they deliver a packet and `change_link` signals
+    it when a link change is queued.
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+
+    def signal(self):
+        """Wake up the main loop."""
+        self.event.set()
+
+    def wait(self, timeout):
+        """Block until signalled or until `timeout` seconds have passed."""
+        self.event.wait(timeout)
+        self.event.clear()
@@ -0,0 +1,248 @@
+"""
+Shortest path first engines used by LSrouter for its full SPF runs: rebuilding the
+tree after a bulk update (e.g. a database sync) or when incremental SPF would redo most
+of it, and the SPFs from neighbors for loop-free alternates. Small changes go through
+the incremental SPF of LSrouter, which does not use these engines.
+
+An engine is bound to a topology (a dict mapping each node to a dict of
+{neighbor: cost}) that its owner mutates in place, calling `update(node)` whenever the
+links of a node change. `shortest_path_tree(source)` returns (dist, prev, first_hop):
+the distance of every reachable node, its predecessor on a shortest path and the
+neighbor of the source that path starts with. Nodes that only appear as neighbors
+(clients) are reached but never expanded further. The engines are
+
+    heap    Dijkstra on a binary heap of (distance, node) tuples, for any costs
+    dial    Dial's algorithm on a circular array of buckets, one per distance modulo
+            (max cost + 1), for non-negative integer costs up to `DIAL_MAX_COST`
+    array   Dijkstra over integer-indexed nodes whose adjacency lists are kept up to
+            date by `update`, with a heap of plain integers (distance * number of
+            nodes + index), for non-negative integer costs
+    auto    dial when the costs allow it, otherwise array or heap
+
+An engine whose cost requirements are not met falls back to the heap engine.
+"""
+
+import heapq
+
+# Largest link cost handled by the dial engine (the number of buckets is max cost + 1)
+DIAL_MAX_COST = 64
+
+
+def heap_spf(topology, source):
+    """Dijkstra with a binary heap of (distance, node) tuples."""
+    dist = {source: 0}
+    prev = {}
+    first_hop = {}
+    pq = [(0, source)]
+    while pq:
+        current_dist, current = heapq.heappop(pq)
+        if current_dist > dist[current]:
+            continue
+        for neighbor, cost in topology.get(current, {}).items():
+            new_dist = current_dist + cost
+            if neighbor not in dist or new_dist < dist[neighbor]:
+                dist[neighbor] = new_dist
+                prev[neighbor] = current
+                first_hop[neighbor] = neighbor if current == source else first_hop[current]
+                heapq.heappush(pq, (new_dist, neighbor))
+    return dist, prev, first_hop
+
+
+def dial_spf(topology, source, max_cost):
+    """
+    Dial's algorithm: nodes wait in the bucket of their distance modulo (max cost + 1),
+    and the buckets are scanned in increasing distance order. `max_cost` must be at
+    least the largest link cost of `topology`.
+    """
+    size = max_cost + 1
+    buckets = [[] for _ in range(size)]
+    buckets[0].append(source)
+    dist = {source: 0}
+    prev = {}
+    first_hop = {}
+    queued = 1
+    current_dist = 0
+    while queued:
+        bucket = buckets[current_dist % size]
+        while bucket:
+            current = bucket.pop()
+            queued -= 1
+            if dist[current] != current_dist:
+                continue
+            for neighbor, cost in topology.get(current, {}).items():
+                new_dist = current_dist + cost
+                if neighbor not in dist or new_dist < dist[neighbor]:
+                    dist[neighbor] = new_dist
+                    prev[neighbor] = current
+                    first_hop[neighbor] = (
+                        neighbor if current == source else first_hop[current]
+                    )
+                    buckets[new_dist % size].append(neighbor)
+                    queued += 1
+        current_dist += 1
+    return dist, prev, first_hop
+
+
+def max_integer_cost(links):
+    """
+    Return the largest cost in a dict of {neighbor: cost} (0 if empty) if every cost
+    is a non-negative integer, otherwise None.
+    """
+    max_cost = 0
+    for cost in links.values():
+        if type(cost) is not int or cost < 0:
+            return None
+        if cost > max_cost:
+            max_cost = cost
+    return max_cost
+
+
+class HeapEngine:
+    """
+    The HeapEngine class runs Dijkstra with a binary heap. It is the base class of the
+    other engines and tracks the largest link cost of the topology for them.
+    """
+
+    name = "heap"
+
+    def __init__(self, topology):
+        self.topology = topology
+        self.node_max_cost = {}  # Node -> largest cost of its links (None if not int)
+        self.cached_max_cost = 0
+        for node in topology:
+            self.update(node)
+
+    def update(self, node):
+        """Take into account new links of `node` in the topology."""
+        self.node_max_cost[node] = max_integer_cost(self.topology.get(node, {}))
+        self.cached_max_cost = False
+
+    def max_cost(self):
+        """
+        Return the largest link cost of the topology if every cost is a non-negative
+        integer, otherwise None.
+        """
+        if self.cached_max_cost is False:
+            values = self.node_max_cost.values()
+            self.cached_max_cost = None if None in values else max(values, default=0)
+        return self.cached_max_cost
+
+    def shortest_path_tree(self, source):
+        """Return (dist, prev, first_hop) of the shortest paths from `source`."""
+        return heap_spf(self.topology, source)
+
+
+class DialEngine(HeapEngine):
+    """
+    The DialEngine class runs Dial's bucket-queue algorithm when every link cost is a
+    non-negative integer up to `DIAL_MAX_COST`.
+    """
+
+    name = "dial"
+
+    def shortest_path_tree(self, source):
+        max_cost = self.max_cost()
+        if max_cost is None or max_cost > DIAL_MAX_COST:
+            return heap_spf(self.topology, source)
+        return dial_spf(self.topology, source, max_cost)
+
+
+class ArrayEngine(HeapEngine):
+    """
+    The ArrayEngine class numbers the nodes and keeps the adjacency of each node as a
+    list of (index, cost), updated node by node, so that Dijkstra runs on lists and
+    integers when every link cost is a non-negative integer.
+    """
+
+    name = "array"
+
+    def __init__(self, topology):
+        self.index = {}
+        self.nodes = []
+        self.adjacency = []
+        HeapEngine.__init__(self, topology)
+
+    def node_index(self, node):
+        i = self.index.get(node)
+        if i is None:
+            i = self.index[node] = len(self.nodes)
+            self.nodes.append(node)
+            self.adjacency.append(())
+        return i
+
+    def update(self, node):
+        HeapEngine.update(self, node)
+        self.adjacency[self.node_index(node)] = [
+            (self.node_index(neighbor), cost)
+            for neighbor, cost in self.topology.get(node, {}).items()
+        ]
+
+    def shortest_path_tree(self, source):
+        if self.max_cost() is None:
+            return heap_spf(self.topology, source)
+        return self.array_spf(source)
+
+    def array_spf(self, source):
+        adjacency = self.adjacency
+        n = len(self.nodes)
+        start = self.node_index(source)
+        unreached = -1
+        dist = [unreached] * n
+        prev = [start] * n
+        first_hop = [start] * n
+        dist[start] = 0
+        pq = [start]
+        while pq:
+            current_dist, current = divmod(heapq.heappop(pq), n)
+            if current_dist != dist[current]:
+                continue
+            for neighbor, cost in adjacency[current]:
+                new_dist = current_dist + cost
+                if dist[neighbor] == unreached or new_dist < dist[neighbor]:
+                    dist[neighbor] = new_dist
+                    prev[neighbor] = current
+                    first_hop[neighbor] = (
+                        neighbor if current == start else first_hop[current]
+                    )
+                    heapq.heappush(pq, new_dist * n + neighbor)
+
+        # Convert back to dicts indexed by node
+        nodes = self.nodes
+        dist_map = {source: 0}
+        prev_map = {}
+        first_hop_map = {}
+        for i, d in enumerate(dist):
+            if d != unreached and i != start:
+                node = nodes[i]
+                dist_map[node] = d
+                prev_map[node] = nodes[prev[i]]
+                first_hop_map[node] = nodes[first_hop[i]]
+        return dist_map, prev_map, first_hop_map
+
+
+class AutoEngine(ArrayEngine):
+    """
+    The AutoEngine class picks the engine that suits the current link costs: dial for
+    small integers, array for other non-negative integers and heap otherwise.
+    """
+
+    name = "auto"
+
+    def shortest_path_tree(self, source):
+        max_cost = self.max_cost()
+        if max_cost is not None and max_cost <= DIAL_MAX_COST:
+            return dial_spf(self.topology, source, max_cost)
+        return ArrayEngine.shortest_path_tree(self, source)
+
+
+ENGINES = {
+    engine.name: engine for engine in (HeapEngine, DialEngine, ArrayEngine, AutoEngine)
+}
+
+
+def make_engine(name, topology):
+    """Create the SPF engine called `name` (a key of `ENGINES`) bound to `topology`."""
+    try:
+        return ENGINES[name](topology)
+    except KeyError:
+        raise ValueError(f"unknown SPF engine {name!r}, expected one of {list(ENGINES)}")
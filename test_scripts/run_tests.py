@@ -0,0 +1,253 @@
+"""
+Run every supplied network simulation with the router implementations and check that
+the final routes are correct.
+
+Each (scenario, router) job runs in its own freshly spawned process, so jobs share no
+threads or class attributes, and several jobs run at once. A job that runs
+past its timeout is killed and reported as an error. The outcome is read from the
+`RunResult` the network stores at the end of its run instead of its printed output,
+and the summary can be written as JSON and as a JUnit XML report.
+
+A simulation also fails if some traceroutes of its final round were still on their way
+when it ended, since routes left over from earlier rounds would then stand in for them.
+
+With --until-converged, each simulation stops once its routes have been correct for
+a few traceroute rounds after the last link change instead of running to its end time.
+
+Usage: python test_scripts/run_tests.py [DV|LS|BOTH] [scenario ...]
+           [--engine threads|des] [--until-converged [ROUNDS]] [--jobs N] [--timeout S]
+           [--json PATH] [--junit PATH]
+"""
+
+import argparse
+import glob
+import io
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import sys
+import time
+import traceback
+import xml.etree.ElementTree as ET
+from contextlib import redirect_stdout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TIMEOUT_PER_TEST = 60
+
+
+def run_job(path, router, engine, until_converged, conn):
+    """Run `path` with `router` ("DV" or "LS") in a child process and send the outcome."""
+    try:
+        from network import Network
+
+        if router == "DV":
+            from DVrouter import DVrouter as RouterClass
+        else:
+            from LSrouter import LSrouter as RouterClass
+
+        net = Network(
+            path,
+            RouterClass,
+            visualize=False,
+            engine=engine,
+            until_converged=until_converged,
+        )
+        with redirect_stdout(io.StringIO()):
+            net.run()
+        # Final routes only count if every final traceroute was accounted for
+        passed = net.result.all_correct and net.result.unaccounted_probes() == 0
+        conn.send({"status": "passed" if passed else "failed",
+                   "result": net.result.to_dict()})
+    except BaseException:
+        conn.send({"status": "error", "message": traceback.format_exc()})
+    finally:
+        conn.close()
+
+
+class Job:
+    """A (scenario, router) pair and the process that runs it."""
+
+    def __init__(self, path, router):
+        self.path = path
+        self.router = router
+        self.process = None
+        self.conn = None
+        self.started = None
+        self.outcome = None
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+    def start(self, context, engine, until_converged):
+        self.conn, child_conn = context.Pipe(duplex=False)
+        self.process = context.Process(
+            target=run_job,
+            args=(self.path, self.router, engine, until_converged, child_conn),
+        )
+        self.started = time.perf_counter()
+        self.process.start()
+        child_conn.close()
+
+    def poll(self, timeout):
+        """Return True once the job is finished, killing it if it ran for too long."""
+        elapsed = time.perf_counter() - self.started
+        if self.conn.poll():
+            try:
+                self.outcome = self.conn.recv()
+            except EOFError:
+                self.outcome = {"status": "error", "message": "process exited early"}
+        elif not self.process.is_alive():
+            self.outcome = {
+                "status": "error",
+                "message": f"process exited with code {self.process.exitcode}",
+            }
+        elif elapsed > timeout:
+            self.process.kill()
+            self.outcome = {"status": "timeout", "message": f"timed out after {timeout} s"}
+        else:
+            return False
+        self.process.join()
+        self.conn.close()
+        self.outcome["time_s"] = round(elapsed, 3)
+        return True
+
+
+def run_all(jobs, engine, num_workers, timeout, until_converged=None):
+    """Run `jobs` with at most `num_workers` at a time, yield each one as it finishes."""
+    context = multiprocessing.get_context("spawn")
+    pending = list(jobs)
+    running = []
+    while pending or running:
+        while pending and len(running) < num_workers:
+            job = pending.pop(0)
+            job.start(context, engine, until_converged)
+            running.append(job)
+        for job in [job for job in running if job.poll(timeout)]:
+            running.remove(job)
+            yield job
+        if running:
+            multiprocessing.connection.wait(
+                [job.conn for job in running] + [job.process.sentinel for job in running],
+                timeout=0.1,
+            )
+
+
+def write_json(jobs, path, elapsed):
+    summary = {
+        "passed": sum(job.outcome["status"] == "passed" for job in jobs),
+        "total": len(jobs),
+        "time_s": round(elapsed, 3),
+        "tests": [
+            dict(scenario=job.name, router=job.router, **job.outcome) for job in jobs
+        ],
+    }
+    with open(path, "w") as f:
+        json.dump(summary, f, indent=2)
+
+
+def write_junit(jobs, path, elapsed):
+    root = ET.Element("testsuites")
+    suite = ET.SubElement(
+        root,
+        "testsuite",
+        name="routing",
+        tests=str(len(jobs)),
+        failures=str(sum(job.outcome["status"] == "failed" for job in jobs)),
+        errors=str(sum(job.outcome["status"] in ("error", "timeout") for job in jobs)),
+        time=f"{elapsed:.3f}",
+    )
+    for job in jobs:
+        case = ET.SubElement(
+            suite,
+            "testcase",
+            classname=f"{job.router}router",
+            name=job.name,
+            time=f"{job.outcome['time_s']:.3f}",
+        )
+        status = job.outcome["status"]
+        if status == "failed":
+            incorrect = [
+                f"{r['src']} -> {r['dst']}: {r['route']}"
+                for r in job.outcome["result"]["routes"]
+                if not r["correct"]
+            ]
+            message = (
+                "Not all routes are correct"
+                if incorrect or not job.outcome["result"]["routes"]
+                else "Final traceroutes still on their way"
+            )
+            failure = ET.SubElement(case, "failure", message=message)
+            failure.text = "\n".join(incorrect)
+        elif status in ("error", "timeout"):
+            error = ET.SubElement(case, "error", message=status)
+            error.text = job.outcome["message"]
+    tree = ET.ElementTree(root)
+    ET.indent(tree)
+    tree.write(path, encoding="utf-8", xml_declaration=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test the router implementations.")
+    parser.add_argument("targets", nargs="*", metavar="DV|LS|BOTH|scenario",
+                        help="Routers to test (default: BOTH) and network JSON files "
+                        "(default: every *.json in the repo root)")
+    parser.add_argument("--engine", choices=["threads", "des"], default="threads")
+    parser.add_argument("--until-converged", type=int, nargs="?", const=3, default=None,
+                        metavar="ROUNDS",
+                        help="Stop each simulation once its routes have been correct for "
+                        "ROUNDS traceroute rounds (default 3) after the last change")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="Number of simulations run at once (default: all of them "
+                        "with threads, which mostly sleep, one per CPU with des)")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT_PER_TEST,
+                        help="Seconds before a simulation is killed")
+    parser.add_argument("--json", help="Write a JSON summary to this path")
+    parser.add_argument("--junit", help="Write a JUnit XML report to this path")
+    args = parser.parse_args()
+
+    selected = [t for t in args.targets if t in ("DV", "LS", "BOTH")] or ["BOTH"]
+    routers = [r for r in ("DV", "LS") if r in selected or "BOTH" in selected]
+    scenarios = [t for t in args.targets if t not in ("DV", "LS", "BOTH")]
+    scenarios = scenarios or sorted(glob.glob(os.path.join(ROOT, "*.json")))
+    jobs = [Job(os.path.abspath(path), router) for router in routers for path in scenarios]
+
+    num_workers = args.jobs or (len(jobs) if args.engine == "threads" else os.cpu_count())
+    start = time.perf_counter()
+    for job in run_all(
+        jobs, args.engine, max(num_workers or 1, 1), args.timeout, args.until_converged
+    ):
+        status = job.outcome["status"]
+        converged = job.outcome.get("result", {}).get("converged_ms")
+        print(
+            f"{status.upper():8s} {job.router} {job.name} ({job.outcome['time_s']:.1f} s"
+            + (f", converged at {converged} ms)" if converged is not None else ")")
+        )
+        if status == "failed":
+            result = job.outcome["result"]
+            for r in result["routes"]:
+                if not r["correct"]:
+                    print(f"    {r['src']} -> {r['dst']}: {r['route']} Incorrect Route")
+            if result["probe_rounds"]:
+                final = result["probe_rounds"][-1]
+                print(f"    final round: {final['sent']} traceroutes sent, "
+                      f"{final['delivered']} delivered, {final['dropped']} dropped, "
+                      f"{final['lost']} lost")
+        elif status in ("error", "timeout"):
+            print("    " + job.outcome["message"].strip().replace("\n", "\n    "))
+    elapsed = time.perf_counter() - start
+
+    if args.json:
+        write_json(jobs, args.json, elapsed)
+    if args.junit:
+        write_junit(jobs, args.junit, elapsed)
+    passed = sum(job.outcome["status"] == "passed" for job in jobs)
+    print(f"\nTESTS PASSED: {passed}/{len(jobs)} in {elapsed:.1f} s")
+    sys.exit(0 if passed == len(jobs) else 1)
+
+
+if __name__ == "__main__":
+    main()
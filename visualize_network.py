@@ -100,15 +100,10 @@ class App:
         self.canvas.tag_lower(line)
         tx, ty = (center1[0] + center2[0]) / 2, (center1[1] + center2[1]) / 2
 
-        t = (
-            str(c12)
-            if c12 == c21
-            else f"{addr1}->{addr2}:{c12}, {addr2}->{addr1}:{c21}"
-        )
         label = self.canvas.create_text(
             tx,
             ty,
-            text=t,
+            text=self.cost_text(addr1, addr2, c12, c21),
             state=NORMAL,
             font=tkinter.font.Font(
                 size=self.network_params["visualize"]["line_font_size"]
@@ -116,6 +111,12 @@ class App:
         )
         return line, label
 
+    def cost_text(self, addr1, addr2, c12, c21):
+        """Return the label of a link with costs `c12` and `c21`."""
+        if c12 == c21:
+            return str(c12)
+        return f"{addr1}->{addr2}:{c12}, {addr2}->{addr1}:{c21}"
+
     def draw_rectangles(self):
         """Draw rectangles corresponding to clients/routers."""
         rects = {}
@@ -224,12 +225,19 @@ class App:
         """Make color and text changes to links upon add/remove/cost changes."""
         if change == "up":
             addr1, addr2, _, _, c12, c21 = target
-            new_line, _ = self.draw_line(addr1, addr2, c12, c21)
+            new_line, new_label = self.draw_line(addr1, addr2, c12, c21)
             self.lines[(addr1, addr2)] = new_line
+            self.line_labels[(addr1, addr2)] = new_label
         elif change == "down":
             addr1, addr2 = target
             self.canvas.delete(self.lines[(addr1, addr2)])
             self.canvas.delete(self.line_labels[(addr1, addr2)])
+        elif change == "cost":
+            addr1, addr2, c12, c21 = target
+            self.canvas.itemconfigure(
+                self.line_labels[(addr1, addr2)],
+                text=self.cost_text(addr1, addr2, c12, c21),
+            )
 
 
 def main():